@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Tests for the action registry and executor"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.actions import REGISTRY, ActionExecutor, ActionHandler, ActionRegistry
+from ulanzi_manager.config import ConfigParser
+
+PLUGIN = '''
+from ulanzi_manager.actions import ActionHandler
+from ulanzi_manager.schema import Field, action_schema
+
+class EchoAction(ActionHandler):
+    schema = action_schema('echo', {'text': Field('str', required=True)})
+    blocking = False
+
+    def execute(self, params):
+        return params['text'].upper()
+'''
+
+
+def test_entry_point_plugin_loaded_on_first_use():
+    """Plugins are found through entry points and imported only when their action type is used"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'echo_plugin.py').write_text(PLUGIN)
+        dist_info = tmp / 'echo_plugin-1.0.dist-info'
+        dist_info.mkdir()
+        (dist_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: echo-plugin\nVersion: 1.0\n')
+        (dist_info / 'entry_points.txt').write_text('[ulanzi_manager.actions]\necho = echo_plugin:EchoAction\n')
+
+        sys.path.insert(0, str(tmp))
+        try:
+            registry = ActionRegistry()
+            assert 'echo' in registry.names()
+            assert 'echo_plugin' not in sys.modules
+
+            executor = ActionExecutor(registry=registry)
+            assert executor.execute('echo', {'text': 'hi'}).result(timeout=5) == 'HI'
+            assert 'echo_plugin' in sys.modules
+
+            # The config schema comes from the plugin
+            config_path = tmp / 'config.yaml'
+            config_path.write_text(f"buttons:\n  - image: {project_root}/icons/obs.png\n    action: echo\n")
+            import ulanzi_manager.actions as actions
+            previous, actions.REGISTRY = actions.REGISTRY, registry
+            try:
+                errors = ConfigParser.validate(ConfigParser.load(str(config_path)))
+            finally:
+                actions.REGISTRY = previous
+            assert errors == ["config.yaml:3:13: Button 0: 'echo' action requires 'text' parameter"]
+        finally:
+            sys.path.remove(str(tmp))
+            sys.modules.pop('echo_plugin', None)
+
+
+class GateAction(ActionHandler):
+    max_concurrency = 1
+
+    def __init__(self, context=None):
+        super().__init__(context)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def execute(self, params):
+        self.started.set()
+        self.release.wait(5)
+        return 'done'
+
+
+def test_concurrency_limit_drops_extra_presses():
+    registry = ActionRegistry(group=None)
+    registry.register('gate', GateAction)
+    executor = ActionExecutor(registry=registry)
+    try:
+        first = executor.execute('gate', {})
+        assert executor.handlers['gate'].started.wait(5)
+        assert executor.execute('gate', {}) is None
+
+        executor.handlers['gate'].release.set()
+        assert first.result(timeout=5) == 'done'
+        assert executor.execute('gate', {}).result(timeout=5) == 'done'
+    finally:
+        executor.shutdown()
+
+
+class OrderedAction(ActionHandler):
+    serial = True
+
+    def __init__(self, context=None):
+        super().__init__(context)
+        self.running = 0
+        self.overlapped = False
+        self.order = []
+
+    def execute(self, params):
+        self.running += 1
+        self.overlapped |= self.running > 1
+        time.sleep(0.005)
+        self.order.append(params['value'])
+        self.running -= 1
+        return params['value']
+
+
+def test_serial_actions_queue_instead_of_dropping():
+    registry = ActionRegistry(group=None)
+    registry.register('ordered', OrderedAction)
+    executor = ActionExecutor(registry=registry)
+    try:
+        futures = [executor.execute('ordered', {'value': i}) for i in range(8)]
+        assert [future.result(timeout=5) for future in futures] == list(range(8))
+        handler = executor.handlers['ordered']
+        assert handler.order == list(range(8)) and not handler.overlapped
+        # Built-in OBS and key actions never drop presses
+        assert REGISTRY.load('obs').max_concurrency is None and REGISTRY.load('key').max_concurrency is None
+    finally:
+        executor.shutdown()
+
+
+class SleepAction(ActionHandler):
+    async def execute(self, params):
+        import asyncio
+        await asyncio.sleep(0.01)
+        return params['value']
+
+
+def test_coroutine_handlers_run_on_the_async_loop():
+    registry = ActionRegistry(group=None)
+    registry.register('sleep', SleepAction)
+    executor = ActionExecutor(registry=registry)
+    try:
+        futures = [executor.execute('sleep', {'value': i}) for i in range(5)]
+        assert [future.result(timeout=5) for future in futures] == list(range(5))
+    finally:
+        executor.shutdown()
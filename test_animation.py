@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Tests for animated button icons"""
+
+import io
+import struct
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from ulanzi_manager.animation import LINK_SHARE, Animator, load_frames
+from ulanzi_manager.bench.fakeclock import FakeClock
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.config import ButtonConfig
+from ulanzi_manager.device import CommandProtocol, UlanziDevice
+from ulanzi_manager.scheduler import Scheduler
+
+
+class SlowHIDDevice(FakeHIDDevice):
+    """Takes write_time (fake) seconds per packet"""
+
+    def __init__(self, clock, write_time=0.0):
+        super().__init__(clock)
+        self.write_time = write_time
+
+    def write(self, data):
+        self.clock.advance(self.write_time)
+        return super().write(data)
+
+
+def _animator(write_time=0.0, paused=lambda: False):
+    clock = FakeClock()
+    fake = SlowHIDDevice(clock, write_time)
+    device = UlanziDevice(hid_device=fake)
+    scheduler = Scheduler(clock=clock)
+    return Animator(device, scheduler, paused=paused, max_fps=10), fake, scheduler, clock
+
+
+def _run(scheduler, clock, seconds, step=0.01):
+    end = clock.now + seconds
+    while clock.now < end:
+        scheduler.run_pending()
+        clock.advance(step)
+
+
+def _frame_icons(fake):
+    """Icon names of the partial updates written"""
+    icons = []
+    for position, packet in enumerate(fake.writes):
+        if packet[:2] == UlanziDevice.HEADER and struct.unpack('>H', packet[2:4])[0] == \
+                CommandProtocol.OUT_PARTIALLY_UPDATE_BUTTONS:
+            size = struct.unpack('<I', packet[4:8])[0]
+            data = packet[8:] + b''.join(fake.writes[position + 1:position + 1 + size // UlanziDevice.PACKET_SIZE])
+            names = zipfile.ZipFile(io.BytesIO(data[:size])).namelist()
+            icons.append(next(name for name in names if name.startswith('icons/')))
+    return icons
+
+
+def test_blink_frames_are_encoded_once_and_paced():
+    animator, fake, scheduler, clock = _animator()
+    button = ButtonConfig(3, str(project_root / 'icons/record.png'), 'Rec', 'command', {},
+                          animation={'type': 'blink', 'color': '#FF0000', 'period': 1.0})
+    animation = animator.load(button)
+    assert animator.load(button) is animation  # Decoded once
+    animator.show([animation])
+
+    _run(scheduler, clock, 2.05)
+    icons = _frame_icons(fake)
+    assert len(icons) == 5  # On, off, on, off, on
+    assert icons[0] != icons[1] and icons[0::2] == [icons[0]] * 3
+    assert len(animation.archives) == 2
+
+    # Paused decks get no frames
+    animator.paused = lambda: True
+    fake.clear_writes()
+    _run(scheduler, clock, 2.0)
+    assert fake.writes == [] and animator.suspended
+
+
+def test_frame_rate_adapts_to_transfer_time():
+    # 40 ms per packet; a pulse frame is a few packets
+    animator, fake, scheduler, clock = _animator(write_time=0.04)
+    button = ButtonConfig(0, str(project_root / 'icons/obs.png'), '', 'command', {},
+                          animation={'type': 'pulse', 'period': 1.0, 'frames': 20})
+    animator.show([animator.load(button)])
+    _run(scheduler, clock, 5.0)
+
+    per_frame = animator.transfer[0]
+    assert per_frame > 0.1
+    assert animator.min_interval(animator.animations[0]) == per_frame / LINK_SHARE
+    sent = len(_frame_icons(fake))
+    assert sent * per_frame <= 5.0 * LINK_SHARE + per_frame
+
+
+def test_gif_frames_and_durations():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'spin.gif'
+        frames = [Image.new('RGB', (64, 64), color) for color in ('red', 'green', 'blue')]
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=[100, 200, 300], loop=0)
+        decoded = load_frames(str(path))
+    assert [frame.duration for frame in decoded] == [0.1, 0.2, 0.3]
+    assert Image.open(io.BytesIO(decoded[0].png)).size == (196, 196)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Tests for streamed button archives"""
+
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.archive import (
+    ArchiveEntry, ButtonArchive, CompressionPolicy, build_button_archive,
+    ZIP_DEFLATED, ZIP_STORED, FIRST_CHUNK_SIZE, PACKET_SIZE, INVALID_BOUNDARY_BYTES,
+)
+
+
+def _icon_buttons():
+    icons = sorted((project_root / 'icons').glob('*.png'))
+    return {idx: {'image': str(path), 'label': path.stem, 'state': 0} for idx, path in enumerate(icons[:13])}
+
+
+def test_archive_is_valid_zip():
+    """Streamed chunks reassemble into a readable ZIP"""
+    buttons = _icon_buttons()
+    archive = build_button_archive(buttons)
+    data = b''.join(archive.iter_chunks())
+
+    assert data == archive.getvalue()
+    assert len(data) == archive.size
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        assert 'manifest.json' in names
+        assert 'dummy.txt' in names
+        for config in buttons.values():
+            name = f"icons/{Path(config['image']).name}"
+            assert zf.read(name) == Path(config['image']).read_bytes()
+
+
+def test_boundary_bytes_are_avoided():
+    """Padding is grown until no packet starts with an invalid byte"""
+    raw = bytearray(b'a' * 8000)
+    # Data starts after the empty padding entry and this entry's local header
+    data_start = (30 + len('dummy.txt')) + (30 + len('icons/bad.png'))
+    for position in range(FIRST_CHUNK_SIZE, 8000, PACKET_SIZE):
+        raw[position - data_start] = 0x7c
+    archive = ButtonArchive([ArchiveEntry.from_bytes('icons/bad.png', bytes(raw))])
+    data = archive.getvalue()
+
+    assert archive.retries > 0
+
+    for position in range(FIRST_CHUNK_SIZE, len(data), PACKET_SIZE):
+        assert data[position] not in INVALID_BOUNDARY_BYTES
+    assert archive.retries == archive.padding
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+
+
+def test_archive_is_deterministic():
+    """Same buttons produce the same bytes"""
+    buttons = _icon_buttons()
+    assert build_button_archive(buttons).getvalue() == build_button_archive(buttons).getvalue()
+
+
+def test_chunk_sizes_match_packet_framing():
+    """First chunk fits after the packet header, the rest fill whole packets"""
+    archive = build_button_archive(_icon_buttons())
+    chunks = list(archive.iter_chunks())
+
+    assert len(chunks[0]) == FIRST_CHUNK_SIZE
+    assert all(len(chunk) == PACKET_SIZE for chunk in chunks[1:-1])
+    assert sum(len(chunk) for chunk in chunks) == archive.size
+
+
+def test_compression_policy_methods():
+    """PNG icons are stored, the manifest is deflated"""
+    archive = build_button_archive(_icon_buttons(), CompressionPolicy('default'))
+    methods = {entry.name: entry.method for entry in archive.entries}
+
+    assert methods['manifest.json'] == ZIP_DEFLATED
+    assert all(method == ZIP_STORED for name, method in methods.items() if name.endswith('.png'))
+
+
+def test_compression_policy_auto():
+    """Auto mode only keeps deflate output when it is smaller enough"""
+    policy = CompressionPolicy('auto', min_ratio=0.9)
+
+    assert policy.entry('a.txt', b'a' * 1000).method == ZIP_DEFLATED
+    assert policy.entry('b.bin', bytes(range(256))).method == ZIP_STORED
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Tests for icon atlases"""
+
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from ulanzi_manager.atlas import ATLASES, AtlasCache, parse_index
+from ulanzi_manager.config import ConfigParser, device_buttons
+from ulanzi_manager.snapshot import _dependencies
+
+COLORS = ('red', 'green', 'blue')
+
+
+def _write_atlas(directory: Path, name: str, tiles) -> Path:
+    """Sheet with one 64x64 tile per (tile name, color), side by side"""
+    sheet = Image.new('RGBA', (64 * len(tiles), 64))
+    for position, (_, color) in enumerate(tiles):
+        sheet.paste(Image.new('RGBA', (64, 64), color), (position * 64, 0))
+    sheet.save(directory / f'{name}.png')
+    index = directory / f'{name}.json'
+    index.write_text(json.dumps({
+        'image': f'{name}.png',
+        'tiles': {tile: [position * 64, 0, 64, 64] for position, (tile, _) in enumerate(tiles)},
+    }))
+    return index
+
+
+def _color(png: bytes):
+    image = Image.open(io.BytesIO(png))
+    assert image.size == (196, 196)
+    return image.convert('RGB').getpixel((98, 98))
+
+
+def test_atlas_images_in_config():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        index = _write_atlas(tmp, 'pack', [(color, color) for color in COLORS])
+        _write_atlas(tmp, 'other', [('red', 'white')])
+        config_path = tmp / 'config.yaml'
+        config_path.write_text("""atlases:
+  pack: ./pack.json
+  other: ./other.json
+buttons:
+  - image: atlas:pack/red
+    action: page
+    params: {page: second}
+  - image: atlas:green
+    action: page
+    params: {page: second}
+pages:
+  second:
+    - image: atlas:pack/blue
+      action: page
+      params: {page: main}
+""")
+        config = ConfigParser.load(str(config_path))
+        assert ConfigParser.validate(config) == []
+        assert config.buttons[1].image == f'atlas:{index}#green'
+
+        buttons = device_buttons(config.buttons)
+        assert buttons[0]['image'] == 'atlas_pack_red.png'
+        assert _color(buttons[0]['image_data']) == (255, 0, 0)
+        assert _color(buttons[1]['image_data']) == (0, 128, 0)
+
+        # Tiles are encoded once; the sheet and index are snapshot dependencies
+        hits = ATLASES.hits
+        device_buttons(config.buttons)
+        assert ATLASES.hits == hits + 2
+        assert set(_dependencies(config)) == {str(index), str(tmp / 'pack.png')}
+
+        # Changing the sheet drops its encoded tiles
+        _write_atlas(tmp, 'pack', [('red', 'yellow'), ('green', 'green'), ('blue', 'blue')])
+        assert _color(device_buttons(config.buttons[:1])[0]['image_data']) == (255, 255, 0)
+
+
+def test_unknown_tiles_are_schema_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _write_atlas(tmp, 'pack', [('red', 'red')])
+        _write_atlas(tmp, 'other', [('red', 'red')])
+        config_path = tmp / 'config.yaml'
+        config_path.write_text("""atlases:
+  pack: ./pack.json
+  other: ./other.json
+  missing: ./missing.json
+buttons:
+  - image: atlas:pack/mic
+    action: page
+    params: {page: main}
+  - image: atlas:red
+    action: page
+    params: {page: main}
+  - image: atlas:nope/red
+    action: page
+    params: {page: main}
+""")
+        errors = ConfigParser.validate(ConfigParser.load(str(config_path)))
+    assert errors == [
+        f"config.yaml:4:12: atlas index not found: {tmp / 'missing.json'}",
+        "config.yaml:6:12: Button 0: atlas tile not found: atlas:pack/mic",
+        "config.yaml:9:12: Button 1: atlas:red is in several atlases (pack, other), use atlas:<atlas>/red",
+        "config.yaml:12:12: Button 2: unknown atlas 'nope' (atlases: pack, other, missing)",
+    ]
+
+
+def test_index_layouts_and_lru():
+    grid = {'image': 'grid.png', 'tile_size': [32, 32], 'columns': 2, 'names': ['a', None, 'c']}
+    assert parse_index(grid) == ('grid.png', {'a': (0, 0, 32, 32), 'c': (0, 32, 32, 32)})
+    packer = {'meta': {'image': 'sheet.png'}, 'frames': {'mic.png': {'frame': {'x': 4, 'y': 8, 'w': 16, 'h': 16}}}}
+    assert parse_index(packer) == ('sheet.png', {'mic': (4, 8, 16, 16)})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _write_atlas(Path(tmp), 'pack', [(color, color) for color in COLORS])
+        cache = AtlasCache(capacity=2)
+        refs = [f'atlas:{index}#{color}' for color in COLORS]
+        for ref in refs + refs[2:]:
+            cache.tile(ref)
+        assert (cache.hits, cache.misses) == (1, 3)
+        cache.tile(refs[0])  # Evicted by 'blue'
+        assert cache.misses == 4
+        assert cache.atlas(str(index)).loaded  # Sheet decoded once and kept
+
+
+def test_baked_labels_follow_atlas_changes():
+    from ulanzi_manager.compositor import bake_label
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _write_atlas(Path(tmp), 'labels', [('mic', 'red')])
+        ref = f'atlas:{index}#mic'
+        before = bake_label(ref, 'Mic')
+        assert bake_label(ref, 'Mic') is before
+        _write_atlas(Path(tmp), 'labels', [('mic', 'blue')])
+        assert bake_label(ref, 'Mic') != before
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Tests for the benchmark suite and simulated HID device"""
+
+import json
+import struct
+import sys
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench import run_benchmarks
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.device import CommandProtocol, UlanziDevice
+
+
+def test_set_buttons_framing_on_fake_device():
+    """The first packet carries the archive length, the rest are raw 1024-byte chunks"""
+    fake = FakeHIDDevice()
+    device = UlanziDevice(hid_device=fake)
+    icon = project_root / 'icons' / 'obs.png'
+    device.set_buttons({0: {'image': str(icon), 'label': 'OBS', 'state': 0}})
+
+    first = fake.writes[0]
+    assert first[0:2] == UlanziDevice.HEADER
+    assert struct.unpack('>H', first[2:4])[0] == CommandProtocol.OUT_SET_BUTTONS
+    size = struct.unpack('<I', first[4:8])[0]
+    assert all(len(packet) == UlanziDevice.PACKET_SIZE for packet in fake.writes)
+    assert len(fake.writes) == 1 + -(-(size - 1016) // 1024)
+
+
+def test_scripted_press_reaches_callback():
+    """Queued input reports are parsed into button presses"""
+    fake = FakeHIDDevice()
+    device = UlanziDevice(hid_device=fake)
+    presses = []
+    device.set_button_callback(presses.append)
+    fake.queue_press(7)
+
+    while fake.pending_reports():
+        device.read_button_press()
+
+    assert [(p.index, p.pressed) for p in presses] == [(7, True), (7, False)]
+
+
+def test_run_benchmarks_produces_json():
+    """Every benchmark runs without hardware and the report is JSON"""
+    report = run_benchmarks(iterations=2)
+    json.dumps(report)
+
+    for name, result in report['results'].items():
+        assert 'error' not in result, f"{name}: {result.get('error')}"
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Tests for brightness scheduling"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench.fakeclock import FakeClock
+from ulanzi_manager.brightness import BrightnessController
+from ulanzi_manager.config import BrightnessSchedule
+from ulanzi_manager.scheduler import Scheduler
+
+
+class RecordingDevice:
+    """Records brightness writes, suppressing unchanged values like UlanziDevice"""
+
+    def __init__(self):
+        self.writes = []
+
+    def set_brightness(self, brightness, force=False):
+        if self.writes and self.writes[-1] == brightness and not force:
+            return
+        self.writes.append(brightness)
+
+
+def _advance(scheduler, clock, seconds, step=0.01):
+    end = clock.now + seconds
+    while clock.now < end:
+        clock.advance(step)
+        scheduler.run_pending()
+
+
+def test_profile_selects_level_by_time_of_day():
+    """The latest profile entry before now applies, wrapping around midnight"""
+    schedule = BrightnessSchedule(profile=[('07:00', 100), ('22:00', 30)])
+    scheduler = Scheduler(clock=FakeClock())
+    controller = BrightnessController(RecordingDevice(), scheduler, 80, schedule,
+                                      now=lambda: datetime(2024, 1, 1, 12, 0))
+    assert controller.scheduled_level() == 100
+
+    controller.now = lambda: datetime(2024, 1, 1, 23, 0)
+    assert controller.scheduled_level() == 30
+
+    controller.now = lambda: datetime(2024, 1, 1, 3, 0)
+    assert controller.scheduled_level() == 30
+
+
+def test_idle_dimming_fades_in_steps_and_wakes_on_press():
+    """Idle dims with rate-limited steps, a press restores brightness"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock)
+    device = RecordingDevice()
+    schedule = BrightnessSchedule(idle_timeout=5, idle_brightness=10, fade_step=30, fade_interval=0.1)
+    controller = BrightnessController(device, scheduler, 100, schedule)
+    controller.start()
+
+    _advance(scheduler, clock, 4)
+    assert device.writes == [100]
+
+    _advance(scheduler, clock, 3)
+    assert controller.idle
+    assert device.writes == [100, 70, 40, 10]
+
+    controller.note_activity()
+    _advance(scheduler, clock, 1)
+    assert not controller.idle
+    assert device.writes[-1] == 100
+    assert device.writes[4:] == [40, 70, 100]
+
+
+def test_unchanged_target_writes_nothing():
+    """Re-evaluating an unchanged schedule does not touch the device"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock)
+    device = RecordingDevice()
+    controller = BrightnessController(device, scheduler, 60, BrightnessSchedule())
+    controller.start()
+
+    _advance(scheduler, clock, 10, step=0.5)
+    assert device.writes == [60]
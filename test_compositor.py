@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Tests for layered icon compositing"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.compositor import Compositor, with_badge
+from ulanzi_manager.config import ConfigParser
+from ulanzi_manager.icon_generator import IconGenerator, IconSpec
+from ulanzi_manager.metrics import ICON_LAYER_CACHE
+
+SPEC = {
+    'type': 'layers',
+    'layers': [
+        {'type': 'background', 'color': '#000080', 'gradient': '#000000'},
+        {'type': 'image', 'path': str(project_root / 'icons/obs.png'), 'scale': 0.6},
+        {'type': 'text', 'text': 'LIVE', 'position': 'bottom', 'font_size': 30},
+        {'type': 'badge', 'text': '1'},
+    ],
+}
+
+
+def _misses():
+    return ICON_LAYER_CACHE.value('miss')
+
+
+def test_badge_change_renders_only_the_badge():
+    compositor = Compositor()
+    misses = _misses()
+    first = compositor.render(SPEC['layers'], (196, 196))
+    assert _misses() == misses + 4
+    assert first.getpixel((10, 10))[2] > 100  # Background at the top-left
+    assert first.getpixel((170, 25))[:3] == (255, 59, 48)  # Badge at the top-right
+
+    # Same stack again: everything from cache
+    assert compositor.render(SPEC['layers'], (196, 196)).tobytes() == first.tobytes()
+    assert _misses() == misses + 4
+
+    # New badge text: one layer rendered over the cached base
+    second = compositor.render(with_badge(SPEC, '12')['layers'], (196, 196))
+    assert _misses() == misses + 5
+    assert second.tobytes() != first.tobytes()
+    assert second.crop((0, 100, 196, 196)).tobytes() == first.crop((0, 100, 196, 196)).tobytes()
+
+    # Removing the badge reuses the cached base stack
+    assert compositor.render(with_badge(SPEC, '')['layers'], (196, 196)).getpixel((170, 25))[:3] != (255, 59, 48)
+    assert _misses() == misses + 5
+
+
+def test_layers_spec_in_config():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'obs.png').write_bytes((project_root / 'icons/obs.png').read_bytes())
+        config_path = tmp / 'config.yaml'
+        config_path.write_text("""buttons:
+  - icon_spec:
+      type: layers
+      layers:
+        - {type: background, color: '#202020'}
+        - {type: image, path: ./obs.png}
+        - {type: badge, text: 3, position: top-left}
+    action: page
+    params: {page: main}
+  - icon_spec:
+      type: layers
+      layers:
+        - {type: image}
+        - {type: text, text: hi, position: middle}
+        - {color: red}
+    action: page
+    params: {page: main}
+""")
+        config = ConfigParser.load(str(config_path))
+    assert config.errors == [
+        "config.yaml:13:11: Button 1: icon_spec: 'image' layer requires 'path'",
+        "config.yaml:14:44: Button 1: icon_spec: layer position must be [x, y] or one of: "
+        "center, top, bottom, left, right, top-left, top-right, bottom-left, bottom-right",
+        "config.yaml:15:11: Button 1: icon_spec.layers[2].type is required",
+    ]
+
+    assert config.buttons[0].icon_spec['layers'][1]['path'] == str(tmp / 'obs.png')
+    assert IconSpec({'type': 'layers', 'layers': [{'type': 'glyph'}]}).validate() == \
+        ["layers[0]: 'glyph' layer requires 'char' or 'emoji' or 'icon'"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = IconGenerator(cache_dir=Path(tmp)).generate(IconSpec(SPEC))
+        assert path.exists()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Tests for the daemon control socket"""
+
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.control import ControlClient, ControlError, ControlServer
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import CommandProtocol, UlanziDevice
+
+CONFIG = """
+brightness: 70
+control:
+  socket: {socket}
+buttons:
+  - image: {icons}/obs.png
+    label: OBS
+    action: page
+    params:
+      page: tools
+  - image: {icons}/record.png
+    label: Record
+    action: command
+    params:
+      cmd: "true"
+pages:
+  tools:
+    - image: {icons}/back.png
+      label: Back
+      action: page
+      params:
+        page: main
+"""
+
+
+def _commands(fake):
+    return [struct.unpack('>H', packet[2:4])[0] for packet in fake.writes if packet[:2] == UlanziDevice.HEADER]
+
+
+def _run_daemon(tmp: Path):
+    socket_path = tmp / 'control.sock'
+    config_path = tmp / 'config.yaml'
+    config_path.write_text(CONFIG.format(socket=socket_path, icons=project_root / 'icons'))
+
+    fake = FakeHIDDevice()
+    daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=fake))
+    thread = threading.Thread(target=daemon.run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if socket_path.exists():
+            break
+        time.sleep(0.05)
+    return daemon, fake, socket_path, thread
+
+
+def test_control_methods():
+    """Brightness, pages, buttons and state go through the running daemon"""
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon, fake, socket_path, thread = _run_daemon(Path(tmp))
+        try:
+            with ControlClient(socket_path) as client:
+                assert client.call('get_state')['page'] == 'main'
+
+                fake.clear_writes()
+                assert client.call('set_brightness', level=40) == {'brightness': 40}
+                assert _commands(fake) == [CommandProtocol.OUT_SET_BRIGHTNESS]
+
+                fake.clear_writes()
+                client.call('set_page', page='tools')
+                assert CommandProtocol.OUT_SET_BUTTONS in _commands(fake)
+                assert client.call('get_state')['buttons'][0]['label'] == 'Back'
+
+                fake.clear_writes()
+                client.call('set_button', index=0, label='Home')
+                assert _commands(fake) == [CommandProtocol.OUT_PARTIALLY_UPDATE_BUTTONS]
+
+                try:
+                    client.call('set_page', page='missing')
+                    assert False, "expected ControlError"
+                except ControlError as e:
+                    assert 'Unknown page' in str(e)
+        finally:
+            daemon.stop()
+            thread.join(5)
+        assert not socket_path.exists()
+
+
+def test_subscribe_receives_presses():
+    """Subscribers get press events parsed by the daemon"""
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon, fake, socket_path, thread = _run_daemon(Path(tmp))
+        try:
+            with ControlClient(socket_path) as client:
+                events = client.subscribe(['press'])
+                fake.queue_press(1)
+                first = next(events)
+                second = next(events)
+            assert first == ('press', {'index': 1, 'pressed': True, 'state': 1, 'page': 'main'})
+            assert second[1]['pressed'] is False
+        finally:
+            daemon.stop()
+            thread.join(5)
+
+
+def test_notifications_get_no_response():
+    """Requests without an id get no response, even when they fail"""
+    def fail():
+        raise ControlError("nope")
+
+    server = ControlServer(Path('/nonexistent/control.sock'), {'ping': lambda: 'pong', 'fail': fail})
+    assert server.handle_line(b'{"jsonrpc": "2.0", "method": "ping"}') == (None, None)
+    for line in (b'{"method": "fail"}', b'{"method": "missing"}', b'{"method": "ping", "params": {"x": 1}}',
+                 b'{"method": "ping", "params": [1]}'):
+        assert server.handle_line(line) == (None, None)
+    response, _ = server.handle_line(b'{"id": 7, "method": "missing"}')
+    assert response['id'] == 7 and response['error']['code'] == -32601
+    # Errors where the id cannot be known are still reported
+    assert server.handle_line(b'not json')[0]['error']['code'] == -32700
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests for device info reports and the per-serial capability cache"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench.fakehid import FakeHIDDevice, device_info_report
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import ButtonPress, CommandProtocol, UlanziDevice
+from ulanzi_manager.devinfo import CapabilityCache, DeviceInfo, parse_device_info
+
+ICON = project_root / 'icons/obs.png'
+
+CONFIG = f"""
+control:
+  enabled: false
+snapshot:
+  skip_unchanged_upload: true
+buttons:
+  - {{image: {ICON}, label: OBS, action: command, params: {{cmd: 'true'}}}}
+"""
+
+
+def test_device_info_reports_are_routed_and_cached():
+    assert parse_device_info(b'SN=D200-42|Version=1.2.3|Cols=5;Rows=3\x00\x00') == DeviceInfo(
+        serial='D200-42', firmware='1.2.3', columns=5, rows=3,
+        fields={'SN': 'D200-42', 'Version': '1.2.3', 'Cols': '5', 'Rows': '3'})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CapabilityCache(Path(tmp) / 'devices')
+        fake = FakeHIDDevice(serial='D200-42')
+        device = UlanziDevice(hid_device=fake, capabilities=cache)
+        assert device.info is None and device.identity == 'D200-42'
+
+        presses, infos = [], []
+        device.set_button_callback(presses.append)
+        device.subscribe(CommandProtocol.IN_DEVICE_INFO, infos.append)
+        payload = json.dumps({'SerialNumber': 'D200-42', 'FirmwareVersion': '1.0.9', 'ButtonCount': 14,
+                              'IconSize': '196x196'}).encode()
+        fake.queue_report(device_info_report(payload))
+        fake.queue_press(3)
+
+        # Device info and button reports arrive on the same stream
+        assert isinstance(device.read_report(), DeviceInfo)
+        assert device.read_button_press() == ButtonPress(index=3, pressed=True, state=1)
+        assert presses == [ButtonPress(index=3, pressed=True, state=1)]
+        assert infos == [device.info]
+        assert (device.info.firmware, device.info.buttons, device.info.icon_size) == ('1.0.9', 14, 196)
+
+        # The next connection to the same deck knows it before any report
+        again = UlanziDevice(hid_device=FakeHIDDevice(serial='D200-42'), capabilities=cache)
+        assert again.info == device.info
+        assert UlanziDevice(hid_device=FakeHIDDevice(serial='other'), capabilities=cache).info is None
+
+
+def test_skipped_uploads_are_per_device():
+    """skip_unchanged_upload only trusts the deck that received the last upload"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        cache = CapabilityCache(Path(tmp) / 'devices')
+
+        def start(serial):
+            fake = FakeHIDDevice(serial=serial)
+            daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=fake, capabilities=cache),
+                                  services=False)
+            assert daemon.start()
+            daemon.stop()
+            return fake.command_count(CommandProtocol.OUT_SET_BUTTONS)
+
+        assert start('deck-a') == 1
+        assert start('deck-a') == 0
+        assert start('deck-b') == 1
+        assert start('deck-a') == 0
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests for page switching by focused window"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench import wait_for
+from ulanzi_manager.bench.fakefocus import FakeFocusSource
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.config import ConfigParser
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import UlanziDevice
+from ulanzi_manager.focus import PollSource, _CommandSource
+
+ICON = project_root / 'icons/obs.png'
+
+CONFIG = f"""
+control:
+  enabled: false
+snapshot: false
+prefetch: false
+focus:
+  default: main
+  rules:
+    - {{app: '^obs$', page: obs}}
+    - {{app: firefox, title: youtube, page: media}}
+buttons:
+  - {{image: {ICON}, label: Home, action: command, params: {{cmd: 'true'}}}}
+pages:
+  obs:
+    - {{image: {ICON}, label: Live, action: obs, params: {{action: set_scene, scene: Live}}}}
+  media:
+    - {{image: {ICON}, label: Play, action: key, params: {{keys: space}}}}
+"""
+
+
+def test_focus_rules():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        focus = ConfigParser.load(str(config_path)).focus
+        assert focus.pages() == ['obs', 'media', 'main']
+        assert focus.page_for('obs', 'OBS 30.1 - Profile') == 'obs'
+        assert focus.page_for('Firefox', 'Music - YouTube') == 'media'
+        assert focus.page_for('firefox', 'Docs') == 'main'
+
+        config_path.write_text(CONFIG.replace("app: firefox, title: youtube, ", "")
+                               .replace("'^obs$', page: obs", "'[', page: chat")
+                               .replace("default: main", "default: main\n  backend: kwin"))
+        errors = ConfigParser.load(str(config_path)).errors
+    assert errors == [
+        "config.yaml:8:12: focus.backend must be one of: auto, x11, sway, hyprland, poll",
+        "config.yaml:10:13: focus: invalid pattern '[': unterminated character set at position 0",
+        "config.yaml:10:24: focus: unknown page 'chat'",
+        "config.yaml:11:7: focus rule needs 'app' or 'title'",
+    ]
+
+    # The polling backend reports changes only
+    windows = iter([('xterm', 'a'), ('xterm', 'a'), ('obs', 'b'), ('obs', 'b')])
+    reported = []
+    done = threading.Event()
+    source = PollSource(0.001, query=lambda: next(windows, ('obs', 'b')))
+    source.start(lambda app, title: reported.append((app, title)) or (len(reported) == 2 and done.set()))
+    assert done.wait(5)
+    source.stop()
+    assert reported == [('xterm', 'a'), ('obs', 'b')]
+
+
+def test_focus_switches_to_prebuilt_page():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        source = FakeFocusSource()
+        daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=FakeHIDDevice()),
+                              services=False, focus_source=source)
+        try:
+            assert daemon.start()
+            assert source.running
+            # Rule pages are built ahead of time, even with prefetch disabled
+            assert wait_for(lambda: 'obs' in daemon.pages and 'media' in daemon.pages)
+
+            uploads = []
+            daemon.device.set_buttons = lambda buttons, archive=None: uploads.append((buttons, archive))
+
+            source.focus('obs', 'OBS 30.1')
+            deadline = time.monotonic() + 5
+            daemon.serve(until=lambda: daemon.current_page == 'obs' or time.monotonic() > deadline)
+            assert daemon.current_page == 'obs'
+            assert len(uploads) == 1 and uploads[0][1] is daemon.pages.archive('obs')
+
+            # Title changes of the same app keep the page; other windows fall back to the default
+            source.focus('obs', 'OBS 30.1 - Scene')
+            source.focus('xterm', 'bash')
+            daemon.serve(until=lambda: daemon.current_page == 'main' or time.monotonic() > deadline)
+            assert daemon.current_page == 'main' and len(uploads) == 2
+            assert daemon._rpc_get_state()['focus'] == {'app': 'xterm', 'title': 'bash'}
+            # Pinned pages stay cached after being shown
+            assert 'obs' in daemon.pages and 'media' in daemon.pages
+        finally:
+            daemon.stop()
+        assert not source.running
+
+
+def test_command_sources_are_reaped():
+    class EchoSource(_CommandSource):
+        command = ('sh', '-c', 'echo firefox; exec sleep 30')
+
+        def line(self, line):
+            self.emit(line.strip(), '')
+
+    reported = []
+    source = EchoSource()
+    source.start(lambda app, title: reported.append(app))
+    assert wait_for(lambda: reported == ['firefox'])
+    source.stop()
+    assert source._process.returncode is not None and source._process.stdout.closed
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Tests for emoji/icon-font glyphs and the glyph cache"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from ulanzi_manager.compositor import Compositor
+from ulanzi_manager.glyphs import GlyphCache, codepoints, icon_text
+from ulanzi_manager.icon_generator import IconGenerator, IconSpec
+
+
+def test_icon_names_from_codepoints_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'MaterialSymbolsOutlined[FILL,wght].codepoints').write_text("mic e029\nmic_off e02b\n")
+        (tmp / 'fa-solid-900.json').write_text(json.dumps({'microphone': {'unicode': 'f130'}, 'play': 'f04b'}))
+        material = str(tmp / 'MaterialSymbolsOutlined[FILL,wght].ttf')
+        awesome = str(tmp / 'fa-solid-900.ttf')
+
+        assert codepoints(material) == {'mic': 0xe029, 'mic_off': 0xe02b}
+        assert icon_text('mic_off', material) == '\ue02b'
+        assert icon_text('microphone', awesome) == '\uf130' and icon_text('play', awesome) == '\uf04b'
+        assert icon_text('U+E8B8', None) == '\ue8b8'
+        assert icon_text('★', None) == '★'
+        with pytest.raises(ValueError, match="Unknown icon 'mic_on'"):
+            icon_text('mic_on', material)
+
+
+def test_glyphs_render_once_across_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GlyphCache(Path(tmp) / 'glyphs')
+        first = cache.get(None, 'A', 64, '#FF0000')
+        assert cache.get(None, 'A', 64, '#FF0000') is first
+        assert cache.rendered == 1
+        assert first.getchannel('A').getbbox() == (0, 0) + first.size  # Cropped to the ink
+
+        # A new process finds the bitmap on disk
+        restarted = GlyphCache(Path(tmp) / 'glyphs')
+        assert restarted.get(None, 'A', 64, '#FF0000').tobytes() == first.tobytes()
+        assert (restarted.rendered, restarted.loaded) == (0, 1)
+
+        # Color and size are part of the key
+        restarted.get(None, 'A', 64, '#00FF00')
+        restarted.get(None, 'A', 32, '#FF0000')
+        assert restarted.rendered == 2
+        assert len(list((Path(tmp) / 'glyphs').glob('*.png'))) == 3
+
+
+def test_emoji_and_icon_types_generate():
+    with tempfile.TemporaryDirectory() as tmp:
+        compositor = Compositor(glyphs=GlyphCache(Path(tmp) / 'glyphs'))
+        generator = IconGenerator(cache_dir=Path(tmp), compositor=compositor)
+        path = generator.generate(IconSpec({'type': 'icon', 'icon': 'U+0041', 'color': '#202020'}))
+        assert path.exists() and compositor.glyphs.rendered == 1
+        assert IconSpec({'type': 'icon'}).validate() == ["Icon type requires 'icon' field"]
+        assert IconSpec({'type': 'emoji', 'emoji': '🎙'}).validate() == []
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Tests for config includes, templates and incremental reloads"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.config import ConfigParser
+from ulanzi_manager.snapshot import compile_config
+
+COMMON = """templates:
+  obs:
+    action: obs
+    label_style: {Color: 0xFFFFFF, Align: bottom}
+  scene:
+    extends: obs
+    params: {action: set_scene}
+    icon_spec: {type: text, color: '#202060', text_color: '#FFFFFF'}
+pages:
+  media:
+    - {extends: scene, label: Music, params: {scene: Music}, icon_spec: {text: M}}
+"""
+
+CONFIG = """include: common.yaml
+templates:
+  back:
+    action: page
+    params: {page: main}
+    icon_spec: {type: solid, color: '#404040'}
+buttons:
+  - extends: scene
+    label: Live
+    params: {scene: Live}
+    icon_spec: {text: LIVE}
+  - {extends: [back], params: {page: media}}
+pages:
+  media:
+    - {extends: back, label: Back}
+"""
+
+
+def test_templates_and_includes():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'common.yaml').write_text(COMMON)
+        (tmp / 'config.yaml').write_text(CONFIG)
+        config = ConfigParser.load(str(tmp / 'config.yaml'))
+        assert config.errors == []
+
+        live, media = config.buttons
+        assert (live.action_type, live.action_params) == ('obs', {'action': 'set_scene', 'scene': 'Live'})
+        assert live.icon_spec == {'type': 'text', 'color': '#202060', 'text_color': '#FFFFFF', 'text': 'LIVE'}
+        assert live.label_style == {'Color': 0xFFFFFF, 'Align': 'bottom'}
+        assert (media.action_type, media.action_params) == ('page', {'page': 'media'})
+        # The including file replaces an included page of the same name
+        assert [button.label for button in config.pages['media']] == ['Back']
+        assert config.sources == [str((tmp / name).resolve()) for name in ('config.yaml', 'common.yaml')]
+        assert sorted(config.graph.buttons_using('obs')) == [('main', 0)]
+        assert config.graph.extends['scene'] == ['obs']
+
+        # Errors point into the file that caused them
+        (tmp / 'common.yaml').write_text(COMMON.replace("action: obs", "action: nope"))
+        (tmp / 'config.yaml').write_text(CONFIG.replace("extends: back,", "extends: [back, front],")
+                                         .replace("include: common.yaml", "include: [common.yaml, config.yaml]"))
+        errors = ConfigParser.load(str(tmp / 'config.yaml')).errors
+    assert errors == [
+        "config.yaml:1:24: include cycle: config.yaml -> config.yaml",
+        "config.yaml:15:24: unknown template 'front' (templates: obs, scene, back)",
+        "common.yaml:3:13: Button 0: invalid action type: nope",
+    ]
+
+
+def test_reload_renders_only_changed_buttons():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'common.yaml').write_text(COMMON)
+        (tmp / 'config.yaml').write_text(CONFIG)
+        snapshot, errors = compile_config(tmp / 'config.yaml')
+        assert errors == []
+        icons = {button.name: Path(button.image) for button in snapshot.config.all_buttons()}
+        mtimes = {name: path.stat().st_mtime_ns for name, path in icons.items()}
+        time.sleep(0.01)
+
+        # Edit the shared 'scene' template in the included file
+        (tmp / 'common.yaml').write_text(COMMON.replace("'#202060'", "'#206020'"))
+        reloaded, errors = compile_config(tmp / 'config.yaml', previous=snapshot)
+        assert errors == []
+        rendered = [name for name, path in icons.items() if path.stat().st_mtime_ns != mtimes[name]]
+        assert rendered == ["Button 0"]
+        assert reloaded.config.graph.changed_templates(snapshot.config.graph) == ['scene']
+        assert reloaded.config.buttons[0].icon_spec['color'] == '#206020'
+
+        # Pages whose buttons did not change keep their archive
+        assert reloaded.archives['media'] is snapshot.archives['media']
+        assert reloaded.archives['main'] is not snapshot.archives['main']
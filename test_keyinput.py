@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests for uinput key injection"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.keyinput import (
+    EV_KEY, EV_SYN, INPUT_EVENT, KEY_CODES, UI_DEV_CREATE, UI_DEV_DESTROY, UI_SET_EVBIT, UI_SET_KEYBIT,
+    UINPUT_USER_DEV, KeyInjector, UInputKeyboard, parse_combo,
+)
+
+
+class RecordingIoctl:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, fd, request, arg):
+        self.calls.append((request, arg))
+        return 0
+
+
+def _keyboard():
+    """Keyboard writing to a pipe instead of /dev/uinput"""
+    read_fd, write_fd = os.pipe()
+    ioctl = RecordingIoctl()
+    return UInputKeyboard(fd=write_fd, ioctl=ioctl, settle=0), ioctl, read_fd, write_fd
+
+
+def _events(read_fd):
+    """Key events (code, value) read back from the pipe, with SYN reports as None"""
+    data = os.read(read_fd, 65536)
+    events = []
+    for offset in range(0, len(data), INPUT_EVENT.size):
+        _, _, ev_type, code, value = INPUT_EVENT.unpack_from(data, offset)
+        events.append((code, value) if ev_type == EV_KEY else None)
+        assert ev_type in (EV_KEY, EV_SYN)
+    return events
+
+
+def test_device_setup_and_combo():
+    keyboard, ioctl, read_fd, write_fd = _keyboard()
+    try:
+        keyboard.press(parse_combo('ctrl+shift+t'))
+        requests = [request for request, _ in ioctl.calls]
+        assert requests[0] == UI_SET_EVBIT and requests[-1] == UI_DEV_CREATE
+        assert {arg for request, arg in ioctl.calls if request == UI_SET_KEYBIT} == set(KEY_CODES.values())
+
+        setup = os.read(read_fd, UINPUT_USER_DEV.size)
+        assert setup.startswith(b'Ulanzi Manager virtual keyboard\x00')
+
+        ctrl, shift, t = KEY_CODES['ctrl'], KEY_CODES['shift'], KEY_CODES['t']
+        assert _events(read_fd) == [(ctrl, 1), (shift, 1), (t, 1), None, (t, 0), (shift, 0), (ctrl, 0), None]
+
+        keyboard.close()
+        assert ioctl.calls[-1] == (UI_DEV_DESTROY, 0)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_sequences_and_text():
+    keyboard, ioctl, read_fd, write_fd = _keyboard()
+    try:
+        injector = KeyInjector(keyboard=keyboard)
+        injector.send('ctrl+c ctrl+v', delay=0)
+        os.read(read_fd, UINPUT_USER_DEV.size)
+        ctrl, c, v = KEY_CODES['ctrl'], KEY_CODES['c'], KEY_CODES['v']
+        assert _events(read_fd) == [(ctrl, 1), (c, 1), None, (c, 0), (ctrl, 0), None,
+                                    (ctrl, 1), (v, 1), None, (v, 0), (ctrl, 0), None]
+
+        injector.type_text('Hi!', delay=0)
+        shift, h, i, one = KEY_CODES['shift'], KEY_CODES['h'], KEY_CODES['i'], KEY_CODES['1']
+        assert _events(read_fd) == [(shift, 1), (h, 1), None, (h, 0), (shift, 0), None,
+                                    (i, 1), None, (i, 0), None,
+                                    (shift, 1), (one, 1), None, (one, 0), (shift, 0), None]
+
+        # Per-step delays and nested text
+        injector.send([{'keys': 'Return', 'delay': 1}, {'text': 'a'}], delay=0)
+        enter, a = KEY_CODES['return'], KEY_CODES['a']
+        assert _events(read_fd) == [(enter, 1), None, (enter, 0), None, (a, 1), None, (a, 0), None]
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
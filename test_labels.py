@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Tests for per-button label modes and styles"""
+
+import io
+import json
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from ulanzi_manager.archive import build_button_archive
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.config import ConfigParser, device_buttons
+from ulanzi_manager.daemon import DYNAMIC_LABEL_CHANGES, UlanziDaemon
+from ulanzi_manager.device import UlanziDevice
+
+CONFIG = f"""
+control:
+  enabled: false
+snapshot: false
+label_mode: auto
+buttons:
+  - image: {project_root}/icons/obs.png
+    label: Scene
+    label_mode: device
+    label_style: {{Align: top, Color: 0xFF0000}}
+    action: page
+    params: {{page: main}}
+  - image: {project_root}/icons/obs.png
+    label: Viewers 0
+    action: page
+    params: {{page: main}}
+"""
+
+
+def _manifest(buttons):
+    archive = zipfile.ZipFile(io.BytesIO(build_button_archive(buttons).getvalue()))
+    return json.loads(archive.read('manifest.json')), archive
+
+
+def test_device_and_baked_labels():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        config = ConfigParser.load(str(config_path))
+    assert config.errors == []
+
+    buttons = device_buttons(config.buttons)
+    manifest, archive = _manifest(buttons)
+    # Device label with a per-button style override
+    assert manifest['0_0']['ViewParam'][0] == {'Text': 'Scene', 'Align': 'top', 'Color': 0xFF0000,
+                                               'Icon': 'icons/obs.png'}
+    # 'auto' label of a static button is baked into the icon
+    assert 'Text' not in manifest['1_0']['ViewParam'][0]
+    baked = Image.open(io.BytesIO(archive.read(manifest['1_0']['ViewParam'][0]['Icon'])))
+    original = Image.open(project_root / 'icons/obs.png').convert('RGBA').resize(baked.size)
+    assert baked.size == (196, 196) and baked.tobytes() != original.tobytes()
+
+
+def test_changing_auto_label_moves_to_device():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        fake = FakeHIDDevice()
+        daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=fake), services=False)
+        try:
+            assert daemon.start()
+            button = daemon.config.buttons[1]
+            for count in range(1, DYNAMIC_LABEL_CHANGES + 1):
+                assert button.baked_label
+                daemon._rpc_set_button(1, label=f'Viewers {count}')
+            assert button.dynamic_label and not button.baked_label
+            assert device_buttons([button])[1]['label'] == f'Viewers {DYNAMIC_LABEL_CHANGES}'
+            assert device_buttons([button])[1]['image'] == button.image
+        finally:
+            daemon.stop()
+
+
+def test_baked_labels_use_the_global_style():
+    """Baked labels follow the deck's label_style, like device labels"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG.replace("label_mode: auto", "label_mode: baked"))
+        config = ConfigParser.load(str(config_path))
+    button = config.buttons[1]
+    plain = device_buttons([button])[1]['image_data']
+    assert device_buttons([button], {})[1]['image_data'] == plain
+    assert device_buttons([button], {'Align': 'top'})[1]['image_data'] != plain
+    red = device_buttons([button], {'Color': 0xFF0000})[1]['image_data']
+    assert red != plain
+    # Per-button keys win over the global style
+    button.label_style = {'Color': 0xFFFFFF}
+    assert device_buttons([button], {'Color': 0xFF0000})[1]['image_data'] == plain
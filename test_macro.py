@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Tests for macro actions"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.actions import REGISTRY, ActionExecutor, ActionHandler, ActionRegistry
+from ulanzi_manager.config import ConfigParser
+
+
+class RecordAction(ActionHandler):
+    """Appends (name, thread) to a shared list"""
+
+    calls = []
+
+    def execute(self, params):
+        self.calls.append((params['name'], threading.current_thread().name))
+        if params.get('fail'):
+            raise RuntimeError('step failed')
+
+
+class FakeOBS:
+    """Answers the state queries used by macro conditions"""
+
+    def __init__(self, recording=False, scene='Main'):
+        self.recording = recording
+        self.scene = scene
+
+    def get_record_status(self):
+        return SimpleNamespace(output_active=self.recording)
+
+    def get_current_program_scene(self):
+        return SimpleNamespace(current_program_scene_name=self.scene)
+
+
+def _executor(obs_client=None):
+    registry = ActionRegistry(group=None)
+    registry.register('record', RecordAction)
+    registry.register('macro', REGISTRY.load('macro'))
+    RecordAction.calls = []
+    return ActionExecutor(obs_client, registry=registry)
+
+
+def _names():
+    return [name for name, _ in RecordAction.calls]
+
+
+def test_steps_waits_and_parallel_groups():
+    executor = _executor()
+    try:
+        steps = [
+            {'action': 'record', 'params': {'name': 'first'}},
+            {'wait': 50},
+            {'parallel': [
+                [{'wait': 50}, {'action': 'record', 'params': {'name': 'slow'}}],
+                {'action': 'record', 'params': {'name': 'fast'}},
+            ]},
+            {'action': 'record', 'params': {'name': 'last'}},
+        ]
+        start = time.perf_counter()
+        executor.execute('macro', {'steps': steps}).result(timeout=5)
+        assert time.perf_counter() - start >= 0.1
+        assert _names() == ['first', 'fast', 'slow', 'last']
+        threads = dict(RecordAction.calls)
+        assert threads['fast'] == threads['slow'] == 'macro-branch'
+
+        # A failing step stops the macro
+        RecordAction.calls = []
+        steps = [{'action': 'record', 'params': {'name': 'a', 'fail': True}},
+                 {'action': 'record', 'params': {'name': 'b'}}]
+        assert executor.execute('macro', {'steps': steps}).result(timeout=5) is None
+        assert _names() == ['a']
+    finally:
+        executor.shutdown()
+
+
+def test_conditions_on_obs_state():
+    obs = FakeOBS(recording=True, scene='Live')
+    executor = _executor(obs)
+    try:
+        steps = [
+            {'if': {'recording': True, 'scene': 'Live'},
+             'then': [{'action': 'record', 'params': {'name': 'live'}}],
+             'else': [{'action': 'record', 'params': {'name': 'idle'}}]},
+        ]
+        executor.execute('macro', {'steps': steps}).result(timeout=5)
+        obs.scene = 'Main'
+        executor.execute('macro', {'steps': steps}).result(timeout=5)
+        assert _names() == ['live', 'idle']
+    finally:
+        executor.shutdown()
+
+
+def test_step_errors_carry_line_numbers():
+    config = f"""buttons:
+  - image: {project_root}/icons/obs.png
+    action: macro
+    params:
+      steps:
+        - action: obs
+          params: {{action: set_scene}}
+        - wait: -1
+        - parallel:
+            - {{action: page}}
+        - if: {{recording: maybe}}
+          then: []
+        - wait: 10
+          action: key
+"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(config)
+        errors = ConfigParser.validate(ConfigParser.load(str(config_path)))
+    assert errors == [
+        "config.yaml:7:19: Button 0: 'set_scene' action requires 'scene' parameter",
+        "config.yaml:8:17: Button 0: params.steps[1].wait must be at least 0",
+        "config.yaml:10:24: Button 0: 'page' action requires 'page' parameter",
+        "config.yaml:11:27: Button 0: params.steps[3].if.recording must be true or false",
+        "config.yaml:13:11: Button 0: macro step must have exactly one of: action, wait, parallel, if",
+    ]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the metrics registry and endpoint"""
+
+import http.client
+import socket
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.metrics import MetricsServer, Registry
+
+
+def _registry():
+    registry = Registry()
+    presses = registry.counter('presses_total', 'Presses', 'button')
+    latency = registry.histogram('latency_seconds', 'Latency', 'action', buckets=(0.01, 0.1))
+    presses.inc(label_value='3')
+    presses.inc(label_value='3')
+    latency.observe(0.005, 'command')
+    latency.observe(0.05, 'command')
+    latency.observe(5, 'command')
+    return registry
+
+
+def test_render_prometheus_text():
+    """Counters and cumulative histogram buckets use the text exposition format"""
+    text = _registry().render()
+
+    assert 'presses_total{button="3"} 2' in text
+    assert 'latency_seconds_bucket{action="command",le="0.01"} 1' in text
+    assert 'latency_seconds_bucket{action="command",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{action="command",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{action="command"} 3' in text
+    assert '# TYPE latency_seconds histogram' in text
+
+
+def test_concurrent_updates():
+    """Increments from several threads are not lost, and scrapes see a consistent view"""
+    registry = Registry()
+    presses = registry.counter('presses_total', 'Presses', 'button')
+    latency = registry.histogram('latency_seconds', 'Latency', 'action')
+
+    def record(worker):
+        for i in range(2000):
+            presses.inc(label_value=str(i % 7))
+            latency.observe(0.004, f'{worker}-{i % 5}')
+            if i % 100 == 0:
+                registry.render()
+
+    threads = [threading.Thread(target=record, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(presses.value(str(n)) for n in range(7)) == 8000
+    assert sum(latency.count(f'{w}-{n}') for w in range(4) for n in range(5)) == 8000
+
+
+def test_http_endpoint():
+    """The registry is served on a localhost port"""
+    server = MetricsServer('127.0.0.1:0', _registry())
+    server.start()
+    try:
+        host, port = server.address
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        conn.request('GET', '/metrics')
+        response = conn.getresponse()
+        assert response.status == 200
+        assert b'presses_total{button="3"} 2' in response.read()
+    finally:
+        server.stop()
+
+
+def test_unix_socket_endpoint():
+    """The registry is served on a Unix socket"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'metrics.sock')
+        server = MetricsServer(f'unix:{path}', _registry())
+        server.start()
+        try:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.settimeout(5)
+            client.connect(path)
+            client.sendall(b'GET /metrics HTTP/1.0\r\n\r\n')
+            data = b''
+            while chunk := client.recv(4096):
+                data += chunk
+            client.close()
+            assert data.startswith(b'HTTP/1.0 200')
+            assert b'presses_total{button="3"} 2' in data
+        finally:
+            server.stop()
+        assert not Path(path).exists()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests for background page prefetch"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench import wait_for
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import UlanziDevice
+from ulanzi_manager.metrics import PAGE_CACHE
+from ulanzi_manager.prefetch import PageCache, adjacent_pages
+from ulanzi_manager.snapshot import compile_config
+
+ICON = project_root / 'icons/obs.png'
+
+CONFIG = f"""
+control:
+  enabled: false
+snapshot: false
+buttons:
+  - {{image: {ICON}, label: Media, action: page, params: {{page: media}}}}
+  - {{image: {ICON}, label: Lights, action: page, params: {{page: lights}}}}
+pages:
+  media:
+    - {{image: {ICON}, label: Back, action: page, params: {{page: main}}}}
+    - image: {ICON}
+      label: Settings
+      action: macro
+      params:
+        steps:
+          - {{action: key, params: {{keys: F9}}}}
+          - if: {{recording: false}}
+            then: [{{action: page, params: {{page: settings}}}}]
+  lights:
+    - {{image: {ICON}, label: Back, action: page, params: {{page: main}}}}
+  settings:
+    - {{image: {ICON}, label: Back, action: page, params: {{page: media}}}}
+"""
+
+
+def test_adjacent_pages_are_prefetched():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=FakeHIDDevice()), services=False)
+        try:
+            assert daemon.start()
+            assert adjacent_pages(daemon.config, 'main') == ['media', 'lights']
+            assert adjacent_pages(daemon.config, 'media') == ['main', 'settings']
+
+            assert wait_for(lambda: 'media' in daemon.pages and 'lights' in daemon.pages)
+            hits, misses = PAGE_CACHE.value('hit'), PAGE_CACHE.value('miss')
+            daemon.set_page('media')
+            assert (PAGE_CACHE.value('hit'), PAGE_CACHE.value('miss')) == (hits + 1, misses)
+
+            # Pages reachable through macro steps are prefetched too
+            assert wait_for(lambda: 'settings' in daemon.pages)
+
+            # A changed page is dropped and built again on its next visit
+            daemon._rpc_set_button(0, label='Home', page='main')
+            assert 'main' not in daemon.pages
+        finally:
+            daemon.stop()
+
+
+def test_cache_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        snapshot, errors = compile_config(config_path)
+        assert errors == [] and snapshot.archives == {}
+
+        pages = PageCache(snapshot, max_pages=2)
+        for page in ('media', 'lights', 'settings'):
+            pages.archive(page)
+        assert 'media' not in pages and 'lights' in pages and 'settings' in pages
+
+        size = pages.archive('lights').size
+        pages = PageCache(snapshot, max_bytes=size + size // 2)
+        pages.archive('lights')
+        pages.archive('settings')
+        assert 'lights' not in pages and pages.bytes <= size + size // 2
+
+        # Pages compiled into the snapshot are served from it
+        compiled = snapshot.archive('media')
+        assert PageCache(snapshot).archive('media') is compiled
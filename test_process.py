@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Tests for process supervision"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.actions import ActionExecutor
+from ulanzi_manager.bench import wait_for
+from ulanzi_manager.process import ProcessManager
+
+
+def _is_zombie(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] == 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def test_children_are_reaped_with_output():
+    manager = ProcessManager()
+    try:
+        process = manager.start('Button 1', 'echo out; echo err >&2; exit 3', shell=True, capture=True)
+        assert wait_for(lambda: not process.running)
+        assert process.exit_code == 3
+        assert not _is_zombie(process.pid)
+        assert sorted(process.output) == [('stderr', 'err'), ('stdout', 'out')]
+        assert manager.snapshot()['recent'][0]['exit_code'] == 3
+    finally:
+        manager.shutdown()
+
+
+def test_modes_and_limits():
+    manager = ProcessManager()
+    try:
+        first = manager.start('Button 2', ['sleep', '30'], mode='single')
+        assert manager.start('Button 2', ['sleep', '30'], mode='single') is None
+
+        # toggle stops the running instance instead of starting another
+        assert manager.start('Button 2', ['sleep', '30'], mode='toggle') is None
+        assert wait_for(lambda: not first.running)
+        assert first.exit_code == -15
+
+        started = [manager.start('Button 3', ['sleep', '30'], max_instances=2) for _ in range(3)]
+        assert [process is not None for process in started] == [True, True, False]
+        for process in started[:2]:
+            manager.terminate(process)
+        assert wait_for(lambda: not manager.running())
+    finally:
+        manager.shutdown()
+
+
+def test_timeout_stops_process_group():
+    manager = ProcessManager()
+    try:
+        # The shell's child is in the same process group and is stopped too
+        process = manager.start('Button 4', 'sleep 30 & echo $!; wait', shell=True, timeout=0.2, capture=True)
+        assert wait_for(lambda: process.output)
+        grandchild = int(process.output[0][1])
+        assert wait_for(lambda: not process.running)
+        assert process.timed_out
+        assert wait_for(lambda: not os.path.exists(f'/proc/{grandchild}') or _is_zombie(grandchild))
+    finally:
+        manager.shutdown()
+
+
+def test_command_action_keyed_by_button():
+    executor = ActionExecutor()
+    try:
+        params = {'cmd': 'sleep 30', 'mode': 'toggle'}
+        executor.execute('command', params, button='Button 5')
+        executor.execute('command', params, button='Button 6')
+        processes = executor.context.processes
+        assert {p.key for p in processes.running()} == {'Button 5', 'Button 6'}
+
+        executor.execute('command', params, button='Button 5')
+        assert wait_for(lambda: [p.key for p in processes.running()] == ['Button 6'])
+        executor.execute('command', params, button='Button 6')
+        assert wait_for(lambda: not processes.running())
+    finally:
+        executor.shutdown()
+
+
+def test_commands_outlive_the_daemon():
+    """Commands write to /dev/null unless captured, so they keep running after shutdown"""
+    with tempfile.TemporaryDirectory() as tmp:
+        marker = Path(tmp) / 'done'
+        executor = ActionExecutor()
+        executor.execute('command', {'cmd': f'sleep 0.2; for i in 1 2 3; do echo line; done; touch {marker}'},
+                         button='Button 7')
+        process = executor.context.processes.running('Button 7')[0]
+        assert not process._pipes
+        executor.shutdown()
+        assert process._pidfd is None
+        assert wait_for(lambda: marker.exists())
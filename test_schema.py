@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Tests for schema-driven config validation"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.config import ConfigParser
+from ulanzi_manager.schema import ACTION_SCHEMAS, Field, Schema, register_action_schema
+
+CONFIG = f"""
+brightness: 140
+buttons:
+  - image: {project_root}/icons/obs.png
+    action: command
+  - icon_spec:
+      type: text
+      font_size: 200
+    action: page
+    params:
+      page: nowhere
+pages:
+  tools:
+    - image: missing.png
+      action: frobnicate
+"""
+
+
+def _load(text: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(text)
+        config = ConfigParser.load(str(config_path))
+        return ConfigParser.validate(config)
+
+
+def test_errors_carry_line_and_column():
+    errors = _load(CONFIG)
+    assert errors[:5] == [
+        "config.yaml:2:13: brightness must be between 0 and 100",
+        "config.yaml:5:13: Button 0: 'command' action requires 'cmd' parameter",
+        "config.yaml:8:18: Button 1: icon_spec.font_size must be between 1 and 150",
+        "config.yaml:7:7: Button 1: icon_spec: 'text' type requires 'text'",
+        "config.yaml:11:13: Button 1: 'page' action refers to unknown page 'nowhere'",
+    ]
+    assert errors[5].startswith("config.yaml:14:14: Page 'tools' button 0: image file not found:")
+    assert errors[6:] == ["config.yaml:15:15: Page 'tools' button 0: invalid action type: frobnicate"]
+
+
+def test_registered_action_schema():
+    """Plugins declare the params of their own action types"""
+    register_action_schema('notify', Schema({
+        'message': Field('str', required=True),
+        'urgency': Field('str', choices=('low', 'normal', 'critical')),
+    }))
+    try:
+        base = f"buttons:\n  - image: {project_root}/icons/obs.png\n    action: notify\n"
+        assert _load(base + "    params:\n      message: hi\n") == []
+        assert _load(base + "    params:\n      message: hi\n      urgency: loud\n") == [
+            "config.yaml:6:16: Button 0: params.urgency must be one of: low, normal, critical",
+        ]
+    finally:
+        del ACTION_SCHEMAS['notify']
+
+
+def test_non_scalar_action_is_a_schema_error():
+    base = f"buttons:\n  - image: {project_root}/icons/obs.png\n"
+    assert _load(base + "    action: {x: 1}\n") == ["config.yaml:3:13: Button 0: action must be a string"]
+    errors = _load(base + "    action: macro\n    params:\n      steps:\n        - action: [obs]\n")
+    assert errors == ["config.yaml:6:19: Button 0: params.steps[0].action must be a string"]
+
+
+def test_large_config_validates_quickly():
+    """Schema validation of a 20-page config stays in the millisecond range"""
+    button = (f"    - image: {project_root}/icons/obs.png\n      label: B\n      action: obs\n"
+              "      params:\n        action: toggle_scene\n        scene1: A\n        scene2: B\n")
+    pages = ''.join(f"  p{page}:\n" + button * 13 for page in range(20))
+    text = "buttons: []\npages:\n" + pages
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(text)
+        ConfigParser.load(str(config_path))
+
+        start = time.perf_counter()
+        config = ConfigParser.load(str(config_path))
+        elapsed = time.perf_counter() - start
+
+    assert ConfigParser.validate(config) == []
+    assert len(config.all_buttons()) == 260
+    assert elapsed < 0.5
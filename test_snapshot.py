@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Tests for compiled config snapshots"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import CommandProtocol, UlanziDevice
+from ulanzi_manager.snapshot import compile_config, snapshot_path
+
+CONFIG = """
+brightness: 70
+control:
+  enabled: false
+snapshot:
+  skip_unchanged_upload: {skip}
+buttons:
+  - image: ./images/obs.png
+    label: OBS
+    action: command
+    params:
+      cmd: "true"
+  - icon_spec:
+      type: text
+      color: '#FF6600'
+      text: REC
+    label: Record
+    action: command
+    params:
+      cmd: "true"
+"""
+
+
+def _write_config(tmp: Path, skip: bool = False) -> Path:
+    (tmp / 'images').mkdir(exist_ok=True)
+    (tmp / 'images' / 'obs.png').write_bytes((project_root / 'icons' / 'obs.png').read_bytes())
+    config_path = tmp / 'config.yaml'
+    config_path.write_text(CONFIG.format(skip='true' if skip else 'false'))
+    return config_path
+
+
+def test_snapshot_reused_until_inputs_change():
+    """The snapshot is reused for identical inputs and rebuilt when the YAML or an image changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _write_config(Path(tmp))
+
+        first, errors = compile_config(config_path)
+        assert errors == []
+        assert snapshot_path(config_path).exists()
+        assert len(first.dependencies) == 2  # the image and the generated icon
+
+        second, _ = compile_config(config_path)
+        assert second.config_hash == first.config_hash
+        assert second.archives['main'].getvalue() == first.archives['main'].getvalue()
+        assert second.config.buttons[1].label == 'Record'
+
+        # Touching an image invalidates it
+        image = Path(tmp) / 'images' / 'obs.png'
+        stat = image.stat()
+        os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        third, _ = compile_config(config_path)
+        assert third.dependencies[str(image)] != first.dependencies[str(image)]
+
+        # So does editing the YAML
+        config_path.write_text(config_path.read_text().replace('label: OBS', 'label: Stream'))
+        fourth, _ = compile_config(config_path)
+        assert fourth.config.buttons[0].label == 'Stream'
+        assert fourth.config_hash != first.config_hash
+
+
+def test_snapshot_disabled_removes_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _write_config(Path(tmp))
+        compile_config(config_path)
+        assert snapshot_path(config_path).exists()
+
+        config_path.write_text(config_path.read_text().replace('snapshot:\n  skip_unchanged_upload: false',
+                                                               'snapshot: false'))
+        snapshot, errors = compile_config(config_path)
+        assert errors == [] and snapshot is not None
+        assert not snapshot_path(config_path).exists()
+
+
+def _start(config_path: Path):
+    fake = FakeHIDDevice()
+    daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=fake))
+    assert daemon.start()
+    daemon.stop()
+    return fake
+
+
+def test_skip_unchanged_upload():
+    """With skip_unchanged_upload, a restart with an unchanged snapshot sends no button archive"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _write_config(Path(tmp), skip=True)
+        assert _start(config_path).command_count(CommandProtocol.OUT_SET_BUTTONS) == 1
+        assert _start(config_path).command_count(CommandProtocol.OUT_SET_BUTTONS) == 0
+
+        config_path.write_text(config_path.read_text().replace('label: OBS', 'label: Stream'))
+        assert _start(config_path).command_count(CommandProtocol.OUT_SET_BUTTONS) == 1
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Startup regression tests for key-bound CLI invocations
+
+Each command runs in a fresh interpreter with -X importtime against a stub
+control socket, so the measurement covers exactly what a keyboard shortcut
+pays for.
+"""
+
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.control import ControlServer
+
+# Modules that must never load for daemon-backed commands
+HEAVY_MODULES = ('PIL', 'yaml', 'hid', 'deepdiff', 'http.server', 'ulanzi_manager.device',
+                 'ulanzi_manager.config', 'ulanzi_manager.daemon')
+
+# Import time of everything a subcommand loads (the CLI module and whatever
+# it imports while running the command), per subcommand
+STARTUP_BUDGET_MS = {
+    'brightness': 150,  # CLI + control client
+    'page': 150,  # CLI + control client
+    'status': 175,  # CLI + control client + state formatting
+}
+
+COMMANDS = {
+    'brightness': ['brightness', '80'],
+    'page': ['page', 'main'],
+    'status': ['status'],
+}
+
+
+def _stub_methods():
+    return {
+        'set_brightness': lambda level: {'brightness': level},
+        'set_page': lambda page: {'page': page},
+        'get_state': lambda: {'config': 'stub.yaml', 'page': 'main', 'pages': ['main'],
+                              'brightness': 80, 'dimmed': False, 'obs_connected': False, 'buttons': []},
+    }
+
+
+def _run_importtime(socket_path: Path, argv):
+    """Run the CLI and return ({module: cumulative_us}, command import us, completed process).
+
+    The command's import time is the CLI module's cumulative time plus every
+    top-level import that follows it, i.e. the modules loaded lazily while
+    the subcommand runs; interpreter startup imports come before it.
+    """
+    proc = subprocess.run(
+        # Same entry point as the installed console script
+        [sys.executable, '-X', 'importtime', '-c', 'from ulanzi_manager.cli import main; main()',
+         '--socket', str(socket_path)] + argv,
+        cwd=str(project_root), capture_output=True, text=True, timeout=30,
+    )
+    modules = {}
+    command_us = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+        top_level = not name[1:].startswith(' ')  # Nested imports are indented
+        if name.strip() == 'ulanzi_manager.cli':
+            command_us = int(cumulative)
+        elif top_level and command_us is not None:
+            command_us += int(cumulative)
+    return modules, command_us, proc
+
+
+def test_daemon_commands_skip_heavy_imports():
+    """brightness/page/status only load the control client when a daemon is running"""
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = Path(tmp) / 'control.sock'
+        server = ControlServer(socket_path, _stub_methods())
+        server.start()
+        try:
+            for name, argv in COMMANDS.items():
+                modules, command_us, proc = _run_importtime(socket_path, argv)
+                assert proc.returncode == 0, proc.stderr
+
+                loaded = [m for m in modules if m in HEAVY_MODULES or m.startswith(('PIL.', 'yaml.'))]
+                assert not loaded, f"{name} imported {loaded}"
+
+                assert 'ulanzi_manager.control' in modules  # Loaded lazily, counted in command_us
+                assert command_us < STARTUP_BUDGET_MS[name] * 1000, \
+                    f"{name}: imports took {command_us / 1000:.1f} ms"
+        finally:
+            server.stop()
+
+
+def test_daemon_import_has_no_side_effects():
+    """Importing the daemon module must not create directories or configure logging"""
+    with tempfile.TemporaryDirectory() as home:
+        proc = subprocess.run(
+            [sys.executable, '-c',
+             'import logging, ulanzi_manager.daemon; assert not logging.getLogger().handlers'],
+            cwd=str(project_root), capture_output=True, text=True, timeout=30,
+            env={'HOME': home, 'PATH': '/usr/bin:/bin'},
+        )
+        assert proc.returncode == 0, proc.stderr
+        assert not (Path(home) / '.local').exists()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Tests for per-button state machines"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.bench.fakehid import FakeHIDDevice
+from ulanzi_manager.config import ConfigParser, device_buttons
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import ButtonPress, UlanziDevice
+
+CONFIG = f"""
+control:
+  enabled: false
+snapshot: false
+buttons:
+  - label: Mic
+    states:
+      - {{name: live, image: {project_root}/icons/obs.png}}
+      - {{name: muted, icon_spec: {{type: text, text: MUTED, color: '#800000'}}, label: Muted}}
+    state_from: {{obs: muted, input: Mic/Aux}}
+    action: obs
+    params: {{action: toggle_mute, input: Mic/Aux}}
+  - states:
+      - {{name: off, icon_spec: {{type: solid, color: '#202020'}}}}
+      - {{name: on, icon_spec: {{type: solid, color: '#00C000'}}}}
+    state: 1
+    state_from: press
+    action: page
+    params: {{page: main}}
+  - states:
+      - {{name: ok, icon_spec: {{type: solid, color: '#00C000'}}, label: OK}}
+      - {{name: failed, icon_spec: {{type: solid, color: '#C00000'}}, label: Failed}}
+    state_from: exit_code
+    action: command
+    params: {{cmd: 'exit 3'}}
+"""
+
+
+def _daemon(tmp):
+    config_path = Path(tmp) / 'config.yaml'
+    config_path.write_text(CONFIG)
+    return UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=FakeHIDDevice()), services=False)
+
+
+def test_states_are_rendered_at_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(CONFIG)
+        config = ConfigParser.load(str(config_path))
+        assert config.errors == []
+        mic, toggle, check = config.buttons
+
+        assert [state.label for state in mic.states] == ['Mic', 'Muted']
+        assert all(Path(state.image).exists() for button in config.buttons for state in button.states)
+        assert (mic.image, mic.label) == (str(project_root / 'icons/obs.png'), 'Mic')
+        assert toggle.image == toggle.states[1].image and device_buttons([toggle])[1]['state'] == 1
+
+        (Path(tmp) / 'bad.yaml').write_text("""buttons:
+  - states: [{name: one, image: ./missing.png}]
+    state_from: {obs: muted}
+    action: page
+    params: {page: main}
+  - image: ./missing.png
+    state_from: exit_code
+    action: page
+    params: {page: main}
+""")
+        errors = ConfigParser.load(str(Path(tmp) / 'bad.yaml')).errors
+    assert errors == [
+        f"bad.yaml:2:33: Button 0: image file not found: {Path(tmp) / 'missing.png'}",
+        "bad.yaml:3:17: Button 0: state_from: 'muted' requires 'input'",
+        "bad.yaml:2:13: Button 0: states must list at least 2 states",
+        f"bad.yaml:6:12: Button 1: image file not found: {Path(tmp) / 'missing.png'}",
+        "bad.yaml:7:17: Button 1: state_from requires 'states'",
+    ]
+
+
+def test_state_changes_upload_prebuilt_archives():
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon = _daemon(tmp)
+        try:
+            assert daemon.start()
+            mic, toggle, check = daemon.config.buttons
+            # Encoded while loading
+            assert len(daemon.snapshot.state_archives) == 3
+
+            updates = []
+            daemon.device.update_buttons = lambda buttons, archive=None: updates.append((buttons, archive))
+
+            daemon._on_button_press(ButtonPress(1, False, 0))
+            assert toggle.state == 0 and updates[-1][1] is daemon.snapshot.state_archive(toggle, 0)
+
+            # OBS events select the state of matching buttons only
+            daemon._on_obs_event('InputMuteStateChanged', SimpleNamespace(input_name='Desktop', input_muted=True))
+            assert mic.state == 0 and len(updates) == 1
+            daemon._on_obs_event('InputMuteStateChanged', SimpleNamespace(input_name='Mic/Aux', input_muted=True))
+            assert (mic.state, mic.label) == (1, 'Muted')
+            assert updates[-1] == (device_buttons([mic]), daemon.snapshot.state_archive(mic, 1))
+            assert daemon._rpc_get_state()['buttons'][0]['state'] == 'muted'
+
+            # The exit code of the button's command selects its state
+            daemon._on_button_press(ButtonPress(2, False, 0))
+            deadline = time.monotonic() + 5
+            daemon.serve(until=lambda: check.state == 1 or time.monotonic() > deadline)
+            assert (check.state, check.label) == (1, 'Failed')
+
+            assert daemon._rpc_set_state(2, 'ok') == {'index': 2, 'page': 'main', 'state': 'ok'}
+            assert check.image == check.states[0].image and len(updates) == 4
+        finally:
+            daemon.stop()
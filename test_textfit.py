@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Tests for auto-fit text layout"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.icon_generator import IconGenerator, IconSpec
+from ulanzi_manager.textfit import ELLIPSIS, fit_text, line_height, text_width
+
+BOX = (172, 172)
+
+
+def _fits(fitted, box=BOX):
+    return all(text_width(None, fitted.size, line) <= box[0] for line in fitted.lines) and \
+        len(fitted.lines) * line_height(None, fitted.size) <= box[1]
+
+
+def test_largest_size_that_fits():
+    short = fit_text('REC', BOX)
+    longer = fit_text('Start recording now', BOX)
+    assert short.size > longer.size
+    assert _fits(short) and _fits(longer)
+    assert len(longer.lines) > 1 and ' '.join(longer.lines) == 'Start recording now'
+    # One size larger no longer fits
+    assert fit_text('REC', BOX, min_size=short.size + 1, max_size=short.size + 1).truncated
+
+    # Explicit line breaks are kept
+    assert fit_text('Scene\nMain', BOX).lines == ['Scene', 'Main']
+
+
+def test_overflow_is_ellipsized():
+    text = 'a very long label that cannot possibly fit on a small key ' * 4
+    fitted = fit_text(text, (80, 40), min_size=14, max_lines=2)
+    assert fitted.truncated and fitted.size == 14
+    assert len(fitted.lines) <= 2 and fitted.lines[-1].endswith(ELLIPSIS)
+    assert _fits(fitted, (80, 40))
+
+
+def test_measurements_are_memoized():
+    fit_text('Toggle microphone', BOX)
+    hits = text_width.cache_info().hits
+    misses = text_width.cache_info().misses
+    fit_text('Toggle microphone', BOX)
+    assert text_width.cache_info().misses == misses
+    assert text_width.cache_info().hits > hits
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spec = IconSpec({'type': 'text', 'text': 'Toggle microphone', 'font_size': 'auto'})
+        assert spec.validate() == []
+        assert IconGenerator(cache_dir=Path(tmp)).generate(spec).exists()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Tests for press/action tracing and trace replay"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from ulanzi_manager.actions import ActionHandler, ActionRegistry, PageAction
+from ulanzi_manager.bench.fakehid import FakeHIDDevice, device_info_report
+from ulanzi_manager.daemon import UlanziDaemon
+from ulanzi_manager.device import UlanziDevice
+from ulanzi_manager.schema import ACTION_SCHEMAS, register_action_schema
+from ulanzi_manager.trace import TRACE, load_trace, replay_trace, summarize_trace
+
+CONFIG = f"""
+control:
+  enabled: false
+buttons:
+  - image: {project_root}/icons/obs.png
+    action: count
+  - image: {project_root}/icons/obs.png
+    action: page
+    params:
+      page: second
+pages:
+  second:
+    - image: {project_root}/icons/obs.png
+      action: page
+      params:
+        page: main
+"""
+
+
+class CountAction(ActionHandler):
+    runs = 0
+
+    def execute(self, params):
+        CountAction.runs += 1
+
+
+def _registry():
+    registry = ActionRegistry(group=None)
+    registry.register('count', CountAction)
+    registry.register('page', PageAction)
+    return registry
+
+
+def test_trace_summary_and_replay():
+    register_action_schema('count')
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = Path(tmp) / 'config.yaml'
+            config_path.write_text(CONFIG)
+
+            fake = FakeHIDDevice()
+            fake.queue_press(0)
+            fake.queue_press(1, delay=0.02)  # Switch to 'second'
+            fake.queue_press(0, delay=0.02)  # Back to main
+            fake.queue_press(0, delay=0.02)
+
+            daemon = UlanziDaemon(str(config_path), device=UlanziDevice(hid_device=fake), registry=_registry(),
+                                  services=False)
+            TRACE.enable()
+            try:
+                assert daemon.start()
+                daemon.serve(until=lambda: not fake.pending_reports())
+                daemon.executor.shutdown(wait=True)
+            finally:
+                TRACE.disable()
+                daemon.stop()
+
+            trace_path = Path(tmp) / 'trace.jsonl'
+            assert TRACE.dump(trace_path, config=str(config_path)) == len(TRACE.events)
+            header, events = load_trace(trace_path)
+            assert header['config'] == str(config_path) and header['dropped'] == 0
+            assert [e['index'] for e in events if e['e'] == 'press' and not e['pressed']] == [0, 1, 0, 0]
+
+            summary = summarize_trace(events)
+            assert summary['presses'] == 4
+            assert CountAction.runs == 2
+            assert summary['latency']['press_to_done']['iterations'] == 4
+            assert summary['actions']['count']['iterations'] == 2
+            assert summary['hid_write']['OUT_SET_BUTTONS']['iterations'] == 3  # Startup and two page switches
+
+            # Replaying against the same config reproduces the same presses and uploads;
+            # actions other than page switches are skipped
+            replayed = summarize_trace(replay_trace(events, str(config_path), speed=0))
+            assert CountAction.runs == 2
+            assert replayed['presses'] == 4
+            assert replayed['actions'].keys() == summary['actions'].keys()
+            assert replayed['hid_write']['OUT_SET_BUTTONS']['iterations'] == 3
+    finally:
+        del ACTION_SCHEMAS['count']
+
+
+def test_traced_reports_keep_their_payload():
+    """Reports longer than a button report replay the same as they were read"""
+    report = device_info_report(b'SN=D200-42|Version=1.2.3|Cols=5;Rows=3')
+    fake = FakeHIDDevice()
+    fake.queue_report(report)
+    TRACE.enable()
+    try:
+        live = UlanziDevice(hid_device=fake).read_report()
+    finally:
+        TRACE.disable()
+    [(_, kind, fields)] = TRACE.events
+    assert kind == 'hid_read' and len(bytes.fromhex(fields['report'])) == 8 + 38
+
+    replay = FakeHIDDevice()
+    replay.queue_report(bytes.fromhex(fields['report']).ljust(UlanziDevice.PACKET_SIZE, b'\x00'))
+    assert UlanziDevice(hid_device=replay).read_report() == live
+
+
+def test_disabled_tracing_records_nothing():
+    TRACE.enable()
+    TRACE.disable()
+    fake = FakeHIDDevice()
+    fake.queue_press(0)
+    device = UlanziDevice(hid_device=fake)
+    while fake.pending_reports():
+        device.read_button_press()
+    device.set_brightness(50)
+    assert TRACE.recorded == 0
@@ -1,42 +1,139 @@
-"""Action handlers for button presses"""
+"""Action handlers for button presses
 
-import subprocess
+Action types are looked up in an ActionRegistry. Built-in handlers are
+registered below; third-party handlers are discovered through the
+'ulanzi_manager.actions' entry point group, which is only scanned the
+first time an unknown action type is used. For example, in a plugin's
+setup.py:
+
+    entry_points={'ulanzi_manager.actions': ['webhook = ulanzi_webhook:WebhookAction']}
+"""
+
+import importlib
+import inspect
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Union
 from abc import ABC, abstractmethod
 
+from ulanzi_manager.metrics import ACTION_ERRORS, ACTION_LATENCY, ACTIONS_DROPPED
+from ulanzi_manager.process import DEFAULT_MAX_INSTANCES, MODES as PROCESS_MODES, ProcessManager
+from ulanzi_manager.schema import Field, Schema, Validator, action_schema
+from ulanzi_manager.trace import TRACE
+
 logger = logging.getLogger(__name__)
 
+ENTRY_POINT_GROUP = 'ulanzi_manager.actions'
+
+# Worker threads shared by blocking actions
+ACTION_WORKERS = 4
+
+# Name of the button whose action is running (e.g. "Button 3"), None outside the daemon
+current_button: ContextVar[Optional[str]] = ContextVar('current_button', default=None)
+
+
+@dataclass
+class ActionContext:
+    """Daemon services available to action handlers"""
+    obs_client: Any = None
+    switch_page: Optional[Callable[[str], None]] = None
+    processes: ProcessManager = field(default_factory=ProcessManager)
+    obs_lock: threading.Lock = field(default_factory=threading.Lock)  # One OBS request at a time
+    # Run a callable on the daemon loop and return its result (inline outside the daemon)
+    run_on_loop: Callable[..., Any] = lambda func, *args, **kwargs: func(*args, **kwargs)
+    executor: Optional['ActionExecutor'] = None
+
 
 class ActionHandler(ABC):
-    """Base class for action handlers"""
+    """Base class for action handlers.
+
+    Class attributes declare how the executor runs the handler:
+    - schema: Schema of the action params, checked when the config loads
+    - blocking: run on the worker pool instead of the daemon loop
+    - max_concurrency: executions allowed at once (None: unlimited);
+      presses beyond the limit are dropped
+    - serial: run blocking executions one at a time, in press order, on a
+      worker of their own; later presses wait their turn
+
+    execute() may also be a coroutine function; it then runs on the
+    executor's asyncio loop.
+    """
+
+    schema: Optional[Schema] = None
+    blocking: bool = True
+    max_concurrency: Optional[int] = None
+    serial: bool = False
+
+    def __init__(self, context: Optional[ActionContext] = None):
+        self.context = context or ActionContext()
 
     @abstractmethod
     def execute(self, params: Dict[str, Any]):
         """Execute the action"""
         pass
 
+    def close(self):
+        """Release resources held between executions (called when the daemon stops)"""
+        pass
+
+
+# Supervision params shared by command and app actions
+PROCESS_FIELDS = {
+    'mode': Field('str', choices=PROCESS_MODES),  # parallel, single or toggle
+    'max_instances': Field('int', minimum=1),
+    'timeout': Field('number', minimum=0),  # Seconds before the process group is stopped
+    # Keep the last lines of output for the status API. Opt-in: the output goes
+    # to a pipe held by the daemon, which closes when the daemon exits
+    'capture': Field('bool'),
+}
+
+
+class ProcessAction(ActionHandler):
+    """Base for actions that start a supervised process"""
+
+    blocking = False  # start() returns once the process is spawned
+
+    def spawn(self, command, shell: bool, params: Dict[str, Any]):
+        key = current_button.get() or (command if isinstance(command, str) else ' '.join(command))
+        return self.context.processes.start(
+            key, command, shell=shell,
+            mode=params.get('mode', 'parallel'),
+            max_instances=params.get('max_instances', DEFAULT_MAX_INSTANCES),
+            timeout=params.get('timeout'),
+            capture=params.get('capture', False),
+        )
 
-class CommandAction(ActionHandler):
+
+class CommandAction(ProcessAction):
     """Execute shell commands"""
 
+    schema = action_schema('command', dict(PROCESS_FIELDS, cmd=Field(('str', 'list'), required=True)))
+
     def execute(self, params: Dict[str, Any]):
-        """Execute shell command"""
+        """Execute shell command (a string runs through the shell, a list directly)"""
         cmd = params.get('cmd')
         if not cmd:
             logger.error("Command action requires 'cmd' parameter")
             return
 
         try:
-            subprocess.Popen(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            logger.info(f"Executed command: {cmd}")
+            if isinstance(cmd, str):
+                self.spawn(cmd, True, params)
+            else:
+                self.spawn([str(arg) for arg in cmd], False, params)
         except Exception as e:
             logger.error(f"Failed to execute command: {e}")
 
 
-class AppAction(ActionHandler):
+class AppAction(ProcessAction):
     """Launch applications"""
 
+    schema = action_schema('app', dict(PROCESS_FIELDS, name=Field('str', required=True)))
+
     def execute(self, params: Dict[str, Any]):
         """Launch application"""
         app_name = params.get('name')
@@ -45,38 +142,97 @@ class AppAction(ActionHandler):
             return
 
         try:
-            subprocess.Popen([app_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            logger.info(f"Launched application: {app_name}")
+            self.spawn([app_name], False, params)
         except Exception as e:
             logger.error(f"Failed to launch application: {e}")
 
 
+def _check_key_params(validator: Validator, node, values: Dict):
+    if 'keys' not in values and 'text' not in values:
+        validator.error(node, "'key' action requires 'keys' or 'text' parameter")
+
+
 class KeyAction(ActionHandler):
     """Simulate keyboard input"""
 
+    schema = action_schema('key', {
+        'keys': Field(('str', 'list')),
+        'text': Field('scalar'),
+        'delay': Field('number', minimum=0),  # Milliseconds between keys
+    }, _check_key_params)
+    serial = True  # Overlapping key sequences would interleave
+
+    def __init__(self, context: Optional[ActionContext] = None):
+        super().__init__(context)
+        self.injector = None  # Opened on first use, kept until the daemon stops
+
     def execute(self, params: Dict[str, Any]):
         """Simulate keyboard input"""
         keys = params.get('keys')
-        if not keys:
-            logger.error("Key action requires 'keys' parameter")
+        text = params.get('text')
+        if not keys and not text:
+            logger.error("Key action requires 'keys' or 'text' parameter")
             return
 
+        from ulanzi_manager.keyinput import DEFAULT_DELAY, KeyInjector
+        if self.injector is None:
+            self.injector = KeyInjector()
+        delay = float(params['delay']) / 1000 if params.get('delay') is not None else DEFAULT_DELAY
+
         try:
-            # Try xdotool first (most common on Linux)
-            subprocess.run(['xdotool', 'key', keys], check=True, capture_output=True)
-            logger.info(f"Sent keys: {keys}")
-        except FileNotFoundError:
-            logger.error("xdotool not found. Install it with: sudo apt install xdotool")
+            if keys:
+                self.injector.send(keys, delay)
+            if text:
+                self.injector.type_text(str(text), delay)
+            logger.info(f"Sent keys: {keys or text}")
         except Exception as e:
             logger.error(f"Failed to send keys: {e}")
 
+    def close(self):
+        if self.injector:
+            self.injector.close()
+            self.injector = None
+
+
+# Required params per OBS action
+OBS_ACTION_PARAMS = {
+    'toggle_scene': ('scene1', 'scene2'),
+    'set_scene': ('scene',),
+    'toggle_source': ('scene', 'source'),
+    'toggle_recording': (),
+    'start_recording': (),
+    'stop_recording': (),
+    'toggle_streaming': (),
+    'set_mute': ('input', 'muted'),
+    'toggle_mute': ('input',),
+}
+
+
+def _check_obs_params(validator: Validator, node, values: Dict):
+    action = validator.value(values['action']) if 'action' in values else 'toggle_scene'
+    required = OBS_ACTION_PARAMS.get(action, ())
+    missing = [key for key in required if key not in values]
+    if missing:
+        names = ' and '.join(f"'{key}'" for key in required)
+        validator.error(node, f"'{action}' action requires {names} parameter{'s' if len(required) > 1 else ''}")
+
 
 class OBSAction(ActionHandler):
     """Control OBS Studio via WebSocket"""
 
-    def __init__(self, obs_client=None):
-        """Initialize OBS action handler"""
-        self.obs_client = obs_client
+    schema = action_schema('obs', {
+        'action': Field('str', choices=OBS_ACTION_PARAMS),
+        'scene': Field('str'),
+        'scene1': Field('str'),
+        'scene2': Field('str'),
+        'source': Field('str'),
+        'input': Field('str'),
+        'muted': Field('bool'),
+    }, _check_obs_params)
+
+    @property
+    def obs_client(self):
+        return self.context.obs_client
 
     def execute(self, params: Dict[str, Any]):
         """Execute OBS action"""
@@ -87,21 +243,37 @@ class OBSAction(ActionHandler):
         action = params.get('action', 'toggle_scene')
 
         try:
-            if action == 'toggle_scene':
-                self._toggle_scene(params)
-            elif action == 'set_scene':
-                self._set_scene(params)
-            elif action == 'toggle_source':
-                self._toggle_source(params)
-            elif action == 'toggle_recording':
-                self._toggle_recording(params)
-            elif action == 'toggle_streaming':
-                self._toggle_streaming(params)
-            else:
-                logger.error(f"Unknown OBS action: {action}")
+            with self.context.obs_lock:
+                self._execute(action, params)
         except Exception as e:
             logger.error(f"OBS action failed: {e}")
 
+    def _execute(self, action: str, params: Dict[str, Any]):
+        if action == 'toggle_scene':
+            self._toggle_scene(params)
+        elif action == 'set_scene':
+            self._set_scene(params)
+        elif action == 'toggle_source':
+            self._toggle_source(params)
+        elif action == 'toggle_recording':
+            self._toggle_recording(params)
+        elif action == 'start_recording':
+            self.obs_client.start_record()
+            logger.info("Started recording")
+        elif action == 'stop_recording':
+            self.obs_client.stop_record()
+            logger.info("Stopped recording")
+        elif action == 'toggle_streaming':
+            self._toggle_streaming(params)
+        elif action == 'set_mute':
+            self.obs_client.set_input_mute(params['input'], bool(params['muted']))
+            logger.info(f"{'Muted' if params['muted'] else 'Unmuted'} input: {params['input']}")
+        elif action == 'toggle_mute':
+            self.obs_client.toggle_input_mute(params['input'])
+            logger.info(f"Toggled mute on input: {params['input']}")
+        else:
+            logger.error(f"Unknown OBS action: {action}")
+
     def _toggle_scene(self, params: Dict[str, Any]):
         """Toggle between two scenes"""
         scene1 = params.get('scene1')
@@ -188,26 +360,316 @@ class OBSAction(ActionHandler):
             logger.error(f"Failed to toggle streaming: {e}")
 
 
+def _check_page_target(validator: Validator, node, value):
+    if value not in validator.page_names:
+        validator.error(node, f"'page' action refers to unknown page '{value}'")
+
+
+class PageAction(ActionHandler):
+    """Switch the deck to another page"""
+
+    schema = action_schema('page', {'page': Field('scalar', required=True, check=_check_page_target)})
+    blocking = False  # Page switches touch the device from the daemon loop
+
+    def execute(self, params: Dict[str, Any]):
+        """Switch page"""
+        page = params.get('page')
+        if not page:
+            logger.error("Page action requires 'page' parameter")
+            return
+
+        if not self.context.switch_page:
+            logger.error("Page switching requires the daemon")
+            return
+
+        self.context.switch_page(page)
+
+
+class ActionRegistry:
+    """Action type -> handler class, imported on first use"""
+
+    def __init__(self, group: Optional[str] = ENTRY_POINT_GROUP):
+        self.group = group
+        self._specs: Dict[str, Any] = {}  # class, 'module:attr' or entry point
+        self._classes: Dict[str, type] = {}
+        self._discovered = group is None
+
+    def register(self, action_type: str, handler: Union[type, str]):
+        """Register a handler class or a 'module:Class' reference"""
+        self._specs[action_type] = handler
+        self._classes.pop(action_type, None)
+
+    def names(self) -> List[str]:
+        """All known action types (scans entry points)"""
+        self._discover()
+        return list(self._specs)
+
+    def load(self, action_type: str) -> Optional[type]:
+        """Handler class for an action type, or None if unknown.
+
+        Raises ImportError when a plugin fails to load.
+        """
+        cls = self._classes.get(action_type)
+        if cls is not None:
+            return cls
+
+        spec = self._specs.get(action_type)
+        if spec is None:
+            self._discover()
+            spec = self._specs.get(action_type)
+            if spec is None:
+                return None
+
+        try:
+            if isinstance(spec, str):
+                module, _, attr = spec.partition(':')
+                cls = getattr(importlib.import_module(module), attr)
+            elif isinstance(spec, type):
+                cls = spec
+            else:
+                cls = spec.load()
+        except Exception as e:
+            raise ImportError(f"action plugin '{action_type}' failed to load: {type(e).__name__}: {e}") from e
+
+        if not (isinstance(cls, type) and issubclass(cls, ActionHandler)):
+            raise ImportError(f"action plugin '{action_type}' is not an ActionHandler subclass")
+        self._classes[action_type] = cls
+        return cls
+
+    def schema(self, action_type: str) -> Optional[Schema]:
+        """Params schema for an action type, or None if unknown"""
+        cls = self.load(action_type)
+        if cls is None:
+            return None
+        return cls.schema or Schema({})
+
+    def _discover(self):
+        if self._discovered:
+            return
+        self._discovered = True
+
+        from importlib import metadata
+        try:
+            entry_points = metadata.entry_points()
+            if hasattr(entry_points, 'select'):
+                found = entry_points.select(group=self.group)
+            else:
+                found = entry_points.get(self.group, [])
+        except Exception as e:
+            logger.warning(f"Could not scan action plugins: {e}")
+            return
+
+        for entry_point in found:
+            if entry_point.name in self._specs:
+                logger.warning(f"Action plugin '{entry_point.name}' ({entry_point.value}) shadows a registered action")
+                continue
+            self._specs[entry_point.name] = entry_point
+
+
+REGISTRY = ActionRegistry()
+REGISTRY.register('command', CommandAction)
+REGISTRY.register('app', AppAction)
+REGISTRY.register('key', KeyAction)
+REGISTRY.register('obs', OBSAction)
+REGISTRY.register('page', PageAction)
+REGISTRY.register('macro', 'ulanzi_manager.macro:MacroAction')
+
+
 class ActionExecutor:
     """Execute button actions"""
 
-    def __init__(self, obs_client=None):
+    def __init__(self, obs_client=None, switch_page: Optional[Callable[[str], None]] = None,
+                 registry: ActionRegistry = REGISTRY, run_on_loop: Optional[Callable[..., Any]] = None):
         """Initialize action executor"""
-        self.handlers = {
-            'command': CommandAction(),
-            'app': AppAction(),
-            'key': KeyAction(),
-            'obs': OBSAction(obs_client),
-        }
-
-    def execute(self, action_type: str, params: Dict[str, Any]):
-        """Execute action by type"""
+        self.context = ActionContext(obs_client=obs_client, switch_page=switch_page)
+        self.context.executor = self
+        if run_on_loop:
+            self.context.run_on_loop = run_on_loop
+        self.registry = registry
+        # Handler instances, created the first time each action type runs
+        self.handlers: Dict[str, ActionHandler] = {}
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._serial_pools: Dict[str, ThreadPoolExecutor] = {}  # Action type -> its single worker
+        self._loop = None  # asyncio loop, started for the first coroutine handler
+        self._lock = threading.Lock()
+
+    def handler(self, action_type: str) -> Optional[ActionHandler]:
+        """Handler instance for an action type"""
         handler = self.handlers.get(action_type)
+        if handler is None:
+            try:
+                cls = self.registry.load(action_type)
+            except ImportError as e:
+                logger.error(str(e))
+                return None
+            if cls is None:
+                return None
+            handler = self.handlers[action_type] = cls(self.context)
+        return handler
+
+    def execute(self, action_type: str, params: Dict[str, Any], button: Optional[str] = None) -> Optional[Future]:
+        """Execute action by type.
+
+        Non-blocking handlers run inline; blocking ones on the worker pool
+        and coroutines on the asyncio loop. button names the pressed
+        button for handlers (see current_button). Returns a future for
+        the result, or None if the action was not run.
+        """
+        handler = self.handler(action_type)
         if not handler:
             logger.error(f"Unknown action type: {action_type}")
-            return
+            return None
+
+        limit = self._limit(action_type, handler)
+        if limit and not limit.acquire(blocking=False):
+            ACTIONS_DROPPED.inc(label_value=action_type)
+            if TRACE.enabled:
+                TRACE.event('dropped', action=action_type, button=button)
+            logger.warning(f"Dropping '{action_type}' action: {handler.max_concurrency} already running")
+            return None
+
+        trace_id = None
+        if TRACE.enabled:
+            trace_id = TRACE.next_id()
+            TRACE.event('dispatch', id=trace_id, action=action_type, button=button)
+
+        if inspect.iscoroutinefunction(handler.execute):
+            import asyncio
+            return asyncio.run_coroutine_threadsafe(
+                self._run_async(action_type, handler, params, limit, button, trace_id), self._async_loop())
+        if handler.blocking:
+            pool = self._serial_pool(action_type) if handler.serial else self._worker_pool()
+            return pool.submit(self._run, action_type, handler, params, limit, button, trace_id)
+
+        future = Future()
+        future.set_result(self._run(action_type, handler, params, limit, button, trace_id))
+        return future
+
+    def call(self, action_type: str, params: Dict[str, Any]) -> Any:
+        """Run an action to completion from a worker thread (used by macros).
+
+        Non-blocking handlers run on the daemon loop, serial ones on their
+        own worker, the action's concurrency limit is waited for rather
+        than dropping, and exceptions propagate to the caller.
+        """
+        handler = self.handler(action_type)
+        if not handler:
+            raise ValueError(f"Unknown action type: {action_type}")
 
+        limit = self._limit(action_type, handler)
+        if limit:
+            limit.acquire()
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(handler.execute):
+                import asyncio
+                return asyncio.run_coroutine_threadsafe(handler.execute(params), self._async_loop()).result()
+            if handler.blocking and handler.serial:
+                return self._serial_pool(action_type).submit(handler.execute, params).result()
+            if handler.blocking:
+                return handler.execute(params)
+            return self.context.run_on_loop(handler.execute, params)
+        except Exception:
+            ACTION_ERRORS.inc(label_value=action_type)
+            raise
+        finally:
+            ACTION_LATENCY.observe(time.perf_counter() - start, action_type)
+            if limit:
+                limit.release()
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker pool and asyncio loop (running actions are waited for only if wait is set)"""
+        for action_type, handler in self.handlers.items():
+            try:
+                handler.close()
+            except Exception as e:
+                logger.debug(f"Closing '{action_type}' handler failed: {e}")
+        self.context.processes.shutdown()
+        pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=wait)
+        with self._lock:
+            serial_pools, self._serial_pools = list(self._serial_pools.values()), {}
+        for pool in serial_pools:
+            pool.shutdown(wait=wait)
+        loop, self._loop = self._loop, None
+        if loop:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _limit(self, action_type: str, handler: ActionHandler) -> Optional[threading.BoundedSemaphore]:
+        if not handler.max_concurrency:
+            return None
+        limit = self._limits.get(action_type)
+        if limit is None:
+            with self._lock:
+                limit = self._limits.setdefault(action_type, threading.BoundedSemaphore(handler.max_concurrency))
+        return limit
+
+    def _worker_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=ACTION_WORKERS, thread_name_prefix='action')
+        return self._pool
+
+    def _serial_pool(self, action_type: str) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._serial_pools.get(action_type)
+            if pool is None:
+                pool = self._serial_pools[action_type] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f'action-{action_type}')
+        return pool
+
+    def _async_loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    import asyncio
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='action-async', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def _run(action_type: str, handler: ActionHandler, params: Dict[str, Any], limit=None, button=None,
+             trace_id=None):
+        token = current_button.set(button)
+        if trace_id:
+            TRACE.event('action_start', id=trace_id)
+        start = time.perf_counter()
+        error = None
+        try:
+            return handler.execute(params)
+        except Exception as e:
+            error = str(e)
+            ACTION_ERRORS.inc(label_value=action_type)
+            logger.error(f"Action execution failed: {e}")
+        finally:
+            ACTION_LATENCY.observe(time.perf_counter() - start, action_type)
+            if trace_id:
+                TRACE.event('action_end', id=trace_id, error=error)
+            current_button.reset(token)
+            if limit:
+                limit.release()
+
+    @staticmethod
+    async def _run_async(action_type: str, handler: ActionHandler, params: Dict[str, Any], limit=None,
+                         button=None, trace_id=None):
+        current_button.set(button)  # Each coroutine runs in its own context
+        if trace_id:
+            TRACE.event('action_start', id=trace_id)
+        start = time.perf_counter()
+        error = None
         try:
-            handler.execute(params)
+            return await handler.execute(params)
         except Exception as e:
+            error = str(e)
+            ACTION_ERRORS.inc(label_value=action_type)
             logger.error(f"Action execution failed: {e}")
+        finally:
+            ACTION_LATENCY.observe(time.perf_counter() - start, action_type)
+            if trace_id:
+                TRACE.event('action_end', id=trace_id, error=error)
+            if limit:
+                limit.release()
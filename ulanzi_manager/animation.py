@@ -0,0 +1,306 @@
+"""Animated button icons
+
+A button's 'animation' is either an animated image (GIF or APNG) or a
+procedural effect drawn over the button image:
+
+    animation: {file: ./icons/spinner.gif}
+    animation: {type: blink, color: '#FF0000', period: 1.0}
+    animation: {type: pulse, period: 2.0, frames: 12}
+    animation: {type: progress, color: '#00FF00', period: 5.0}
+
+Frames are decoded, resized and PNG-encoded once, and each frame's
+partial-update archive is built the first time it is shown, so later
+cycles only write prebuilt packets. Frames are picked by elapsed time,
+so a deck that cannot keep up skips frames instead of slowing down. The
+frame rate adapts to the measured transfer time of every animated key:
+one round of updates may use at most LINK_SHARE of the link, leaving the
+rest for presses and page uploads. Animations are suspended while the
+deck is idle or dimmed.
+"""
+
+import bisect
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from ulanzi_manager.archive import ButtonArchive, CompressionPolicy, build_button_archive
+from ulanzi_manager.atlas import ATLASES, is_atlas_ref
+from ulanzi_manager.metrics import ANIMATION_FRAMES
+from ulanzi_manager.scheduler import Scheduler, Timer
+
+logger = logging.getLogger(__name__)
+
+ANIMATION_TYPES = ('blink', 'pulse', 'progress')
+ICON_SIZE = (196, 196)
+
+DEFAULT_MAX_FPS = 10.0
+# Share of the HID link one round of animation frames may use
+LINK_SHARE = 0.5
+# Weight of the newest transfer time in the per-key average
+TRANSFER_SMOOTHING = 0.3
+# Seconds between checks while suspended
+SUSPEND_CHECK_INTERVAL = 1.0
+# Default frame counts of procedural animations
+DEFAULT_FRAMES = {'blink': 2, 'pulse': 12, 'progress': 24}
+# GIF frames without a duration
+DEFAULT_FRAME_DURATION = 0.1
+
+
+@dataclass
+class Frame:
+    """One encoded frame and how long it is shown"""
+    png: bytes
+    duration: float  # Seconds
+
+
+def _encode(image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def load_frames(path: str, size=ICON_SIZE) -> List[Frame]:
+    """Decode a GIF or APNG into encoded frames"""
+    from PIL import Image, ImageSequence
+
+    frames = []
+    with Image.open(path) as image:
+        for frame in ImageSequence.Iterator(image):
+            duration = frame.info.get('duration') or DEFAULT_FRAME_DURATION * 1000
+            rgba = frame.convert('RGBA')
+            if rgba.size != tuple(size):
+                rgba = rgba.resize(size, Image.LANCZOS)
+            frames.append(Frame(_encode(rgba), duration / 1000))
+    if not frames:
+        raise ValueError(f"No frames in {path}")
+    return frames
+
+
+def procedural_frames(spec: Dict, base_image: Optional[str] = None, size=ICON_SIZE) -> List[Frame]:
+    """Render a blink, pulse or progress animation over the button image"""
+    from PIL import Image, ImageDraw, ImageEnhance
+
+    kind = spec.get('type')
+    if kind not in ANIMATION_TYPES:
+        raise ValueError(f"Invalid animation type '{kind}'. Must be one of: {', '.join(ANIMATION_TYPES)}")
+    period = float(spec.get('period', 1.0))
+    count = int(spec.get('frames', DEFAULT_FRAMES[kind]))
+    color = spec.get('color', '#000000' if kind == 'blink' else '#FFFFFF')
+
+    if is_atlas_ref(base_image):
+        with Image.open(io.BytesIO(ATLASES.tile(base_image))) as image:
+            base = image.convert('RGBA').resize(size, Image.LANCZOS)
+    elif base_image and os.path.exists(base_image):
+        with Image.open(base_image) as image:
+            base = image.convert('RGBA').resize(size, Image.LANCZOS)
+    else:
+        base = Image.new('RGBA', size, spec.get('background', '#000000'))
+
+    if kind == 'blink':
+        # 'on' for duty of the period, then the color
+        duty = float(spec.get('duty', 0.5))
+        off = Image.new('RGBA', size, color)
+        return [Frame(_encode(base), period * duty), Frame(_encode(off), period * (1 - duty))]
+
+    frames = []
+    for n in range(count):
+        if kind == 'pulse':
+            # Brightness follows a cosine between 35% and 100%
+            level = 0.675 + 0.325 * math.cos(2 * math.pi * n / count)
+            image = ImageEnhance.Brightness(base).enhance(level)
+        else:
+            image = base.copy()
+            width = int(spec.get('width', 12))
+            inset = width // 2 + 2
+            box = (inset, inset, size[0] - inset, size[1] - inset)
+            ImageDraw.Draw(image).arc(box, -90, -90 + 360 * (n + 1) / count, fill=color, width=width)
+        frames.append(Frame(_encode(image), period / count))
+    return frames
+
+
+class Animation:
+    """Frames of one button and their prebuilt partial-update archives"""
+
+    def __init__(self, index: int, frames: List[Frame], name: str, label: str = '', state: int = 0,
+                 fps: Optional[float] = None, policy: Optional[CompressionPolicy] = None):
+        self.index = index
+        self.frames = frames
+        self.name = name  # Icon file name prefix, unique per animation
+        self.label = label
+        self.state = state
+        self.fps = fps
+        self.policy = policy
+        self.archives: Dict[int, ButtonArchive] = {}
+        self._ends: List[float] = []
+        total = 0.0
+        for frame in frames:
+            total += max(frame.duration, 0.01)
+            self._ends.append(total)
+        self.cycle = total
+        self.current: Optional[int] = None
+        self.started = 0.0
+        self.due = 0.0
+
+    def frame_at(self, elapsed: float) -> int:
+        """Index of the frame shown elapsed seconds after the start"""
+        return bisect.bisect_right(self._ends, elapsed % self.cycle) % len(self.frames)
+
+    def until_next(self, elapsed: float) -> float:
+        """Seconds until the frame shown at elapsed changes"""
+        position = elapsed % self.cycle
+        index = bisect.bisect_right(self._ends, position)
+        return self._ends[index] - position if index < len(self._ends) else self.cycle - position
+
+    def button(self, frame: int) -> Dict:
+        return {
+            'image': f'{self.name}_{frame}.png', 'image_data': self.frames[frame].png,
+            'label': self.label, 'state': self.state,
+        }
+
+    def archive(self, frame: int) -> ButtonArchive:
+        """Partial-update archive of a frame, built on first use"""
+        archive = self.archives.get(frame)
+        if archive is None:
+            archive = self.archives[frame] = build_button_archive({self.index: self.button(frame)}, self.policy)
+        return archive
+
+
+class Animator:
+    """Push animation frames of the current page from the daemon scheduler.
+
+    paused() is checked before every round; while it returns True no
+    frames are sent. wake() resumes at once (e.g. on a button press).
+    """
+
+    def __init__(self, device, scheduler: Scheduler, paused: Callable[[], bool] = lambda: False,
+                 max_fps: float = DEFAULT_MAX_FPS, policy: Optional[CompressionPolicy] = None):
+        self.device = device
+        self.scheduler = scheduler
+        self.paused = paused
+        self.max_fps = max_fps
+        self.policy = policy
+        self.animations: Dict[int, Animation] = {}
+        self.suspended = False
+        self.transfer: Dict[int, float] = {}  # index -> average seconds per frame
+        self._cache: Dict[str, Animation] = {}  # Decoded animations with their archives
+        self._timer: Optional[Timer] = None
+
+    def load(self, button) -> Optional[Animation]:
+        """Animation of a ButtonConfig, decoding its frames on first use"""
+        spec = button.animation
+        if not spec:
+            return None
+        source = spec.get('file')
+        key = json.dumps([spec, button.image, self._mtime(source or button.image), button.index, button.label,
+                          button.state], sort_keys=True, default=str)
+        animation = self._cache.get(key)
+        if animation is None:
+            try:
+                frames = load_frames(source) if source else procedural_frames(spec, button.image)
+            except Exception as e:
+                logger.error(f"{button.name}: cannot load animation: {e}")
+                return None
+            name = 'anim_' + hashlib.sha256(key.encode()).hexdigest()[:8]
+            animation = self._cache[key] = Animation(button.index, frames, name, label=button.label,
+                                                     state=button.state, fps=spec.get('fps'), policy=self.policy)
+        return animation
+
+    def show(self, animations: List[Animation]):
+        """Replace the running animations (e.g. after a page switch)"""
+        self.animations = {animation.index: animation for animation in animations}
+        now = self.scheduler.clock()
+        for animation in self.animations.values():
+            animation.started = animation.due = now
+            animation.current = None
+        self._schedule(0.0 if self.animations else None)
+
+    def remove(self, index: int):
+        """Stop animating a button (its static image stays)"""
+        self.animations.pop(index, None)
+
+    def wake(self):
+        """Resume suspended animations"""
+        if self.suspended:
+            self._schedule(0.0)
+
+    def stop(self):
+        self.animations = {}
+        self._schedule(None)
+
+    def round_time(self) -> float:
+        """Measured seconds to update every animated key once"""
+        return sum(self.transfer.get(index, 0.0) for index in self.animations)
+
+    def min_interval(self, animation: Animation) -> float:
+        """Shortest time between frames of an animation at the current link speed"""
+        fps = min(self.max_fps, animation.fps or self.max_fps)
+        return max(1.0 / fps, self.round_time() / LINK_SHARE)
+
+    def _schedule(self, delay: Optional[float]):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if delay is not None:
+            self._timer = self.scheduler.call_later(delay, self._tick)
+
+    def _tick(self):
+        self._timer = None
+        if not self.animations:
+            return
+        if self.paused():
+            if not self.suspended:
+                logger.debug("Deck idle or dimmed, suspending animations")
+                self.suspended = True
+            self._schedule(SUSPEND_CHECK_INTERVAL)
+            return
+        if self.suspended:
+            self.suspended = False
+            now = self.scheduler.clock()
+            for animation in self.animations.values():
+                animation.due = now
+
+        for animation in list(self.animations.values()):
+            now = self.scheduler.clock()
+            if animation.due > now:
+                continue
+            elapsed = now - animation.started
+            frame = animation.frame_at(elapsed)
+            if frame != animation.current:
+                if animation.current is not None:
+                    skipped = (frame - animation.current - 1) % len(animation.frames)
+                    if skipped:
+                        ANIMATION_FRAMES.inc(skipped, label_value='skipped')
+                self._push(animation, frame)
+            animation.due = now + max(animation.until_next(elapsed), self.min_interval(animation))
+
+        if self.animations:
+            next_due = min(animation.due for animation in self.animations.values())
+            self._schedule(max(0.0, next_due - self.scheduler.clock()))
+
+    def _push(self, animation: Animation, frame: int):
+        archive = animation.archive(frame)
+        start = self.scheduler.clock()
+        try:
+            self.device.update_buttons({animation.index: animation.button(frame)}, archive=archive)
+        except Exception as e:
+            logger.error(f"Animation frame for button {animation.index} failed: {e}")
+            self.remove(animation.index)
+            return
+        elapsed = self.scheduler.clock() - start
+        previous = self.transfer.get(animation.index)
+        self.transfer[animation.index] = elapsed if previous is None else \
+            previous + TRANSFER_SMOOTHING * (elapsed - previous)
+        animation.current = frame
+        ANIMATION_FRAMES.inc(label_value='sent')
+
+    @staticmethod
+    def _mtime(path: Optional[str]) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
@@ -0,0 +1,254 @@
+"""Streaming ZIP archives for button uploads"""
+
+import bisect
+import json
+import logging
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Every packet after the first starts with the archive byte found at
+# 1016 + n * 1024. The device misreads packets starting with these bytes.
+FIRST_CHUNK_SIZE = 1016
+PACKET_SIZE = 1024
+INVALID_BOUNDARY_BYTES = (0x00, 0x7c)
+
+PADDING_NAME = 'dummy.txt'
+PADDING_BYTE = b'_'
+MAX_PADDING = 4096
+
+# Fixed DOS timestamp (1980-01-01 00:00) so identical input gives identical archives
+_DOS_TIME = 0
+_DOS_DATE = (1 << 5) | 1
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+
+
+@dataclass
+class ArchiveEntry:
+    """A file stored in the archive, already compressed"""
+    name: str
+    data: bytes
+    crc: int
+    size: int
+    method: int = ZIP_STORED
+
+    @classmethod
+    def from_bytes(cls, name: str, raw: bytes, method: int = ZIP_STORED) -> 'ArchiveEntry':
+        """Create an entry from uncompressed data"""
+        crc = zlib.crc32(raw) & 0xFFFFFFFF
+        if method == ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            data = compressor.compress(raw) + compressor.flush()
+        else:
+            data = raw
+        return cls(name=name, data=data, crc=crc, size=len(raw), method=method)
+
+    def local_header(self) -> bytes:
+        """Local file header preceding the entry data"""
+        name = self.name.encode('utf-8')
+        return _LOCAL_HEADER.pack(
+            0x04034b50, 20, 0, self.method, _DOS_TIME, _DOS_DATE,
+            self.crc, len(self.data), self.size, len(name), 0,
+        ) + name
+
+    def central_header(self, offset: int) -> bytes:
+        """Central directory record pointing at the local header"""
+        name = self.name.encode('utf-8')
+        return _CENTRAL_HEADER.pack(
+            0x02014b50, 20, 20, 0, self.method, _DOS_TIME, _DOS_DATE,
+            self.crc, len(self.data), self.size, len(name), 0, 0, 0, 0, 0, offset,
+        ) + name
+
+
+class ButtonArchive:
+    """ZIP archive laid out so it can be streamed straight into HID packets.
+
+    The device length field is sent in the first packet, so the layout is
+    planned up front from the entry headers. A padding entry is placed first
+    and grown until no packet boundary lands on an invalid byte; only the
+    padding entry and the central directory change between attempts, and
+    entry data is never copied into a contiguous buffer.
+    """
+
+    def __init__(self, entries: List[ArchiveEntry]):
+        self.entries = entries
+        self.padding = 0
+        self.retries = 0
+        self._headers = [entry.local_header() for entry in entries]
+        self._segments: List[bytes] = []
+        self._offsets: List[int] = []
+        self.size = 0
+
+        while True:
+            self._layout()
+            if self._boundaries_valid():
+                break
+            self.padding += 1
+            self.retries += 1
+            if self.padding > MAX_PADDING:
+                raise RuntimeError("Could not find a valid archive layout")
+
+        if self.retries:
+            logger.debug(f"Archive padded with {self.padding} byte(s) to avoid invalid boundary bytes")
+
+    def _layout(self):
+        """Compute segments and offsets for the current padding"""
+        padding = ArchiveEntry.from_bytes(PADDING_NAME, PADDING_BYTE * self.padding)
+        entries = [padding] + self.entries
+        headers = [padding.local_header()] + self._headers
+
+        segments = []
+        central = []
+        offset = 0
+        for entry, header in zip(entries, headers):
+            central.append(entry.central_header(offset))
+            segments.append(header)
+            segments.append(entry.data)
+            offset += len(header) + len(entry.data)
+
+        central_dir = b''.join(central)
+        segments.append(central_dir)
+        segments.append(_END_RECORD.pack(
+            0x06054b50, 0, 0, len(entries), len(entries), len(central_dir), offset, 0,
+        ))
+
+        self._segments = segments
+        self._offsets = []
+        total = 0
+        for segment in segments:
+            self._offsets.append(total)
+            total += len(segment)
+        self.size = total
+
+    def byte_at(self, position: int) -> int:
+        """Return the archive byte at the given position"""
+        index = bisect.bisect_right(self._offsets, position) - 1
+        return self._segments[index][position - self._offsets[index]]
+
+    def _boundaries_valid(self) -> bool:
+        """Check the first byte of every raw packet"""
+        for position in range(FIRST_CHUNK_SIZE, self.size, PACKET_SIZE):
+            if self.byte_at(position) in INVALID_BOUNDARY_BYTES:
+                return False
+        return True
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """Yield the archive in packet-sized chunks (1016 bytes, then 1024)"""
+        chunk_size = FIRST_CHUNK_SIZE
+        buffer = bytearray()
+        for segment in self._segments:
+            view = memoryview(segment)
+            while view:
+                take = min(chunk_size - len(buffer), len(view))
+                buffer += view[:take]
+                view = view[take:]
+                if len(buffer) == chunk_size:
+                    yield bytes(buffer)
+                    buffer.clear()
+                    chunk_size = PACKET_SIZE
+        if buffer:
+            yield bytes(buffer)
+
+    def getvalue(self) -> bytes:
+        """Return the complete archive as bytes"""
+        return b''.join(self._segments)
+
+
+class CompressionPolicy:
+    """Choose the compression method for each archive entry.
+
+    Modes:
+    - default: store pre-compressed images, deflate everything else
+    - auto: deflate and keep the result only if it saves enough bytes
+    - stored / deflated: use one method for every entry
+    """
+
+    MODES = ('default', 'auto', 'stored', 'deflated')
+    PRECOMPRESSED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+    def __init__(self, mode: str = 'default', min_ratio: float = 0.9):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid compression mode '{mode}'. Must be one of: {', '.join(self.MODES)}")
+        self.mode = mode
+        self.min_ratio = min_ratio
+
+    def entry(self, name: str, raw: bytes) -> ArchiveEntry:
+        """Create an archive entry using the method selected for it"""
+        if self.mode == 'stored':
+            return ArchiveEntry.from_bytes(name, raw, ZIP_STORED)
+        if self.mode == 'deflated':
+            return ArchiveEntry.from_bytes(name, raw, ZIP_DEFLATED)
+        if self.mode == 'default':
+            method = ZIP_STORED if name.lower().endswith(self.PRECOMPRESSED_EXTENSIONS) else ZIP_DEFLATED
+            return ArchiveEntry.from_bytes(name, raw, method)
+
+        # auto: measure the deflate ratio
+        deflated = ArchiveEntry.from_bytes(name, raw, ZIP_DEFLATED)
+        if raw and len(deflated.data) <= len(raw) * self.min_ratio:
+            return deflated
+        return ArchiveEntry(name=name, data=raw, crc=deflated.crc, size=len(raw), method=ZIP_STORED)
+
+
+def build_button_archive(buttons: Dict[int, Dict], policy: Optional[CompressionPolicy] = None) -> ButtonArchive:
+    """Build the archive for OUT_SET_BUTTONS from a button dictionary"""
+    policy = policy or CompressionPolicy()
+    manifest = {}
+    entries = []
+    icon_names = set()
+
+    for idx, config in buttons.items():
+        row = idx // 5
+        col = idx % 5
+        key = f"{col}_{row}"
+
+        button_data = {
+            'State': config.get('state', 0),
+            'ViewParam': [{}],
+        }
+
+        if config:
+            if 'label' in config:
+                button_data['ViewParam'][0]['Text'] = config['label']
+            if config.get('label_style'):
+                # Same keys as the global label style (Align, Color, FontName, ...)
+                button_data['ViewParam'][0].update(config['label_style'])
+
+            if config.get('image_data') is not None:
+                # Already encoded image (e.g. an animation frame); 'image' is its name
+                icon_name = Path(config['image']).name
+                if icon_name not in icon_names:
+                    icon_names.add(icon_name)
+                    entries.append(policy.entry(f'icons/{icon_name}', config['image_data']))
+                button_data['ViewParam'][0]['Icon'] = f'icons/{icon_name}'
+            elif 'image' in config:
+                image_path = config['image']
+                image_path_obj = Path(image_path) if image_path else None
+                if image_path_obj and image_path_obj.exists():
+                    icon_name = image_path_obj.name
+                    if icon_name not in icon_names:
+                        icon_names.add(icon_name)
+                        entries.append(policy.entry(f'icons/{icon_name}', image_path_obj.read_bytes()))
+                    button_data['ViewParam'][0]['Icon'] = f'icons/{icon_name}'
+                    logger.debug(f"Added image for button {idx}: {image_path}")
+                else:
+                    logger.warning(f"Image not found for button {idx}: {image_path}")
+
+        manifest[key] = button_data
+
+    manifest_json = json.dumps(manifest, sort_keys=True, separators=(',', ':'), indent=2)
+    entries.append(policy.entry('manifest.json', manifest_json.encode('utf-8')))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Manifest: {json.dumps(manifest, indent=2)}")
+
+    return ButtonArchive(entries)
+
@@ -0,0 +1,245 @@
+"""Icon atlases: many button icons in one sprite sheet
+
+An atlas is a JSON index next to one large image. Atlases are named in
+the config and their tiles are used as button images:
+
+    atlases:
+      material: ./packs/material.json
+
+    buttons:
+      - image: atlas:material/mic      # or atlas:mic if only one atlas has it
+
+The index lists a rectangle per tile, either directly, as a grid, or in
+the TexturePacker "JSON hash" layout:
+
+    {"image": "material.png", "tiles": {"mic": [0, 0, 196, 196], ...}}
+    {"image": "material.png", "tile_size": [64, 64], "columns": 16, "names": ["mic", ...]}
+    {"meta": {"image": "material.png"}, "frames": {"mic.png": {"frame": {"x": 0, "y": 0, "w": 64, "h": 64}}}}
+
+Each sheet is decoded once and shared by every config and page that
+uses it. Tiles are cropped, resized and PNG-encoded on first use and kept
+in an LRU of encoded tiles, so switching between pages of a large icon
+library only re-encodes tiles that fell out of the cache.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ATLAS_PREFIX = 'atlas:'
+ICON_SIZE = (196, 196)
+# Encoded tiles kept in memory (a 196x196 icon is typically 5-30 KB)
+TILE_CACHE_SIZE = 512
+
+Rect = Tuple[int, int, int, int]  # x, y, width, height
+
+
+def is_atlas_ref(image: Optional[str]) -> bool:
+    return bool(image) and str(image).startswith(ATLAS_PREFIX)
+
+
+def split_ref(ref: str) -> Tuple[Optional[str], str]:
+    """'atlas:pack/name' -> ('pack', 'name'); 'atlas:name' -> (None, 'name')"""
+    body = ref[len(ATLAS_PREFIX):]
+    if '#' in body:
+        # Resolved reference: atlas:<index path>#<tile>
+        path, _, name = body.rpartition('#')
+        return path, name
+    pack, _, name = body.partition('/')
+    return (pack, name) if name else (None, pack)
+
+
+def _tile_key(name: str) -> str:
+    """Tile name without an image extension (TexturePacker keys are file names)"""
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp') else name
+
+
+def parse_index(data: Dict) -> Tuple[str, Dict[str, Rect]]:
+    """Sheet file name and tile rectangles of an atlas index"""
+    if not isinstance(data, dict):
+        raise ValueError("atlas index must be a JSON object")
+    tiles: Dict[str, Rect] = {}
+    if 'frames' in data:
+        image = (data.get('meta') or {}).get('image')
+        frames = data['frames']
+        if isinstance(frames, list):  # TexturePacker "JSON array"
+            frames = {frame.get('filename'): frame for frame in frames}
+        for name, frame in frames.items():
+            rect = frame.get('frame', frame)
+            tiles[_tile_key(str(name))] = (int(rect['x']), int(rect['y']), int(rect['w']), int(rect['h']))
+    elif 'tiles' in data:
+        image = data.get('image')
+        for name, rect in data['tiles'].items():
+            if len(rect) != 4:
+                raise ValueError(f"tile '{name}' must be [x, y, width, height]")
+            tiles[str(name)] = tuple(int(value) for value in rect)
+    elif 'names' in data:
+        image = data.get('image')
+        width, height = (int(value) for value in data['tile_size'])
+        columns = int(data['columns'])
+        for position, name in enumerate(data['names']):
+            if name is not None:
+                row, column = divmod(position, columns)
+                tiles[str(name)] = (column * width, row * height, width, height)
+    else:
+        raise ValueError("atlas index needs 'tiles', 'names' or 'frames'")
+    if not image:
+        raise ValueError("atlas index does not name its image")
+    for name, (x, y, w, h) in tiles.items():
+        if x < 0 or y < 0 or w <= 0 or h <= 0:
+            raise ValueError(f"tile '{name}' has an invalid rectangle")
+    return str(image), tiles
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Atlas:
+    """One index and its sheet, decoded on first use"""
+
+    def __init__(self, index_path: str):
+        self.index_path = str(index_path)
+        with open(self.index_path) as f:
+            try:
+                image, self.tiles = parse_index(json.load(f))
+            except (KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f"malformed atlas index {self.index_path}: {e!r}") from e
+        self.image_path = str(Path(self.index_path).parent / image)
+        self.name = Path(self.index_path).stem
+        self.stamp = (_stamp(self.index_path), _stamp(self.image_path))
+        self._sheet = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._sheet is not None
+
+    def sheet(self):
+        """The decoded sheet (RGBA), loaded once"""
+        with self._lock:
+            if self._sheet is None:
+                from PIL import Image
+                with Image.open(self.image_path) as image:
+                    self._sheet = image.convert('RGBA')
+                logger.info(f"Loaded atlas {self.name}: {len(self.tiles)} tiles, "
+                            f"{self._sheet.width}x{self._sheet.height}")
+            return self._sheet
+
+    def encode(self, name: str, size=ICON_SIZE) -> bytes:
+        """Crop a tile, resize it to the button size and encode it as PNG"""
+        from PIL import Image
+        x, y, w, h = self.tiles[name]
+        tile = self.sheet().crop((x, y, x + w, y + h))
+        if tile.size != tuple(size):
+            tile = tile.resize(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        tile.save(buffer, 'PNG')
+        return buffer.getvalue()
+
+
+class AtlasCache:
+    """Loaded atlases by index path and an LRU of encoded tiles"""
+
+    def __init__(self, capacity: int = TILE_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._atlases: Dict[str, Atlas] = {}
+        self._tiles: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def atlas(self, index_path: str) -> Atlas:
+        """Atlas of an index file, reloaded when the index or sheet changes"""
+        index_path = str(index_path)
+        with self._lock:
+            atlas = self._atlases.get(index_path)
+        if atlas is not None and atlas.stamp == (_stamp(atlas.index_path), _stamp(atlas.image_path)):
+            return atlas
+        atlas = Atlas(index_path)
+        with self._lock:
+            self._atlases[index_path] = atlas
+            for key in [key for key in self._tiles if key[0] == index_path]:
+                del self._tiles[key]
+        return atlas
+
+    def resolve(self, ref: str, atlases: Dict[str, str]) -> str:
+        """Turn 'atlas:pack/name' or 'atlas:name' into 'atlas:<index path>#name'.
+
+        atlases maps atlas names to index paths. Raises ValueError if the
+        atlas or tile does not exist, or a bare name is in several atlases.
+        """
+        pack, name = split_ref(ref)
+        if pack is not None:
+            if pack not in atlases:
+                raise ValueError(f"unknown atlas '{pack}' in {ref}")
+            candidates = [pack]
+        else:
+            candidates = [pack for pack, path in atlases.items() if name in self.atlas(path).tiles]
+            if len(candidates) > 1:
+                raise ValueError(f"{ref} is in several atlases ({', '.join(candidates)}), "
+                                 f"use atlas:<atlas>/{name}")
+        if not candidates or name not in self.atlas(atlases[candidates[0]]).tiles:
+            raise ValueError(f"atlas tile not found: {ref}")
+        return f"{ATLAS_PREFIX}{atlases[candidates[0]]}#{name}"
+
+    def exists(self, ref: str) -> bool:
+        """Whether a resolved reference names an existing tile"""
+        path, name = split_ref(ref)
+        try:
+            return name in self.atlas(path).tiles
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def files(self, ref: str) -> List[str]:
+        """Index and sheet files of a resolved reference"""
+        path, _ = split_ref(ref)
+        try:
+            return [path, self.atlas(path).image_path]
+        except (OSError, ValueError, KeyError, TypeError):
+            return [path]
+
+    def icon_name(self, ref: str) -> str:
+        """File name of a tile inside an upload archive"""
+        path, name = split_ref(ref)
+        return 'atlas_' + re.sub(r'[^A-Za-z0-9_.-]', '_', f"{Path(path).stem}_{name}") + '.png'
+
+    def tile(self, ref: str) -> bytes:
+        """Encoded PNG of a resolved reference"""
+        path, name = split_ref(ref)
+        atlas = self.atlas(path)
+        key = (path, name)
+        with self._lock:
+            data = self._tiles.get(key)
+            if data is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = atlas.encode(name)
+        with self._lock:
+            self._tiles[key] = data
+            while len(self._tiles) > self.capacity:
+                self._tiles.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._atlases.clear()
+            self._tiles.clear()
+
+
+ATLASES = AtlasCache()
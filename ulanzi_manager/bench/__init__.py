@@ -0,0 +1,104 @@
+"""Benchmark suite for Ulanzi Manager
+
+Benchmarks run against a simulated HID device, so no hardware is needed.
+Results are plain dictionaries that serialize to JSON for comparing
+versions.
+"""
+
+import logging
+import platform
+import statistics
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ulanzi_manager import __version__
+
+# name -> (function(iterations) -> result dict, description)
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(name: str, description: str):
+    """Register a benchmark function"""
+    def decorator(func: Callable[[int], Dict]):
+        BENCHMARKS[name] = (func, description)
+        return func
+    return decorator
+
+
+def measure(func: Callable[[], object], iterations: int, warmup: int = 1) -> Dict:
+    """Time func and return latency statistics in milliseconds"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+
+    return summarize(samples, cpu_ms=cpu_ms / max(1, iterations))
+
+
+def wait_for(condition: Callable[[], object], timeout: float = 5.0) -> bool:
+    """Poll condition until it holds or timeout seconds pass; whether it holds"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return bool(condition())
+
+
+def summarize(samples: List[float], **extra) -> Dict:
+    """Summary statistics for a list of millisecond samples"""
+    ordered = sorted(samples)
+    result = {
+        'iterations': len(ordered),
+        'mean_ms': statistics.fmean(ordered) if ordered else 0.0,
+        'median_ms': statistics.median(ordered) if ordered else 0.0,
+        'p95_ms': percentile(ordered, 95),
+        'min_ms': ordered[0] if ordered else 0.0,
+        'max_ms': ordered[-1] if ordered else 0.0,
+    }
+    result.update(extra)
+    return result
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def run_benchmarks(names: Optional[Iterable[str]] = None, iterations: int = 50) -> Dict:
+    """Run the selected benchmarks (default: all) and return a JSON-ready report"""
+    from ulanzi_manager.bench import suites  # noqa: F401 - registers benchmarks
+
+    selected = list(names) if names else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+
+    results = {}
+    # Keep per-press and per-upload log lines out of the measurements
+    logging.disable(logging.INFO)
+    try:
+        for name in selected:
+            func, _ = BENCHMARKS[name]
+            try:
+                results[name] = func(iterations)
+            except Exception as e:
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'iterations': iterations,
+        'results': results,
+    }
@@ -0,0 +1,14 @@
+"""Manually advanced clock for driving a Scheduler without waiting"""
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to (pass as Scheduler(clock=...))"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now = round(self.now + seconds, 6)  # Keep repeated small steps exact enough to compare
@@ -0,0 +1,32 @@
+"""Simulated focus source for running focus tracking without a display server"""
+
+import queue
+
+from ulanzi_manager.focus import FocusSource
+
+
+class FakeFocusSource(FocusSource):
+    """Stand-in for a display server focus source.
+
+    focus() queues a focus change; it is reported from the source thread,
+    like the events of a real backend.
+    """
+
+    name = 'fake'
+
+    def __init__(self):
+        super().__init__()
+        self._events: 'queue.Queue' = queue.Queue()
+
+    def focus(self, app: str, title: str = ''):
+        self._events.put((app, title))
+
+    def run(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            self.emit(*event)
+
+    def close(self):
+        self._events.put(None)
@@ -0,0 +1,100 @@
+"""Simulated hid.device for running UlanziDevice without hardware"""
+
+import struct
+import time
+from collections import deque
+from typing import List, Optional
+
+from ulanzi_manager.device import CommandProtocol, UlanziDevice
+
+
+def button_report(index: int, pressed: bool, state: int = 1) -> bytes:
+    """Build an IN_BUTTON input report as sent by the device"""
+    report = bytearray(UlanziDevice.PACKET_SIZE)
+    report[0:2] = UlanziDevice.HEADER
+    report[2:4] = struct.pack('>H', CommandProtocol.IN_BUTTON)
+    report[4:8] = struct.pack('<I', 4)
+    report[8:12] = bytes([state, index, 0, 0x01 if pressed else 0x00])
+    return bytes(report)
+
+
+def device_info_report(payload: bytes) -> bytes:
+    """Build an IN_DEVICE_INFO input report carrying payload"""
+    report = bytearray(UlanziDevice.PACKET_SIZE)
+    report[0:2] = UlanziDevice.HEADER
+    report[2:4] = struct.pack('>H', CommandProtocol.IN_DEVICE_INFO)
+    report[4:8] = struct.pack('<I', len(payload))
+    report[8:8 + len(payload)] = payload
+    return bytes(report)
+
+
+class FakeHIDDevice:
+    """Stand-in for hid.device that records writes and replays input reports.
+
+    Reports are queued with an optional delay relative to the previous
+    report; read() returns them once due, like a non-blocking HID read.
+    """
+
+    def __init__(self, clock=time.monotonic, serial: Optional[str] = None):
+        self.clock = clock
+        self.serial = serial
+        self.writes: List[bytes] = []
+        self.bytes_written = 0
+        self.path: Optional[bytes] = None
+        self.nonblocking = False
+        self.closed = False
+        self._reports = deque()
+        self._next_due = None
+
+    def open_path(self, path: bytes):
+        self.path = path
+
+    def get_serial_number_string(self) -> Optional[str]:
+        return self.serial
+
+    def set_nonblocking(self, enabled):
+        self.nonblocking = bool(enabled)
+        return 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.writes.append(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def read(self, size: int, timeout_ms: int = 0) -> List[int]:
+        if not self._reports:
+            return []
+        delay, report = self._reports[0]
+        now = self.clock()
+        if self._next_due is None:
+            self._next_due = now + delay
+        if now < self._next_due:
+            return []
+        self._reports.popleft()
+        self._next_due = None
+        return list(report[:size])
+
+    def close(self):
+        self.closed = True
+
+    def queue_report(self, report: bytes, delay: float = 0.0):
+        """Queue an input report, due delay seconds after the previous one"""
+        self._reports.append((delay, bytes(report)))
+
+    def queue_press(self, index: int, delay: float = 0.0, state: int = 1):
+        """Queue a press and release of a button"""
+        self.queue_report(button_report(index, True, state), delay)
+        self.queue_report(button_report(index, False, state))
+
+    def pending_reports(self) -> int:
+        return len(self._reports)
+
+    def command_count(self, command: int) -> int:
+        """Number of written commands of one type (e.g. OUT_SET_BUTTONS uploads)"""
+        return sum(1 for packet in self.writes
+                   if packet[:2] == UlanziDevice.HEADER and struct.unpack('>H', packet[2:4])[0] == command)
+
+    def clear_writes(self):
+        self.writes.clear()
+        self.bytes_written = 0
@@ -0,0 +1,241 @@
+"""Benchmark definitions"""
+
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from ulanzi_manager.archive import (
+    ArchiveEntry, ButtonArchive, CompressionPolicy, build_button_archive, FIRST_CHUNK_SIZE, PACKET_SIZE,
+)
+from ulanzi_manager.bench import benchmark, measure, summarize
+from ulanzi_manager.bench.fakehid import FakeHIDDevice, button_report
+from ulanzi_manager.device import CommandProtocol, UlanziDevice
+
+# Icons shipped with the source tree
+BUNDLED_ICONS = Path(__file__).resolve().parents[2] / 'icons'
+
+# Seconds press_to_action waits for one press to reach its handler
+PRESS_TIMEOUT = 5.0
+
+
+def _icon_paths(workdir: Path):
+    """Bundled icons, or generated ones when running from an installed package"""
+    icons = sorted(BUNDLED_ICONS.glob('*.png'))[:13]
+    if icons:
+        return icons
+
+    from ulanzi_manager.icon_generator import IconGenerator
+    generator = IconGenerator(cache_dir=workdir)
+    colors = ['#0066FF', '#FF6600', '#00AA44', '#AA00AA', '#333333']
+    return [
+        generator.generate_from_dict({'type': 'text', 'color': colors[i % len(colors)], 'text': str(i)}, button_index=i)
+        for i in range(13)
+    ]
+
+
+def _buttons(workdir: Path) -> Dict[int, Dict]:
+    return {idx: {'image': str(path), 'label': path.stem, 'state': 0} for idx, path in enumerate(_icon_paths(workdir))}
+
+
+def wire_bytes(archive_size: int) -> int:
+    """Bytes written to the device for an archive, including headers and padding"""
+    if archive_size <= FIRST_CHUNK_SIZE:
+        return PACKET_SIZE
+    remaining = archive_size - FIRST_CHUNK_SIZE
+    return PACKET_SIZE * (1 + -(-remaining // PACKET_SIZE))
+
+
+@benchmark('zip_build', 'Build a 13-button archive from icon files')
+def bench_zip_build(iterations: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        buttons = _buttons(Path(tmp))
+        result = measure(lambda: build_button_archive(buttons), iterations)
+        archive = build_button_archive(buttons)
+    result['archive_bytes'] = archive.size
+    return result
+
+
+@benchmark('compression', 'CPU time and bytes on the wire per compression policy')
+def bench_compression(iterations: int) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        buttons = _buttons(Path(tmp))
+        for mode in CompressionPolicy.MODES:
+            policy = CompressionPolicy(mode)
+            result = measure(lambda: build_button_archive(buttons, policy), iterations)
+            archive = build_button_archive(buttons, policy)
+            result['archive_bytes'] = archive.size
+            result['wire_bytes'] = wire_bytes(archive.size)
+            result['padding_retries'] = archive.retries
+            results[mode] = result
+    return results
+
+
+@benchmark('boundary_retries', 'Padding search for random archives')
+def bench_boundary_retries(iterations: int) -> Dict:
+    rng = random.Random(1234)
+
+    def random_bytes(size: int) -> bytes:
+        return rng.getrandbits(size * 8).to_bytes(size, 'little')
+
+    entries_sets = [
+        [ArchiveEntry.from_bytes(f'icons/{i}.png', random_bytes(rng.randint(2000, 40000))) for i in range(13)]
+        for _ in range(iterations)
+    ]
+
+    samples = []
+    retries = []
+    for entries in entries_sets:
+        start = time.perf_counter()
+        archive = ButtonArchive(entries)
+        samples.append((time.perf_counter() - start) * 1000)
+        retries.append(archive.retries)
+
+    return summarize(samples, mean_retries=sum(retries) / len(retries), max_retries=max(retries))
+
+
+@benchmark('packet_framing', 'Frame and write an archive to a simulated device')
+def bench_packet_framing(iterations: int) -> Dict:
+    fake = FakeHIDDevice()
+    device = UlanziDevice(hid_device=fake)
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = build_button_archive(_buttons(Path(tmp)))
+
+    def send():
+        fake.clear_writes()
+        device._send_archive(CommandProtocol.OUT_SET_BUTTONS, archive)
+
+    result = measure(send, iterations)
+    result['packets'] = len(fake.writes)
+    result['wire_bytes'] = fake.bytes_written
+    return result
+
+
+@benchmark('icon_generation', 'Render each icon type')
+def bench_icon_generation(iterations: int) -> Dict:
+    from ulanzi_manager.icon_generator import IconGenerator, IconSpec
+
+    specs = {
+        'solid': {'type': 'solid', 'color': '#0066FF'},
+        'text': {'type': 'text', 'color': '#FF6600', 'text': 'REC', 'font_size': 70},
+        'gradient': {'type': 'gradient', 'color': '#0066FF', 'text_color': '#FF6600'},
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = IconGenerator(cache_dir=Path(tmp))
+        for name, spec_dict in specs.items():
+            spec = IconSpec(spec_dict)
+            results[name] = measure(lambda: generator.generate(spec, force=True), iterations)
+    return results
+
+
+def _write_bench_config(workdir: Path) -> Path:
+    """Write a 13-button config with images and icon specs"""
+    icon_dir = workdir / 'images'
+    icon_dir.mkdir()
+    lines = ['brightness: 80', 'buttons:']
+    for idx, path in enumerate(_icon_paths(workdir)):
+        target = icon_dir / path.name
+        if not target.exists():
+            shutil.copy(path, target)
+        if idx % 3 == 2:
+            lines += [
+                '  - icon_spec:',
+                '      type: text',
+                "      color: '#FF6600'",
+                f"      text: 'B{idx}'",
+                f'    label: Button {idx}',
+                '    action: command',
+                '    params:',
+                '      cmd: "true"',
+            ]
+        else:
+            lines += [
+                f'  - image: ./images/{path.name}',
+                f'    label: Button {idx}',
+                '    action: obs',
+                '    params:',
+                '      action: toggle_scene',
+                '      scene1: "A"',
+                '      scene2: "B"',
+            ]
+    config_path = workdir / 'config.yaml'
+    config_path.write_text('\n'.join(lines) + '\n')
+    return config_path
+
+
+@benchmark('config', 'Load and validate a 13-button config')
+def bench_config(iterations: int) -> Dict:
+    from ulanzi_manager.config import ConfigParser
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _write_bench_config(Path(tmp))
+        load = measure(lambda: ConfigParser.load(str(config_path)), iterations)
+        config = ConfigParser.load(str(config_path))
+        validate = measure(lambda: ConfigParser.validate(config), iterations)
+
+    return {'load': load, 'validate': validate}
+
+
+@benchmark('press_to_action', 'Input report to action handler through the daemon dispatch path')
+def bench_press_to_action(iterations: int) -> Dict:
+    from ulanzi_manager.actions import ActionExecutor, ActionHandler
+    from ulanzi_manager.config import ButtonConfig, Config
+    from ulanzi_manager.daemon import UlanziDaemon
+
+    class RecordingAction(ActionHandler):
+        def __init__(self):
+            self.executed_at = None
+
+        def execute(self, params):
+            self.executed_at = time.perf_counter()
+
+    handler = RecordingAction()
+    daemon = UlanziDaemon(config_path='<bench>')
+    daemon.config = Config(buttons=[
+        ButtonConfig(index=i, image=None, label=str(i), action_type='bench', action_params={}) for i in range(13)
+    ])
+    daemon._buttons = {button.index: button for button in daemon.config.buttons}
+    daemon.executor = ActionExecutor()
+    daemon.executor.handlers['bench'] = handler
+    fake = FakeHIDDevice()
+    daemon.device = UlanziDevice(hid_device=fake)
+    daemon.device.set_button_callback(daemon._on_button_press)
+
+    release = button_report(3, pressed=False)
+    samples = []
+    for _ in range(iterations + 1):
+        handler.executed_at = None
+        fake.queue_report(release)
+        start = time.perf_counter()
+        deadline = start + PRESS_TIMEOUT
+        while handler.executed_at is None:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"press not dispatched within {PRESS_TIMEOUT}s")
+            daemon.device.read_button_press()
+        samples.append((handler.executed_at - start) * 1000)
+
+    return summarize(samples[1:])
+
+
+@benchmark('metrics', 'Cost of recording a counter increment and a histogram observation')
+def bench_metrics(iterations: int) -> Dict:
+    from ulanzi_manager.metrics import Registry
+
+    registry = Registry()
+    counter = registry.counter('bench_total', 'bench', 'button')
+    histogram = registry.histogram('bench_seconds', 'bench', 'action')
+    batch = 1000
+
+    def record():
+        for i in range(batch):
+            counter.inc(label_value='3')
+            histogram.observe(0.004, 'command')
+
+    result = measure(record, iterations)
+    result['ns_per_record'] = result['mean_ms'] * 1e6 / batch
+    return result
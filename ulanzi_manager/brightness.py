@@ -0,0 +1,122 @@
+"""Scheduled brightness, idle dimming and fades"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from ulanzi_manager.config import BrightnessSchedule
+from ulanzi_manager.scheduler import Scheduler, Timer
+
+logger = logging.getLogger(__name__)
+
+# How often the schedule and idle state are re-evaluated
+EVALUATE_INTERVAL = 1.0
+
+
+class BrightnessController:
+    """Drive device brightness from a schedule on the daemon scheduler.
+
+    The press path only calls note_activity(), which records a timestamp
+    and, when the deck is dimmed, queues a wake-up. All device writes
+    happen from scheduler timers.
+    """
+
+    def __init__(self, device, scheduler: Scheduler, base_level: int, schedule: BrightnessSchedule,
+                 now: Callable[[], datetime] = datetime.now):
+        self.device = device
+        self.scheduler = scheduler
+        self.base_level = base_level
+        self.schedule = schedule
+        self.now = now
+        self.profile: List[Tuple[int, int]] = sorted(
+            (BrightnessSchedule.parse_time(time_str), level) for time_str, level in schedule.profile
+        )
+
+        self.idle = False
+        self.current: Optional[int] = None
+        self.target: Optional[int] = None
+        self._last_activity = scheduler.clock()
+        self._evaluate_timer: Optional[Timer] = None
+        self._fade_timer: Optional[Timer] = None
+
+    def start(self):
+        """Apply the scheduled level and start periodic evaluation"""
+        self.current = self.scheduled_level()
+        self.target = self.current
+        self.device.set_brightness(self.current)
+        self._evaluate_timer = self.scheduler.call_every(EVALUATE_INTERVAL, self.evaluate)
+
+    def stop(self):
+        """Stop all brightness timers"""
+        for timer in (self._evaluate_timer, self._fade_timer):
+            if timer:
+                timer.cancel()
+        self._evaluate_timer = None
+        self._fade_timer = None
+
+    def note_activity(self):
+        """Record a button press (cheap, called from the press path)"""
+        self._last_activity = self.scheduler.clock()
+        if self.idle:
+            self.idle = False
+            self.scheduler.call_soon_threadsafe(self.evaluate)
+
+    def set_base_level(self, level: int):
+        """Change the level used when no profile entry applies"""
+        self.base_level = max(0, min(100, level))
+        self.evaluate()
+
+    def scheduled_level(self) -> int:
+        """Brightness for the current time of day"""
+        if not self.profile:
+            return self.base_level
+
+        now = self.now()
+        minute = now.hour * 60 + now.minute
+        # The last entry before now applies; before the first entry, yesterday's last one does
+        level = self.profile[-1][1]
+        for start, entry_level in self.profile:
+            if start > minute:
+                break
+            level = entry_level
+        return level
+
+    def evaluate(self):
+        """Recompute the target level and start a fade if it changed"""
+        idle_timeout = self.schedule.idle_timeout
+        if idle_timeout and not self.idle:
+            if self.scheduler.clock() - self._last_activity >= idle_timeout:
+                self.idle = True
+                logger.debug("Deck idle, dimming")
+
+        level = self.scheduled_level()
+        if self.idle:
+            level = min(level, self.schedule.idle_brightness)
+        self.fade_to(level)
+
+    def fade_to(self, level: int):
+        """Move towards level in rate-limited steps"""
+        level = max(0, min(100, level))
+        if level == self.target:
+            return
+        self.target = level
+        if self._fade_timer is None:
+            self._fade_step()
+            if self.current != self.target:
+                self._fade_timer = self.scheduler.call_every(self.schedule.fade_interval, self._fade_step)
+
+    def _fade_step(self):
+        """Write one brightness step"""
+        current = self.current if self.current is not None else self.target
+        step = self.schedule.fade_step
+        if current < self.target:
+            current = min(current + step, self.target)
+        else:
+            current = max(current - step, self.target)
+
+        self.current = current
+        self.device.set_brightness(current)
+
+        if current == self.target and self._fade_timer:
+            self._fade_timer.cancel()
+            self._fade_timer = None
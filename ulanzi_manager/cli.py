@@ -4,24 +4,48 @@ import sys
 import argparse
 import logging
 from pathlib import Path
-from PIL import Image
+from typing import Optional
 
-from ulanzi_manager.device import UlanziDevice
-from ulanzi_manager.config import ConfigParser
+# Heavy modules (PIL, yaml, hidapi) are imported by the subcommands that need
+# them, so key-bound invocations like 'brightness 80' start quickly.
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class UlanziCLI:
     """Command-line interface for Ulanzi Manager"""
 
-    def __init__(self):
-        """Initialize CLI"""
+    def __init__(self, socket_path: Optional[str] = None, direct: bool = False):
+        """Initialize CLI
+
+        Args:
+            socket_path: Daemon control socket (default: runtime dir)
+            direct: Always open the device instead of going through a running daemon
+        """
         self.device = None
+        self.socket_path = socket_path
+        self.direct = direct
+
+    def daemon_client(self):
+        """Connected control client if a daemon is running"""
+        if self.direct:
+            return None
+        from ulanzi_manager.control import ControlClient
+        return ControlClient.connect_if_running(self.socket_path)
+
+    def call_daemon(self, client, method: str, **params):
+        """Call a daemon method, exiting on error"""
+        from ulanzi_manager.control import ControlError
+        try:
+            with client:
+                return client.call(method, **params)
+        except (ControlError, OSError) as e:
+            logger.error(f"Daemon request '{method}' failed: {e}")
+            sys.exit(1)
 
     def connect(self):
         """Connect to device"""
+        from ulanzi_manager.device import UlanziDevice
         try:
             self.device = UlanziDevice()
             logger.info("Connected to device")
@@ -36,14 +60,43 @@ class UlanziCLI:
 
     def cmd_status(self, args):
         """Show device status"""
+        client = self.daemon_client()
+        if client:
+            state = self.call_daemon(client, 'get_state')
+            logger.info(f"Daemon running with {state['config']}")
+            logger.info(f"Page: {state['page']} (pages: {', '.join(state['pages'])})")
+            logger.info(f"Brightness: {state['brightness']}%{' (dimmed)' if state['dimmed'] else ''}")
+            logger.info(f"OBS connected: {state['obs_connected']}")
+            if state.get('device'):
+                logger.info(f"Device: serial {state['device']['serial'] or 'unknown'}, "
+                            f"firmware {state['device']['firmware'] or 'unknown'}")
+            for button in state['buttons']:
+                logger.info(f"  Button {button['index']}: {button['label']!r} -> {button['action']}")
+            running = state.get('processes', {}).get('running', [])
+            if running:
+                logger.info(f"Running processes: {len(running)}")
+                for process in running:
+                    logger.info(f"  {process['key']}: pid {process['pid']} {process['command']!r} "
+                                f"({process['runtime']:.0f}s)")
+            return
+
         self.connect()
         try:
             logger.info("Device connected and ready")
+            info = self.device.info
+            if info:
+                logger.info(f"Serial {info.serial or self.device.serial}, firmware {info.firmware or 'unknown'}")
         finally:
             self.disconnect()
 
     def cmd_brightness(self, args):
         """Set brightness"""
+        client = self.daemon_client()
+        if client:
+            result = self.call_daemon(client, 'set_brightness', level=args.level)
+            logger.info(f"Brightness set to {result['brightness']}%")
+            return
+
         self.connect()
         try:
             self.device.set_brightness(args.level)
@@ -53,6 +106,15 @@ class UlanziCLI:
 
     def cmd_configure(self, args):
         """Configure device from config file"""
+        client = self.daemon_client()
+        if client:
+            result = self.call_daemon(client, 'reload', config=str(Path(args.config).resolve()))
+            logger.info(f"Daemon reloaded {result['config']} ({result['buttons']} button(s) on page {result['page']})")
+            return
+
+        from ulanzi_manager.config import ConfigParser, device_buttons
+        from ulanzi_manager.archive import CompressionPolicy
+
         self.connect()
         try:
             config = ConfigParser.load(args.config)
@@ -69,19 +131,16 @@ class UlanziCLI:
             self.device.set_brightness(config.brightness)
             logger.info(f"Set brightness to {config.brightness}%")
 
+            # Set upload compression
+            self.device.compression = CompressionPolicy(config.compression, config.compression_min_ratio)
+
             # Set label style
             if config.label_style:
                 self.device.set_label_style(config.label_style)
                 logger.info("Set label style")
 
             # Set buttons
-            button_dict = {}
-            for button in config.buttons:
-                button_dict[button.index] = {
-                    'image': button.image,
-                    'label': button.label,
-                    'state': button.state
-                }
+            button_dict = device_buttons(config.buttons, config.label_style)
 
             if button_dict:
                 self.device.set_buttons(button_dict)
@@ -97,18 +156,27 @@ class UlanziCLI:
 
     def cmd_test_image(self, args):
         """Test image on a button"""
+        # Validate image
+        image_path = Path(args.image)
+        if not image_path.exists():
+            logger.error(f"Image not found: {args.image}")
+            sys.exit(1)
+
+        # Check image size
+        from PIL import Image
+        img = Image.open(image_path)
+        if img.size != (196, 196):
+            logger.warning(f"Image size is {img.size}, expected (196, 196)")
+
+        client = self.daemon_client()
+        if client:
+            self.call_daemon(client, 'set_button', index=args.button, image=str(image_path.resolve()),
+                             label=args.label or f'Button {args.button}')
+            logger.info(f"Sent image to button {args.button} through the daemon")
+            return
+
         self.connect()
         try:
-            # Validate image
-            image_path = Path(args.image)
-            if not image_path.exists():
-                logger.error(f"Image not found: {args.image}")
-                sys.exit(1)
-
-            # Check image size
-            img = Image.open(image_path)
-            if img.size != (196, 196):
-                logger.warning(f"Image size is {img.size}, expected (196, 196)")
 
             # Send to device
             button_dict = {
@@ -129,25 +197,77 @@ class UlanziCLI:
 
     def cmd_daemon(self, args):
         """Start daemon"""
-        from ulanzi_manager.daemon import UlanziDaemon
+        from ulanzi_manager.daemon import UlanziDaemon, setup_logging
 
+        setup_logging()
         daemon = UlanziDaemon(args.config)
         daemon.run()
 
+    def cmd_page(self, args):
+        """Switch the running daemon to another page"""
+        client = self.daemon_client()
+        if not client:
+            logger.error("Page switching requires a running daemon")
+            sys.exit(1)
+        result = self.call_daemon(client, 'set_page', page=args.page)
+        logger.info(f"Switched to page {result['page']}")
+
+    def cmd_state(self, args):
+        """Switch a button of the running daemon to one of its declared states"""
+        client = self.daemon_client()
+        if not client:
+            logger.error("Button states require a running daemon")
+            sys.exit(1)
+        state = int(args.state) if args.state.isdigit() else args.state
+        result = self.call_daemon(client, 'set_state', index=args.button, state=state, page=args.page)
+        logger.info(f"Button {result['index']} on page {result['page']} is now '{result['state']}'")
+
+    def cmd_events(self, args):
+        """Print events from the running daemon"""
+        import json
+        from ulanzi_manager.control import ControlError
+        client = self.daemon_client()
+        if not client:
+            logger.error("Events require a running daemon")
+            sys.exit(1)
+        try:
+            with client:
+                for event, params in client.subscribe(args.events or None):
+                    print(json.dumps({'event': event, **params}), flush=True)
+        except KeyboardInterrupt:
+            pass
+        except (ControlError, OSError) as e:
+            logger.error(f"Event stream failed: {e}")
+            sys.exit(1)
+
     def cmd_debug(self, args):
         """Debug mode - show button presses"""
+        logger.info("Debug mode: Press buttons to see their index")
+        logger.info("Button layout:")
+        logger.info("  0  1  2  3  4")
+        logger.info("  5  6  7  8  9")
+        logger.info(" 10 11 12")
+        logger.info(" 13 (Clock/Big Button)")
+        logger.info("")
+        logger.info("Waiting for button presses (Ctrl+C to exit)...")
+        logger.info("")
+
+        client = self.daemon_client()
+        if client:
+            # The daemon owns the device; listen to its press events instead
+            try:
+                with client:
+                    for _, press in client.subscribe(['press']):
+                        if press['pressed']:
+                            button_name = "Clock" if press['index'] == 13 else f"Button {press['index']}"
+                            logger.info(f">>> {button_name} PRESSED (index={press['index']}, state={press['state']}) <<<")
+            except KeyboardInterrupt:
+                logger.info("Debug mode stopped")
+            return
+
         self.connect()
         try:
             import time
-            logger.info("Debug mode: Press buttons to see their index")
-            logger.info("Button layout:")
-            logger.info("  0  1  2  3  4")
-            logger.info("  5  6  7  8  9")
-            logger.info(" 10 11 12")
-            logger.info(" 13 (Clock/Big Button)")
-            logger.info("")
-            logger.info("Waiting for button presses (Ctrl+C to exit)...")
-            logger.info("")
 
             while True:
                 button = self.device.read_button_press()
@@ -163,6 +283,7 @@ class UlanziCLI:
 
     def cmd_validate(self, args):
         """Validate configuration file"""
+        from ulanzi_manager.config import ConfigParser
         try:
             config = ConfigParser.load(args.config)
             errors = ConfigParser.validate(config)
@@ -179,6 +300,114 @@ class UlanziCLI:
             logger.error(f"Validation failed: {e}")
             sys.exit(1)
 
+    def cmd_bench(self, args):
+        """Run benchmarks against a simulated device"""
+        import json
+        from ulanzi_manager.bench import BENCHMARKS, run_benchmarks
+
+        if args.list:
+            from ulanzi_manager.bench import suites  # noqa: F401 - registers benchmarks
+            for name, (_, description) in BENCHMARKS.items():
+                print(f"{name:<20} {description}")
+            return
+
+        try:
+            report = run_benchmarks(args.only, iterations=args.iterations)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+
+        output = json.dumps(report, indent=2)
+        if args.output:
+            Path(args.output).write_text(output + '\n')
+            logger.info(f"Benchmark results written to {args.output}")
+        else:
+            print(output)
+
+    def cmd_trace(self, args):
+        """Control daemon tracing, or summarize and replay trace files"""
+        if args.trace_command in ('start', 'stop', 'dump'):
+            client = self.daemon_client()
+            if not client:
+                logger.error("Tracing requires a running daemon")
+                sys.exit(1)
+            if args.trace_command == 'dump':
+                path = str(Path(args.output).resolve()) if args.output else None
+                result = self.call_daemon(client, 'dump_trace', path=path)
+                logger.info(f"Wrote {result['events']} event(s) to {result['path']}")
+            else:
+                result = self.call_daemon(client, 'set_trace', enabled=args.trace_command == 'start',
+                                          events=getattr(args, 'events', None))
+                logger.info(f"Tracing {'started' if result['enabled'] else 'stopped'} "
+                            f"(buffer: {result['capacity']} events)")
+            return
+
+        import json
+        from ulanzi_manager.trace import load_trace, replay_trace, summarize_trace
+
+        try:
+            header, events = load_trace(args.file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot read trace: {e}")
+            sys.exit(1)
+
+        if args.trace_command == 'summarize':
+            summary = summarize_trace(events)
+            if args.json:
+                print(json.dumps(summary, indent=2))
+            else:
+                self._print_trace_summary(summary, header)
+            return
+
+        config = args.config or header.get('config')
+        if not config or not Path(config).exists():
+            logger.error("Config file for the replay not found; pass --config")
+            sys.exit(1)
+        # Keep per-press log lines out of the replay output
+        logging.disable(logging.INFO)
+        try:
+            replayed = replay_trace(events, config, speed=args.speed, run_actions=args.run_actions)
+        except ValueError as e:
+            replayed = None
+            error = str(e)
+        finally:
+            logging.disable(logging.NOTSET)
+        if replayed is None:
+            logger.error(error)
+            sys.exit(1)
+
+        if args.output:
+            from ulanzi_manager.trace import TRACE
+            TRACE.dump(args.output, config=str(Path(config).resolve()), replay_of=str(args.file))
+            logger.info(f"Replay trace written to {args.output}")
+        original, replay = summarize_trace(events), summarize_trace(replayed)
+        if args.json:
+            print(json.dumps({'original': original, 'replay': replay}, indent=2))
+            return
+        print(f"{'':<20} {'original p50/p95/p99 ms':>26} {'replay p50/p95/p99 ms':>26}")
+        for name in original['latency']:
+            before, after = original['latency'][name], replay['latency'][name]
+            print(f"{name:<20} {self._percentiles(before):>26} {self._percentiles(after):>26}")
+        print(f"{'presses':<20} {original['presses']:>26} {replay['presses']:>26}")
+
+    @staticmethod
+    def _percentiles(stats) -> str:
+        if not stats['iterations']:
+            return '-'
+        return f"{stats['median_ms']:.2f}/{stats['p95_ms']:.2f}/{stats['p99_ms']:.2f}"
+
+    def _print_trace_summary(self, summary, header):
+        print(f"{summary['events']} events over {summary['duration_ms'] / 1000:.1f}s"
+              f" ({header.get('dropped', 0)} older events dropped from the buffer)")
+        print(f"{summary['presses']} presses, {summary['actions_dropped']} dropped at the concurrency limit, "
+              f"{summary['action_errors']} failed")
+        print(f"{'':<32} {'count':>6} {'p50/p95/p99 ms':>22} {'max ms':>9}")
+        rows = [(name, stats) for name, stats in summary['latency'].items()]
+        rows += [(f"action {name}", stats) for name, stats in summary['actions'].items()]
+        rows += [(f"write {name}", stats) for name, stats in summary['hid_write'].items()]
+        for name, stats in rows:
+            print(f"{name:<32} {stats['iterations']:>6} {self._percentiles(stats):>22} {stats['max_ms']:>9.2f}")
+
     def cmd_generate_config(self, args):
         """Generate example configuration file"""
         example_config = """# Ulanzi D200 Configuration
@@ -257,6 +486,8 @@ buttons:
 
 def main():
     """Main entry point"""
+    logging.basicConfig(level=logging.INFO)
+
     parser = argparse.ArgumentParser(
         description='Ulanzi D200 Manager - Control your StreamDeck device',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -269,10 +500,17 @@ Examples:
   ulanzi-manager validate config.yaml            # Validate configuration
   ulanzi-manager generate-config config.yaml     # Generate example config
   ulanzi-manager debug                           # Debug mode - show button presses
+  ulanzi-manager page obs                        # Switch the running daemon to page 'obs'
+  ulanzi-manager events press                    # Stream press events from the daemon
+  ulanzi-manager bench --output bench.json       # Run benchmarks (no device needed)
+  ulanzi-manager trace dump && ulanzi-manager trace summarize ~/.local/share/ulanzi/trace.jsonl
   ulanzi-daemon config.yaml                      # Start background daemon
         """
     )
 
+    parser.add_argument('--socket', help='Daemon control socket (default: $XDG_RUNTIME_DIR/ulanzi/control.sock)')
+    parser.add_argument('--direct', action='store_true', help='Open the device directly even if a daemon is running')
+
     subparsers = parser.add_subparsers(dest='command', help='Command to execute')
 
     # Status command
@@ -307,13 +545,55 @@ Examples:
     # Debug command
     debug_parser = subparsers.add_parser('debug', help='Debug mode - show button presses')
 
+    # Page command
+    page_parser = subparsers.add_parser('page', help='Switch the running daemon to another page')
+    page_parser.add_argument('page', help='Page name')
+
+    # State command
+    state_parser = subparsers.add_parser('state', help='Switch a button of the running daemon to another state')
+    state_parser.add_argument('button', type=int, help='Button index')
+    state_parser.add_argument('state', help='State name or number')
+    state_parser.add_argument('--page', help='Page of the button (default: current page)')
+
+    # Events command
+    events_parser = subparsers.add_parser('events', help='Print events from the running daemon')
+    events_parser.add_argument('events', nargs='*', help='Event names to receive (default: all)')
+
+    # Bench command
+    bench_parser = subparsers.add_parser('bench', help='Run benchmarks against a simulated device')
+    bench_parser.add_argument('only', nargs='*', help='Benchmarks to run (default: all)')
+    bench_parser.add_argument('--iterations', type=int, default=50, help='Iterations per benchmark')
+    bench_parser.add_argument('--output', help='Write JSON results to file instead of stdout')
+    bench_parser.add_argument('--list', action='store_true', help='List available benchmarks')
+
+    # Trace command
+    trace_parser = subparsers.add_parser('trace', help='Record, summarize and replay press/action traces')
+    trace_commands = trace_parser.add_subparsers(dest='trace_command', required=True)
+    trace_start_parser = trace_commands.add_parser('start', help='Start tracing in the running daemon')
+    trace_start_parser.add_argument('--events', type=int, help='Events to keep (default: from config)')
+    trace_commands.add_parser('stop', help='Stop tracing in the running daemon')
+    trace_dump_parser = trace_commands.add_parser('dump', help="Write the daemon's trace buffer to a file")
+    trace_dump_parser.add_argument('--output', help='Trace file (default: from config)')
+    trace_summary_parser = trace_commands.add_parser('summarize', help='Show latency percentiles of a trace file')
+    trace_summary_parser.add_argument('file', help='Trace file')
+    trace_summary_parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    trace_replay_parser = trace_commands.add_parser('replay', help='Replay a trace against a simulated device')
+    trace_replay_parser.add_argument('file', help='Trace file')
+    trace_replay_parser.add_argument('--config', help='Config file (default: the one recorded in the trace)')
+    trace_replay_parser.add_argument('--speed', type=float, default=1.0,
+                                     help='Replay speed factor (0: as fast as possible)')
+    trace_replay_parser.add_argument('--run-actions', action='store_true',
+                                     help='Run actions instead of only page switches')
+    trace_replay_parser.add_argument('--output', help='Write the replay trace to file')
+    trace_replay_parser.add_argument('--json', action='store_true', help='Print both summaries as JSON')
+
     args = parser.parse_args()
 
     if not args.command:
         parser.print_help()
         sys.exit(1)
 
-    cli = UlanziCLI()
+    cli = UlanziCLI(socket_path=args.socket, direct=args.direct)
 
     # Execute command
     command_method = getattr(cli, f'cmd_{args.command.replace("-", "_")}', None)
@@ -0,0 +1,325 @@
+"""Layered icon compositing
+
+A 'layers' icon spec is a stack drawn bottom to top:
+
+    icon_spec:
+      type: layers
+      layers:
+        - {type: background, color: '#202020', gradient: '#000000'}
+        - {type: image, path: ./icons/obs.png, scale: 0.7}
+        - {type: glyph, icon: mic, font: material, color: '#FF0000', size: 40, position: top-left}
+        - {type: text, text: 'LIVE', color: '#FFFFFF', font_size: 32, position: bottom}
+        - {type: badge, text: '3', color: '#FF3B30'}
+
+Each layer is rendered on its own transparent canvas and cached by the
+hash of its spec, and every partial stack is cached by the chained hash
+of its layers. Rendering a spec starts from the longest cached stack, so
+changing the badge text renders one badge layer and composites it over
+the cached base.
+"""
+
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ulanzi_manager.atlas import ATLASES, is_atlas_ref, split_ref
+from ulanzi_manager.glyphs import GLYPHS, GlyphCache, emoji_font, find_font, icon_font, icon_text
+from ulanzi_manager.metrics import ICON_LAYER_CACHE
+from ulanzi_manager.textfit import DEFAULT_FONTS, DEFAULT_MAX_LINES, DEFAULT_MIN_SIZE, fit_text, font_at
+
+logger = logging.getLogger(__name__)
+
+LAYER_TYPES = ('background', 'image', 'glyph', 'text', 'badge')
+POSITIONS = ('center', 'top', 'bottom', 'left', 'right', 'top-left', 'top-right', 'bottom-left', 'bottom-right')
+# Rendered layers and partial stacks kept in memory
+LAYER_CACHE_SIZE = 256
+
+# Fields each layer type needs (one of them)
+_REQUIRED = {'image': ('path',), 'glyph': ('char', 'emoji', 'icon'), 'text': ('text',), 'badge': ('text',)}
+
+
+def required_fields(kind: str) -> Tuple[str, ...]:
+    """Fields a layer type needs, one of which must be set (empty if none)"""
+    return _REQUIRED.get(kind, ())
+
+
+def missing_fields_error(kind: str) -> str:
+    return f"'{kind}' layer requires " + ' or '.join(f"'{key}'" for key in required_fields(kind))
+
+
+def text_font(font: Optional[str]) -> Optional[str]:
+    """Font file (or system font name) for text glyphs, like textfit.load_font; None for PIL's default"""
+    from PIL import ImageFont
+
+    if font:
+        if find_font(font):
+            return find_font(font)
+        try:
+            ImageFont.truetype(font, 10)
+            return font
+        except (OSError, IOError):
+            logger.warning(f"Font not found: {font}, using default")
+    return next((path for path in DEFAULT_FONTS if os.path.isfile(path)), None)
+
+
+def validate_layers(layers: Any) -> List[str]:
+    """Errors in a list of layer specs"""
+    if not isinstance(layers, list) or not layers:
+        return ["'layers' type requires a non-empty 'layers' list"]
+    errors = []
+    for position, layer in enumerate(layers):
+        kind = layer.get('type') if isinstance(layer, dict) else None
+        if kind not in LAYER_TYPES:
+            errors.append(f"layers[{position}]: type must be one of: {', '.join(LAYER_TYPES)}")
+        elif required_fields(kind) and all(layer.get(key) in (None, '') for key in required_fields(kind)):
+            errors.append(f"layers[{position}]: {missing_fields_error(kind)}")
+    return errors
+
+
+def with_badge(spec: Dict[str, Any], text: Optional[str]) -> Dict[str, Any]:
+    """Copy of a layers spec with the top badge set to text ('' or None removes it)"""
+    layers = [layer for layer in spec.get('layers', [])]
+    badge = layers.pop() if layers and layers[-1].get('type') == 'badge' else {'type': 'badge'}
+    if text not in (None, ''):
+        layers.append(dict(badge, text=str(text)))
+    return dict(spec, layers=layers)
+
+
+def _anchor(position, box: Tuple[int, int], size: Tuple[int, int], margin: int) -> Tuple[int, int]:
+    """Top-left corner of a box placed at position ('center', 'top-right', ... or [x, y])"""
+    if isinstance(position, (list, tuple)):
+        return int(position[0]), int(position[1])
+    position = position or 'center'
+    x = (size[0] - box[0]) // 2
+    y = (size[1] - box[1]) // 2
+    if 'left' in position:
+        x = margin
+    elif 'right' in position:
+        x = size[0] - box[0] - margin
+    if position.startswith('top'):
+        y = margin
+    elif position.startswith('bottom'):
+        y = size[1] - box[1] - margin
+    return x, y
+
+
+def _draw_text(canvas, text: str, font, color, position, margin: int):
+    from PIL import ImageDraw
+
+    draw = ImageDraw.Draw(canvas)
+    spacing = max(1, int(getattr(font, 'size', 10) * 0.15))
+    left, top, right, bottom = draw.multiline_textbbox((0, 0), text, font=font, spacing=spacing, align='center')
+    x, y = _anchor(position, (right - left, bottom - top), canvas.size, margin)
+    draw.multiline_text((x - left, y - top), text, fill=color, font=font, spacing=spacing, align='center')
+
+
+def _source_stamp(path: str) -> Any:
+    """Changes whenever the image a path or atlas reference draws changes"""
+    try:
+        if is_atlas_ref(path):
+            return ATLASES.atlas(split_ref(path)[0]).stamp  # Index and sheet, reloaded on change
+        return os.stat(os.path.expanduser(path)).st_mtime_ns
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def glyph_source(layer: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """Font file and characters of a glyph layer ('emoji', 'icon' or 'char')"""
+    if layer.get('emoji'):
+        font_path = emoji_font(layer.get('font'))
+        if font_path is None:
+            logger.warning("No color emoji font found, drawing the emoji with the text font")
+            font_path = text_font(None)
+        return font_path, str(layer['emoji'])
+    if layer.get('icon'):
+        font_path = icon_font(layer.get('font'))
+        return font_path, icon_text(layer['icon'], font_path)
+    return text_font(layer.get('font')), str(layer['char'])
+
+
+def render_layer(layer: Dict[str, Any], size: Tuple[int, int], glyphs: Optional[GlyphCache] = None):
+    """One layer on a transparent RGBA canvas of the icon size"""
+    from PIL import Image, ImageDraw
+
+    kind = layer['type']
+    canvas = Image.new('RGBA', size, (0, 0, 0, 0))
+    margin = int(layer.get('margin', 8))
+
+    if kind == 'background':
+        start = layer.get('color', '#000000')
+        if layer.get('gradient'):
+            top = Image.new('RGBA', size, start)
+            bottom = Image.new('RGBA', size, layer['gradient'])
+            mask = Image.linear_gradient('L').resize(size)
+            canvas = Image.composite(bottom, top, mask)
+        else:
+            canvas = Image.new('RGBA', size, start)
+
+    elif kind == 'image':
+        source = layer['path']
+        source = io.BytesIO(ATLASES.tile(source)) if is_atlas_ref(source) else os.path.expanduser(source)
+        with Image.open(source) as opened:
+            image = opened.convert('RGBA')
+        scale = float(layer.get('scale', 1.0))
+        box = (max(1, int(size[0] * scale)), max(1, int(size[1] * scale)))
+        if layer.get('keep_aspect', True):
+            ratio = min(box[0] / image.width, box[1] / image.height)
+            box = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+        if image.size != box:
+            image = image.resize(box, Image.LANCZOS)
+        if 'opacity' in layer:
+            alpha = image.getchannel('A').point(lambda value: int(value * float(layer['opacity'])))
+            image.putalpha(alpha)
+        canvas.alpha_composite(image, _anchor(layer.get('position'), image.size, size, margin))
+
+    elif kind == 'glyph':
+        font_path, text = glyph_source(layer)
+        glyph = (glyphs or GLYPHS).get(font_path, text, int(layer.get('size', 96)), layer.get('color', '#FFFFFF'))
+        canvas.alpha_composite(glyph, _anchor(layer.get('position'), glyph.size, size, margin))
+
+    elif kind == 'text':
+        text, font_size = str(layer['text']), layer.get('font_size', 40)
+        if font_size == 'auto':
+            fitted = fit_text(text, (size[0] - 2 * margin, size[1] - 2 * margin), layer.get('font'),
+                              max_size=int(layer.get('max_font_size', 150)),
+                              min_size=int(layer.get('min_font_size', DEFAULT_MIN_SIZE)),
+                              max_lines=int(layer.get('max_lines', DEFAULT_MAX_LINES)))
+            text, font_size = fitted.text, fitted.size
+        font = font_at(layer.get('font'), int(font_size))
+        _draw_text(canvas, text, font, layer.get('color', '#FFFFFF'), layer.get('position'), margin)
+
+    elif kind == 'badge':
+        # Pill around the text, at least a circle of 'size' pixels
+        text = str(layer['text'])
+        diameter = int(layer.get('size', 56))
+        font = font_at(layer.get('font'), int(layer.get('font_size', diameter * 0.6)))
+        draw = ImageDraw.Draw(canvas)
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        width = max(diameter, right - left + diameter // 2)
+        x, y = _anchor(layer.get('position', 'top-right'), (width, diameter), size, int(layer.get('margin', 4)))
+        draw.rounded_rectangle((x, y, x + width - 1, y + diameter - 1), radius=diameter // 2,
+                               fill=layer.get('color', '#FF3B30'))
+        draw.text((x + width / 2, y + diameter / 2), text, fill=layer.get('text_color', '#FFFFFF'),
+                  font=font, anchor='mm')
+
+    return canvas
+
+
+class Compositor:
+    """Render layer stacks through an LRU of rendered layers and partial stacks"""
+
+    def __init__(self, capacity: int = LAYER_CACHE_SIZE, glyphs: Optional[GlyphCache] = None):
+        self.capacity = capacity
+        self.glyphs = glyphs
+        self._layers: 'OrderedDict[str, Any]' = OrderedDict()  # layer hash -> rendered layer
+        self._stacks: 'OrderedDict[str, Any]' = OrderedDict()  # chained hash -> composited stack
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def layer_hash(layer: Dict[str, Any], size: Tuple[int, int]) -> str:
+        """Hash of a layer spec, including the stamp of the image it draws"""
+        key = [layer, list(size)]
+        if layer.get('type') == 'image':
+            key.append(_source_stamp(layer['path']))
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def render(self, layers: List[Dict[str, Any]], size: Tuple[int, int]):
+        """Composite a stack of layers into an RGBA image"""
+        from PIL import Image
+
+        size = tuple(size)
+        keys = []
+        chained = ''
+        for layer in layers:
+            chained = hashlib.sha256((chained + self.layer_hash(layer, size)).encode()).hexdigest()[:16]
+            keys.append(chained)
+
+        # Longest partial stack already composited
+        start, image = 0, None
+        with self._lock:
+            for depth in range(len(keys), 0, -1):
+                cached = self._stacks.get(keys[depth - 1])
+                if cached is not None:
+                    self._stacks.move_to_end(keys[depth - 1])
+                    start, image = depth, cached
+                    break
+        ICON_LAYER_CACHE.inc(start, label_value='hit')
+        ICON_LAYER_CACHE.inc(len(layers) - start, label_value='miss')
+
+        for depth in range(start, len(layers)):
+            layer = self._layer(layers[depth], size)
+            image = layer if image is None else Image.alpha_composite(image, layer)
+            self._store(self._stacks, keys[depth], image)
+        return (image if image is not None else Image.new('RGBA', size, (0, 0, 0, 0))).copy()
+
+    def _layer(self, layer: Dict[str, Any], size: Tuple[int, int]):
+        key = self.layer_hash(layer, size)
+        with self._lock:
+            rendered = self._layers.get(key)
+            if rendered is not None:
+                self._layers.move_to_end(key)
+                return rendered
+        rendered = render_layer(layer, size, self.glyphs)
+        self._store(self._layers, key, rendered)
+        return rendered
+
+    def _store(self, cache: OrderedDict, key: str, image):
+        with self._lock:
+            cache[key] = image
+            cache.move_to_end(key)
+            while len(cache) > self.capacity:
+                cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._layers.clear()
+            self._stacks.clear()
+
+
+COMPOSITOR = Compositor()
+
+
+# Largest font size of baked labels
+LABEL_FONT_SIZE = 32
+# Device label style 'Align' -> text layer position
+_ALIGN_POSITIONS = {'top': 'top', 'middle': 'center', 'center': 'center', 'bottom': 'bottom'}
+
+
+def label_layer(label: str, style: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Text layer drawing a button label the way the device would place it.
+
+    style uses the keys of the device label style (Align, Color, FontName).
+    """
+    style = style or {}
+    color = style.get('Color', 0xFFFFFF)
+    layer = {
+        'type': 'text', 'text': label, 'font_size': 'auto', 'max_font_size': LABEL_FONT_SIZE, 'max_lines': 2,
+        'color': f'#{color:06X}' if isinstance(color, int) else color,
+        'position': _ALIGN_POSITIONS.get(str(style.get('Align', 'bottom')), 'bottom'),
+    }
+    if style.get('FontName'):
+        layer['font'] = style['FontName']
+    return layer
+
+
+def bake_label(image: Optional[str], label: str, style: Optional[Dict[str, Any]] = None) -> bytes:
+    """PNG of a button image with its label drawn in"""
+    return _bake_label(image, _source_stamp(image) if image else None, label, json.dumps(style or {}, sort_keys=True))
+
+
+@functools.lru_cache(maxsize=256)
+def _bake_label(image: Optional[str], stamp: Any, label: str, style: str) -> bytes:
+    from ulanzi_manager.atlas import ICON_SIZE
+
+    layers = [{'type': 'image', 'path': image}] if image else [{'type': 'background', 'color': '#000000'}]
+    text = dict(label_layer(label, json.loads(style)), margin=6)
+    rendered = COMPOSITOR.render(layers + [text], ICON_SIZE)
+    buffer = io.BytesIO()
+    rendered.save(buffer, 'PNG')
+    return buffer.getvalue()
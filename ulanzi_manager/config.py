@@ -1,13 +1,27 @@
 """Configuration file parser for Ulanzi Manager"""
 
+import hashlib
+import re
 import yaml
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
+# Name of the page defined by the top-level 'buttons' list
+MAIN_PAGE = 'main'
+
+
+@dataclass
+class ButtonState:
+    """One declared state of a button: its own icon and label"""
+    name: str
+    image: Optional[str] = None
+    label: Optional[str] = None  # None: the label of the button
+    icon_spec: Optional[Dict[str, Any]] = None
+
 
 @dataclass
 class ButtonConfig:
@@ -19,6 +33,97 @@ class ButtonConfig:
     action_params: Dict[str, Any]
     state: int = 0
     icon_spec: Optional[Dict[str, Any]] = field(default=None)  # Icon generation spec
+    page: str = 'main'
+    animation: Optional[Dict[str, Any]] = None  # Animated icon spec (see animation.py)
+    label_mode: Optional[str] = None  # 'device', 'baked' or 'auto' (default: Config.label_mode)
+    label_style: Optional[Dict[str, Any]] = None  # Overrides of the device label style
+    dynamic_label: bool = False  # 'auto' label seen changing often at runtime: rendered by the device
+    states: List[ButtonState] = field(default_factory=list)  # Declared states; 'state' is the current one
+    state_from: Any = None  # What drives the state: 'press', 'exit_code' or {obs: ...} (see states.py)
+    source_digest: Optional[str] = None  # Digest of the definition with templates applied (see includes.py)
+
+    @property
+    def name(self) -> str:
+        """Name used in log and error messages"""
+        return f"Button {self.index}" if self.page == MAIN_PAGE else f"Page '{self.page}' button {self.index}"
+
+    @property
+    def baked_label(self) -> bool:
+        """Whether the label is drawn into the image instead of by the device"""
+        if not self.label or self.animation:
+            return False
+        return self.label_mode == 'baked' or (self.label_mode == 'auto' and not self.dynamic_label)
+
+    @property
+    def icon_key(self):
+        """Key used for generated icon filenames"""
+        return self.index if self.page == MAIN_PAGE else f"{self.page}_{self.index}"
+
+    def images(self) -> List[str]:
+        """Current image and the images of every declared state"""
+        images = [self.image] + [state.image for state in self.states]
+        return [image for image in dict.fromkeys(images) if image]
+
+    def apply_state(self, state: int):
+        """Show one of the declared states (its index is the manifest 'State')"""
+        declared = self.states[state]
+        self.state = state
+        self.image = declared.image
+        self.label = declared.label
+
+
+@dataclass
+class BrightnessSchedule:
+    """Time-of-day brightness profile, idle dimming and fades"""
+    profile: List[Tuple[str, int]] = field(default_factory=list)  # ('HH:MM', brightness)
+    idle_timeout: Optional[float] = None  # Seconds without presses before dimming
+    idle_brightness: int = 10
+    fade_step: int = 5  # Max brightness change per write
+    fade_interval: float = 0.05  # Min seconds between brightness writes
+
+    @staticmethod
+    def parse_time(value: str) -> int:
+        """Parse 'HH:MM' into minutes since midnight"""
+        hours, minutes = str(value).split(':')
+        hours, minutes = int(hours), int(minutes)
+        if not (0 <= hours < 24 and 0 <= minutes < 60):
+            raise ValueError(f"invalid time '{value}'")
+        return hours * 60 + minutes
+
+
+@dataclass
+class FocusRule:
+    """Page to show while a matching window has the focus"""
+    page: str
+    app: Optional[str] = None  # Regex on the application (WM_CLASS / app_id)
+    title: Optional[str] = None  # Regex on the window title
+
+    def matches(self, app: str, title: str) -> bool:
+        if self.app is None and self.title is None:
+            return False
+        return ((self.app is None or re.search(self.app, app or '', re.IGNORECASE) is not None) and
+                (self.title is None or re.search(self.title, title or '', re.IGNORECASE) is not None))
+
+
+@dataclass
+class FocusConfig:
+    """Page switching by focused window (see focus.py)"""
+    backend: str = 'auto'  # 'auto', 'x11', 'sway', 'hyprland' or 'poll'
+    poll_interval: float = 0.5  # Seconds between queries of the 'poll' backend
+    default_page: Optional[str] = None  # Page for windows no rule matches (default: stay)
+    rules: List[FocusRule] = field(default_factory=list)
+
+    def page_for(self, app: str, title: str) -> Optional[str]:
+        """Page of the first matching rule, else the default page"""
+        for rule in self.rules:
+            if rule.matches(app, title):
+                return rule.page
+        return self.default_page
+
+    def pages(self) -> List[str]:
+        """Every page a focus change can switch to"""
+        pages = [rule.page for rule in self.rules] + ([self.default_page] if self.default_page else [])
+        return list(dict.fromkeys(pages))
 
 
 @dataclass
@@ -26,10 +131,34 @@ class Config:
     """Main configuration"""
     brightness: int = 100
     label_style: Dict[str, Any] = None
+    label_mode: str = 'device'  # Default for buttons: 'device', 'baked' or 'auto'
     buttons: List[ButtonConfig] = None
     obs_host: str = "localhost"
     obs_port: int = 4444
     obs_password: Optional[str] = None
+    compression: str = 'default'  # 'default', 'auto', 'stored', 'deflated'
+    compression_min_ratio: float = 0.9
+    brightness_schedule: Optional[BrightnessSchedule] = None
+    metrics_listen: Optional[str] = None  # 'host:port' or 'unix:/path'
+    pages: Dict[str, List[ButtonConfig]] = field(default_factory=dict)  # Extra pages by name
+    control_socket: Optional[str] = None  # Control socket path (default: runtime dir)
+    control_enabled: bool = True
+    snapshot_enabled: bool = True  # Cache the compiled config next to the YAML
+    skip_unchanged_upload: bool = False  # Trust the deck still shows the last startup upload
+    trace_enabled: bool = False  # Record presses, actions and HID traffic (see trace.py)
+    trace_events: int = 20000  # Events kept in the trace ring buffer
+    trace_path: Optional[str] = None  # Trace file (default: ~/.local/share/ulanzi/trace.jsonl)
+    animation_max_fps: float = 10.0  # Upper bound; lowered automatically on a slow link
+    animation_idle_timeout: Optional[float] = 300.0  # Seconds without presses before animations pause
+    atlases: Dict[str, str] = field(default_factory=dict)  # Atlas name -> index path (see atlas.py)
+    prefetch_enabled: bool = True  # Prepare the pages reachable from the current one (see prefetch.py)
+    prefetch_pages: int = 8  # Pages kept in the prefetch cache
+    prefetch_memory_mb: float = 32.0  # Bytes of archives kept in the prefetch cache, in MiB
+    focus: Optional[FocusConfig] = None  # Page switching by focused window
+    errors: List[str] = field(default_factory=list)  # Schema errors found while loading
+    sources: List[str] = field(default_factory=list)  # Config file and included files
+    graph: Optional[Any] = None  # Templates used by each button (includes.ConfigGraph)
+    settings_digest: Optional[str] = None  # Digest of everything but buttons, pages and templates
 
     def __post_init__(self):
         if self.label_style is None:
@@ -37,31 +166,105 @@ class Config:
         if self.buttons is None:
             self.buttons = []
 
+    def page_names(self) -> List[str]:
+        """All page names, main page first"""
+        return [MAIN_PAGE] + [name for name in self.pages if name != MAIN_PAGE]
+
+    def page_buttons(self, page: str) -> List[ButtonConfig]:
+        """Buttons of a page"""
+        if page == MAIN_PAGE:
+            return self.buttons
+        if page not in self.pages:
+            raise KeyError(f"Unknown page: {page}")
+        return self.pages[page]
+
+    def all_buttons(self) -> List[ButtonConfig]:
+        """Buttons of every page"""
+        buttons = list(self.buttons)
+        for name in self.page_names()[1:]:
+            buttons.extend(self.pages[name])
+        return buttons
+
+
+def device_buttons(buttons: List[ButtonConfig], label_style: Optional[Dict[str, Any]] = None) -> Dict[int, Dict]:
+    """Device button dictionary for a list of buttons.
+
+    label_style is the deck's label style (Config.label_style): baked labels
+    are drawn with it under each button's own overrides, like the device
+    draws its labels.
+    """
+    from ulanzi_manager.atlas import ATLASES, is_atlas_ref
+
+    result = {}
+    for button in buttons:
+        entry = {'label': button.label, 'state': button.state}  # No image: e.g. animation only
+        if button.baked_label:
+            from ulanzi_manager.compositor import bake_label
+            data = bake_label(button.image, button.label, {**(label_style or {}), **(button.label_style or {})})
+            name = f"label_{hashlib.sha256(data).hexdigest()[:12]}.png"
+            entry = {'state': button.state, 'image': name, 'image_data': data}
+        elif is_atlas_ref(button.image):
+            entry.update(image=ATLASES.icon_name(button.image), image_data=ATLASES.tile(button.image))
+        elif button.image:
+            entry['image'] = button.image
+        if button.label_style and 'label' in entry:
+            entry['label_style'] = button.label_style
+        result[button.index] = entry
+    return result
+
 
 class ConfigParser:
     """Parse YAML configuration files"""
 
     @staticmethod
-    def load(config_path: str) -> Config:
-        """Load configuration from YAML file"""
+    def load(config_path: str, previous: Optional[Config] = None) -> Config:
+        """Load configuration from YAML file.
+
+        previous is the config loaded before from the same file: icons of
+        buttons whose definition did not change are not rendered again.
+        """
         config_file = Path(config_path)
         if not config_file.exists():
             raise FileNotFoundError(f"Config file not found: {config_path}")
 
-        with open(config_file, 'r') as f:
-            data = yaml.safe_load(f) or {}
+        from ulanzi_manager.includes import load_document
+        from ulanzi_manager.schema import validate_document
 
-        config = ConfigParser._parse_config(data, config_file.parent)
+        document = load_document(config_file)
+        node = document.node
+        errors = document.errors + validate_document(node, config_file.parent)
+        loader = yaml.SafeLoader('')
+        try:
+            data = (loader.construct_document(node) if node is not None else None) or {}
+        finally:
+            loader.dispose()
+
+        errors = [f"{Path(error.file).name if error.file else config_file.name}:{error.line}:{error.column}: "
+                  f"{error.message}" for error in errors]
+        try:
+            config = ConfigParser._parse_config(data, config_file.parent)
+        except (TypeError, ValueError, AttributeError):
+            if not errors:
+                raise
+            config = Config()
+        config.errors = errors
+        config.sources = document.files
+        config.graph = document.graph
 
         # Generate icons from specs if needed
-        ConfigParser._generate_icons(config, config_file.parent)
+        if not errors:
+            ConfigParser._generate_icons(config, config_file.parent, previous)
 
         return config
 
     @staticmethod
     def _parse_config(data: Dict, base_path: Path) -> Config:
         """Parse configuration dictionary"""
+        from ulanzi_manager.includes import digest
+
         config = Config()
+        config.settings_digest = digest({key: value for key, value in data.items()
+                                         if key not in ('buttons', 'pages', 'templates', 'include')})
 
         # Global settings
         if 'brightness' in data:
@@ -69,6 +272,7 @@ class ConfigParser:
 
         if 'label_style' in data:
             config.label_style = data['label_style']
+        config.label_mode = data.get('label_mode', config.label_mode)
 
         # OBS settings
         if 'obs' in data:
@@ -77,36 +281,157 @@ class ConfigParser:
             config.obs_port = obs_config.get('port', 4444)
             config.obs_password = obs_config.get('password')
 
+        if 'brightness_schedule' in data:
+            config.brightness_schedule = ConfigParser._parse_brightness_schedule(data['brightness_schedule'] or {})
+
+        # Metrics endpoint
+        if 'metrics' in data and data['metrics']:
+            config.metrics_listen = str(data['metrics'].get('listen', '127.0.0.1:9464'))
+
+        # Upload compression policy
+        if 'compression' in data:
+            compression = data['compression']
+            if isinstance(compression, dict):
+                config.compression = compression.get('mode', 'default')
+                config.compression_min_ratio = float(compression.get('min_ratio', 0.9))
+            else:
+                config.compression = compression
+
+        # Control socket
+        if 'control' in data and data['control'] is not None:
+            control = data['control']
+            config.control_enabled = bool(control.get('enabled', True))
+            config.control_socket = control.get('socket')
+
+        # Compiled snapshot
+        if 'snapshot' in data and data['snapshot'] is not None:
+            snapshot = data['snapshot']
+            if isinstance(snapshot, dict):
+                config.snapshot_enabled = bool(snapshot.get('enabled', True))
+                config.skip_unchanged_upload = bool(snapshot.get('skip_unchanged_upload', False))
+            else:
+                config.snapshot_enabled = bool(snapshot)
+
+        # Event tracing
+        if 'trace' in data and data['trace'] is not None:
+            trace = data['trace']
+            if isinstance(trace, dict):
+                config.trace_enabled = bool(trace.get('enabled', True))
+                config.trace_events = int(trace.get('events', config.trace_events))
+                config.trace_path = trace.get('path')
+            else:
+                config.trace_enabled = bool(trace)
+
+        # Animated icons
+        if data.get('animations'):
+            animations = data['animations']
+            config.animation_max_fps = float(animations.get('max_fps', config.animation_max_fps))
+            if 'idle_timeout' in animations:
+                idle_timeout = animations['idle_timeout']
+                config.animation_idle_timeout = float(idle_timeout) if idle_timeout else None
+
+        # Page prefetch
+        if 'prefetch' in data and data['prefetch'] is not None:
+            prefetch = data['prefetch']
+            if isinstance(prefetch, dict):
+                config.prefetch_enabled = bool(prefetch.get('enabled', True))
+                config.prefetch_pages = int(prefetch.get('max_pages', config.prefetch_pages))
+                config.prefetch_memory_mb = float(prefetch.get('max_memory_mb', config.prefetch_memory_mb))
+            else:
+                config.prefetch_enabled = bool(prefetch)
+
+        # Page switching by focused window
+        if data.get('focus'):
+            config.focus = ConfigParser._parse_focus(data['focus'])
+
+        # Icon atlases, before the buttons that use them
+        for name, index_path in (data.get('atlases') or {}).items():
+            index_path = Path(index_path).expanduser()
+            if not index_path.is_absolute():
+                index_path = base_path / index_path
+            config.atlases[str(name)] = str(index_path)
+
         # Parse buttons
-        buttons = []
-        if 'buttons' in data:
-            for idx, button_data in enumerate(data['buttons']):
-                if button_data is None:
-                    continue
+        config.buttons = ConfigParser._parse_buttons(data.get('buttons') or [], base_path, MAIN_PAGE)
 
-                button = ConfigParser._parse_button(idx, button_data, base_path)
-                buttons.append(button)
+        # Parse extra pages
+        for page, page_buttons in (data.get('pages') or {}).items():
+            config.pages[str(page)] = ConfigParser._parse_buttons(page_buttons or [], base_path, str(page))
 
-        config.buttons = buttons
-        logger.info(f"Loaded config with {len(buttons)} button(s)")
+        ConfigParser._resolve_atlas_images(config)
+        for button in config.all_buttons():
+            button.label_mode = button.label_mode or config.label_mode
+            if button.states:
+                button.apply_state(min(max(0, int(button.state)), len(button.states) - 1))
+
+        logger.info(f"Loaded config with {len(config.buttons)} button(s) and {len(config.pages)} extra page(s)")
         return config
 
+    @staticmethod
+    def _parse_buttons(data: List, base_path: Path, page: str) -> List[ButtonConfig]:
+        """Parse a list of button definitions"""
+        from ulanzi_manager.includes import digest
+
+        buttons = []
+        for idx, button_data in enumerate(data):
+            if button_data is None:
+                continue
+
+            button = ConfigParser._parse_button(idx, button_data, base_path)
+            button.page = page
+            button.source_digest = digest(button_data)
+            buttons.append(button)
+        return buttons
+
+    @staticmethod
+    def _parse_brightness_schedule(data: Dict) -> BrightnessSchedule:
+        """Parse brightness schedule settings"""
+        schedule = BrightnessSchedule()
+        for entry in data.get('profile', []) or []:
+            schedule.profile.append((str(entry.get('time', '')), int(entry.get('brightness', 100))))
+        if data.get('idle_timeout') is not None:
+            schedule.idle_timeout = float(data['idle_timeout'])
+        schedule.idle_brightness = int(data.get('idle_brightness', schedule.idle_brightness))
+        schedule.fade_step = int(data.get('fade_step', schedule.fade_step))
+        schedule.fade_interval = float(data.get('fade_interval', schedule.fade_interval))
+        return schedule
+
+    @staticmethod
+    def _parse_focus(data: Dict) -> FocusConfig:
+        """Parse focus tracking settings"""
+        focus = FocusConfig()
+        focus.backend = str(data.get('backend', focus.backend))
+        focus.poll_interval = float(data.get('poll_interval', focus.poll_interval))
+        focus.default_page = data.get('default')
+        for rule in data.get('rules') or []:
+            focus.rules.append(FocusRule(page=str(rule.get('page', '')), app=rule.get('app'), title=rule.get('title')))
+        return focus
+
     @staticmethod
     def _parse_button(index: int, data: Dict, base_path: Path) -> ButtonConfig:
         """Parse button configuration"""
-        # Resolve image path relative to config file
-        image = data.get('image')
-        if image:
-            image_path = Path(image)
-            if not image_path.is_absolute():
-                image_path = base_path / image_path
-            image = str(image_path)
-
+        image = ConfigParser._resolve_image(data.get('image'), base_path)
         label = data.get('label', '')
         action_type = data.get('action', 'command')
         action_params = data.get('params', {})
         state = data.get('state', 0)
-        icon_spec = data.get('icon_spec')
+        icon_spec = ConfigParser._resolve_icon_spec(data.get('icon_spec'), base_path)
+
+        states = []
+        for number, state_data in enumerate(data.get('states') or []):
+            states.append(ButtonState(
+                name=str(state_data.get('name', number)),
+                image=ConfigParser._resolve_image(state_data.get('image'), base_path),
+                label=str(state_data['label']) if state_data.get('label') is not None else label,
+                icon_spec=ConfigParser._resolve_icon_spec(state_data.get('icon_spec'), base_path),
+            ))
+
+        animation = data.get('animation')
+        if animation and animation.get('file'):
+            animation_path = Path(animation['file']).expanduser()
+            if not animation_path.is_absolute():
+                animation_path = base_path / animation_path
+            animation = dict(animation, file=str(animation_path))
 
         return ButtonConfig(
             index=index,
@@ -115,12 +440,58 @@ class ConfigParser:
             action_type=action_type,
             action_params=action_params,
             state=state,
-            icon_spec=icon_spec
+            icon_spec=icon_spec,
+            animation=animation,
+            label_mode=data.get('label_mode'),
+            label_style=data.get('label_style'),
+            states=states,
+            state_from=data.get('state_from'),
         )
 
     @staticmethod
-    def _generate_icons(config: Config, base_path: Path) -> None:
-        """Generate icons from specs and update image paths"""
+    def _resolve_image(image: Optional[str], base_path: Path) -> Optional[str]:
+        """Resolve an image path relative to the config file"""
+        if image and not image.startswith('atlas:'):
+            image_path = Path(image)
+            if not image_path.is_absolute():
+                image_path = base_path / image_path
+            image = str(image_path)
+        return image
+
+    @staticmethod
+    def _resolve_icon_spec(icon_spec: Optional[Dict], base_path: Path) -> Optional[Dict]:
+        """Resolve image layer paths relative to the config file"""
+        if icon_spec and isinstance(icon_spec.get('layers'), list):
+            layers = []
+            for layer in icon_spec['layers']:
+                if isinstance(layer, dict) and layer.get('path'):
+                    layer_path = Path(layer['path']).expanduser()
+                    if not layer_path.is_absolute():
+                        layer = dict(layer, path=str(base_path / layer_path))
+                layers.append(layer)
+            icon_spec = dict(icon_spec, layers=layers)
+        return icon_spec
+
+    @staticmethod
+    def _resolve_atlas_images(config: Config) -> None:
+        """Resolve 'atlas:' images to the index file of their atlas"""
+        from ulanzi_manager.atlas import ATLASES, is_atlas_ref
+
+        for button in config.all_buttons():
+            for item in [button] + button.states:
+                if is_atlas_ref(item.image):
+                    try:
+                        item.image = ATLASES.resolve(item.image, config.atlases)
+                    except OSError as e:
+                        raise ValueError(f"{button.name}: cannot read atlas: {e}") from e
+
+    @staticmethod
+    def _generate_icons(config: Config, base_path: Path, previous: Optional[Config] = None) -> None:
+        """Generate icons from specs and update image paths.
+
+        Icons of buttons defined as in previous are reused from the icon
+        directory instead of being rendered again.
+        """
         try:
             from .icon_generator import IconGenerator
         except ImportError:
@@ -131,68 +502,74 @@ class ConfigParser:
         icon_dir.mkdir(exist_ok=True)
         generator = IconGenerator(cache_dir=icon_dir)
 
-        for button in config.buttons:
+        unchanged = ConfigParser._unchanged_buttons(config, previous)
+        if previous is not None and previous.graph is not None and config.graph is not None:
+            for template in config.graph.changed_templates(previous.graph):
+                users = config.graph.buttons_using(template)
+                logger.info(f"Template '{template}' changed: {len(users)} button(s) use it")
+
+        for button in config.all_buttons():
+            force = button.name not in unchanged
             if button.icon_spec:
                 try:
-                    logger.info(f"Generating icon for button {button.index}")
-                    # Use specific filename and always regenerate
-                    icon_path = generator.generate_from_dict(button.icon_spec, button_index=button.index, force=True)
+                    logger.info(f"{'Generating' if force else 'Reusing'} icon for {button.name}")
+                    # Use specific filename; regenerate unless the button is unchanged
+                    icon_path = generator.generate_from_dict(button.icon_spec, button_index=button.icon_key, force=force)
                     button.image = str(icon_path)
                 except Exception as e:
-                    logger.error(f"Failed to generate icon for button {button.index}: {e}")
+                    logger.error(f"Failed to generate icon for {button.name}: {e}")
                     raise
 
-    @staticmethod
-    def validate(config: Config) -> List[str]:
-        """Validate configuration and return list of errors"""
-        errors = []
-
-        if config.brightness < 0 or config.brightness > 100:
-            errors.append("brightness must be between 0 and 100")
-
-        if config.obs_port < 1 or config.obs_port > 65535:
-            errors.append("obs.port must be between 1 and 65535")
-
-        for button in config.buttons:
-            # Image is required either from file or icon_spec
-            if not button.image and not button.icon_spec:
-                errors.append(f"Button {button.index}: must specify either 'image' or 'icon_spec'")
-
-            if button.image and not Path(button.image).exists():
-                errors.append(f"Button {button.index}: image file not found: {button.image}")
-
-            # Validate icon_spec if present
-            if button.icon_spec:
-                try:
-                    from .icon_generator import IconSpec
-                    spec = IconSpec(button.icon_spec)
-                    spec_errors = spec.validate()
-                    for error in spec_errors:
-                        errors.append(f"Button {button.index}: icon_spec error: {error}")
-                except ImportError:
-                    logger.warning("Pillow not installed, cannot validate icon_spec")
-                except Exception as e:
-                    errors.append(f"Button {button.index}: icon_spec error: {str(e)}")
-
-            if button.action_type not in ['command', 'obs', 'app', 'key']:
-                errors.append(f"Button {button.index}: invalid action type: {button.action_type}")
+            # Every state is rendered up front so a state change only uploads
+            for number, state in enumerate(button.states):
+                if state.icon_spec:
+                    try:
+                        icon_path = generator.generate_from_dict(state.icon_spec, force=force,
+                                                                 button_index=f"{button.icon_key}_state{number}")
+                        state.image = str(icon_path)
+                    except Exception as e:
+                        logger.error(f"Failed to generate icon for {button.name} state '{state.name}': {e}")
+                        raise
+            if button.states:
+                button.apply_state(button.state)
 
-            if button.action_type == 'command' and 'cmd' not in button.action_params:
-                errors.append(f"Button {button.index}: 'command' action requires 'cmd' parameter")
+    @staticmethod
+    def _unchanged_buttons(config: Config, previous: Optional[Config]) -> set:
+        """Names of buttons whose definition (templates included) and icon are the same as in previous"""
+        if previous is None:
+            return set()
+        before = {button.name: button for button in previous.all_buttons()}
+        unchanged = set()
+        for button in config.all_buttons():
+            old = before.get(button.name)
+            # set_button may have changed the icon_spec (and its file) at runtime
+            if old is not None and old.source_digest == button.source_digest and old.icon_spec == button.icon_spec \
+                    and not any(layer.get('path') for layer in (button.icon_spec or {}).get('layers') or []
+                                if isinstance(layer, dict)):
+                unchanged.add(button.name)
+        return unchanged
 
-            if button.action_type == 'obs':
-                action = button.action_params.get('action', 'toggle_scene')
-                if action == 'toggle_scene' and ('scene1' not in button.action_params or 'scene2' not in button.action_params):
-                    errors.append(f"Button {button.index}: 'toggle_scene' action requires 'scene1' and 'scene2' parameters")
-                elif action == 'set_scene' and 'scene' not in button.action_params:
-                    errors.append(f"Button {button.index}: 'set_scene' action requires 'scene' parameter")
-                elif action == 'toggle_source' and ('scene' not in button.action_params or 'source' not in button.action_params):
-                    errors.append(f"Button {button.index}: 'toggle_source' action requires 'scene' and 'source' parameters")
+    @staticmethod
+    def validate(config: Config) -> List[str]:
+        """Validate configuration and return list of errors.
 
-            if button.action_type == 'app' and 'name' not in button.action_params:
-                errors.append(f"Button {button.index}: 'app' action requires 'name' parameter")
+        Configs loaded from YAML are checked against the schema (see
+        schema.py) while loading; this reports those errors, or checks
+        that every image still exists.
+        """
+        if config.errors:
+            return list(config.errors)
 
-            if button.action_type == 'key' and 'keys' not in button.action_params:
-                errors.append(f"Button {button.index}: 'key' action requires 'keys' parameter")
+        from ulanzi_manager.atlas import ATLASES, is_atlas_ref
 
+        errors = []
+        for button in config.all_buttons():
+            if not button.image and not button.animation:
+                errors.append(f"{button.name}: must specify either 'image' or 'icon_spec'")
+            for image in button.images():
+                if is_atlas_ref(image):
+                    if not ATLASES.exists(image):
+                        errors.append(f"{button.name}: atlas tile not found: {image}")
+                elif not Path(image).exists():
+                    errors.append(f"{button.name}: image file not found: {image}")
         return errors
@@ -0,0 +1,313 @@
+"""Unix socket JSON-RPC control API for the running daemon
+
+Requests and responses are JSON-RPC 2.0 objects, one per line. The
+'subscribe' method keeps the connection open and streams notifications
+(e.g. button presses) until the client disconnects.
+"""
+
+import inspect
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# Notifications kept per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+def default_socket_path() -> Path:
+    """Control socket location, in the user runtime directory when available"""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'ulanzi' / 'control.sock'
+    return Path.home() / '.local/share/ulanzi' / 'control.sock'
+
+
+class ControlError(Exception):
+    """Error returned by a control method"""
+
+    def __init__(self, message: str, code: int = SERVER_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+class _Subscriber:
+    """Bounded notification queue for one subscribed connection"""
+
+    def __init__(self, events: Optional[List[str]]):
+        self.events = set(events) if events else None
+        self.queue = deque(maxlen=SUBSCRIBER_QUEUE_SIZE)
+        self.ready = threading.Event()
+
+    def push(self, event: str, params: Dict):
+        if self.events is None or event in self.events:
+            self.queue.append((event, params))
+            self.ready.set()
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    server: '_ControlSocketServer'
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            response, subscriber = self.server.control.handle_line(line)
+            if response is not None:
+                self._send(response)
+            if subscriber is not None:
+                self._stream(subscriber)
+                return
+
+    def _send(self, message: Dict):
+        self.wfile.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def _stream(self, subscriber: _Subscriber):
+        """Forward notifications until the client goes away or the server stops"""
+        control = self.server.control
+        self.connection.setblocking(True)
+        try:
+            while control.running:
+                if not subscriber.ready.wait(0.5):
+                    # Detect closed connections while idle
+                    if self._peer_closed():
+                        break
+                    continue
+                subscriber.ready.clear()
+                while subscriber.queue:
+                    event, params = subscriber.queue.popleft()
+                    self._send({'jsonrpc': '2.0', 'method': event, 'params': params})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            control.unsubscribe(subscriber)
+
+    def _peer_closed(self) -> bool:
+        try:
+            return self.connection.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+
+
+class _ControlSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    control: 'ControlServer'
+
+
+class ControlServer:
+    """Serve JSON-RPC requests on a Unix socket.
+
+    Methods are plain callables taking keyword params; they run on the
+    connection thread, so callers marshal to their own loop as needed.
+    """
+
+    def __init__(self, path: Path, methods: Dict[str, Callable[..., Any]]):
+        self.path = Path(path)
+        self.methods = methods
+        self.running = False
+        self._server: Optional[_ControlSocketServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._subscribers: List[_Subscriber] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            if ControlClient.is_listening(self.path):
+                raise RuntimeError(f"Another daemon is listening on {self.path}")
+            self.path.unlink()
+
+        self._server = _ControlSocketServer(str(self.path), _ControlHandler)
+        self._server.control = self
+        os.chmod(self.path, 0o600)
+        self.running = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='control', daemon=True)
+        self._thread.start()
+        logger.info(f"Control socket listening on {self.path}")
+
+    def stop(self):
+        self.running = False
+        server, self._server = self._server, None
+        if server:
+            server.shutdown()
+            server.server_close()
+            if self.path.exists():
+                self.path.unlink()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, event: str, params: Dict):
+        """Queue a notification for subscribers (never blocks)"""
+        for subscriber in self._subscribers:
+            subscriber.push(event, params)
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers = [s for s in self._subscribers if s is not subscriber]
+
+    def handle_line(self, line: bytes):
+        """Handle one request line, returning (response, subscriber)"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return _error(None, PARSE_ERROR, "Parse error"), None
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return _error(None, INVALID_REQUEST, "Invalid request"), None
+
+        response, subscriber = self._dispatch(request)
+        if 'id' not in request:
+            return None, subscriber  # Notifications get no response, not even errors
+        return response, subscriber
+
+    def _dispatch(self, request: Dict):
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params') or {}
+        if not isinstance(params, dict):
+            return _error(request_id, INVALID_PARAMS, "params must be an object"), None
+
+        if method == 'subscribe':
+            subscriber = _Subscriber(params.get('events'))
+            with self._lock:
+                self._subscribers = self._subscribers + [subscriber]
+            return _result(request_id, {'subscribed': sorted(subscriber.events) if subscriber.events else 'all'}), subscriber
+
+        handler = self.methods.get(method)
+        if handler is None:
+            return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}"), None
+
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            return _error(request_id, INVALID_PARAMS, str(e)), None
+
+        try:
+            result = handler(**params)
+        except ControlError as e:
+            return _error(request_id, e.code, str(e)), None
+        except Exception as e:
+            logger.error(f"Control method {method} failed: {e}")
+            return _error(request_id, SERVER_ERROR, f"{type(e).__name__}: {e}"), None
+
+        return _result(request_id, result), None
+
+
+def _result(request_id, result) -> Dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+def _error(request_id, code: int, message: str) -> Dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+class ControlClient:
+    """Client for the daemon control socket"""
+
+    def __init__(self, path: Optional[Path] = None, timeout: float = 10.0):
+        self.path = Path(path) if path else default_socket_path()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._next_id = 0
+
+    @staticmethod
+    def is_listening(path: Path) -> bool:
+        """True if a daemon accepts connections on path"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(1.0)
+            sock.connect(str(path))
+            return True
+        except OSError:
+            return False
+        finally:
+            sock.close()
+
+    @classmethod
+    def connect_if_running(cls, path: Optional[Path] = None) -> Optional['ControlClient']:
+        """Return a connected client, or None when no daemon is running"""
+        client = cls(path)
+        if not client.path.exists():
+            return None
+        try:
+            client.connect()
+        except OSError:
+            return None
+        return client
+
+    def connect(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(str(self.path))
+        self._file = self._sock.makefile('rwb')
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        if self._sock is None:
+            self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def call(self, method: str, **params) -> Any:
+        """Call a method and return its result, raising ControlError on failure"""
+        self._next_id += 1
+        self._write({'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params})
+        response = self._read()
+        if response is None:
+            raise ControlError("Connection closed by daemon")
+        if 'error' in response:
+            raise ControlError(response['error'].get('message', 'error'), response['error'].get('code', SERVER_ERROR))
+        return response.get('result')
+
+    def subscribe(self, events: Optional[List[str]] = None):
+        """Subscribe and yield (event, params) notifications"""
+        self.call('subscribe', **({'events': events} if events else {}))
+        self._sock.settimeout(None)
+        while True:
+            message = self._read()
+            if message is None:
+                return
+            if 'method' in message:
+                yield message['method'], message.get('params', {})
+
+    def _write(self, message: Dict):
+        self._file.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._file.flush()
+
+    def _read(self) -> Optional[Dict]:
+        line = self._file.readline()
+        if not line:
+            return None
+        return json.loads(line)
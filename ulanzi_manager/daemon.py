@@ -1,73 +1,157 @@
 """Background daemon for Ulanzi Manager"""
 
+import inspect
 import sys
 import time
 import logging
 import signal
+import threading
+from collections import deque
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional
-
-from ulanzi_manager.device import UlanziDevice, ButtonPress
-from ulanzi_manager.config import ConfigParser, Config
-from ulanzi_manager.actions import ActionExecutor
-
-# Setup logging
-log_dir = Path.home() / '.local/share/ulanzi'
-log_dir.mkdir(parents=True, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_dir / 'daemon.log'),
-        logging.StreamHandler()
-    ]
-)
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ulanzi_manager.device import UlanziDevice, ButtonPress, CommandProtocol
+from ulanzi_manager.config import Config, ButtonConfig, MAIN_PAGE, device_buttons
+from ulanzi_manager.actions import REGISTRY as ACTION_REGISTRY, ActionExecutor, ActionRegistry
+from ulanzi_manager.animation import Animator
+from ulanzi_manager.archive import CompressionPolicy
+from ulanzi_manager.atlas import ATLASES, is_atlas_ref
+from ulanzi_manager.scheduler import Scheduler
+from ulanzi_manager.brightness import BrightnessController
+from ulanzi_manager.compositor import with_badge
+from ulanzi_manager.devinfo import DeviceInfo
+from ulanzi_manager.focus import FocusSource, create_source
+from ulanzi_manager.metrics import BUTTON_PRESSES, OBS_RECONNECTS, OBS_REQUEST_LATENCY, MetricsServer, TimedProxy
+from ulanzi_manager.control import ControlServer, ControlError, default_socket_path
+from ulanzi_manager.prefetch import PageCache
+from ulanzi_manager.snapshot import ConfigSnapshot, compile_config, save_snapshot
+from ulanzi_manager.states import (current_obs_events, exit_code_state, obs_event_client, obs_state,
+                                   stateful_buttons)
+from ulanzi_manager.trace import DEFAULT_TRACE_PATH, TRACE
+
 logger = logging.getLogger(__name__)
 
+LOG_DIR = Path.home() / '.local/share/ulanzi'
+
+# Seconds between small window (clock) updates
+KEEPALIVE_INTERVAL = 0.1
+# Upper bound on the main loop sleep between device reads
+POLL_INTERVAL = 0.1
+# Seconds between OBS connection attempts while disconnected
+OBS_RETRY_INTERVAL = 30.0
+# Seconds a control request waits for the main loop
+CONTROL_TIMEOUT = 30.0
+# An 'auto' label changed this often within the window is left to the device
+DYNAMIC_LABEL_CHANGES = 3
+DYNAMIC_LABEL_WINDOW = 60.0
+
+
+def setup_logging(level: int = logging.INFO):
+    """Log to ~/.local/share/ulanzi/daemon.log and stderr"""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+    root = logging.getLogger()
+    # Replace handlers installed by a CLI basicConfig() call
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_DIR / 'daemon.log'),
+            logging.StreamHandler()
+        ]
+    )
+
 
 class UlanziDaemon:
     """Background daemon for Ulanzi device"""
 
-    def __init__(self, config_path: str):
-        """Initialize daemon"""
+    def __init__(self, config_path: str, device: Optional[UlanziDevice] = None,
+                 registry: Optional[ActionRegistry] = None, services: bool = True,
+                 focus_source: Optional[FocusSource] = None):
+        """Initialize daemon
+
+        Args:
+            config_path: Path to configuration file
+            device: Already connected device (default: connect on start)
+            registry: Action types to run (default: built-ins and plugins)
+            services: Start the OBS connection, metrics endpoint, control
+                socket and tracing configured in the config file
+            focus_source: Focused window events for 'focus' rules
+                (default: the configured backend, when services are on)
+        """
         self.config_path = config_path
+        self.registry = registry or ACTION_REGISTRY
+        self.services = services
         self.config: Optional[Config] = None
-        self.device: Optional[UlanziDevice] = None
+        self.snapshot: Optional[ConfigSnapshot] = None
+        self.pages: Optional[PageCache] = None
+        self.device: Optional[UlanziDevice] = device
         self.executor: Optional[ActionExecutor] = None
         self.running = False
         self.obs_client = None
+        self.obs_events = None  # OBS event client, when buttons follow OBS state
+        self.focus_source: Optional[FocusSource] = focus_source
+        self.focused: Tuple[str, str] = ('', '')  # (app, title) of the focused window
+        self.scheduler = Scheduler()
+        self.brightness: Optional[BrightnessController] = None
+        self.animator: Optional[Animator] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.control: Optional[ControlServer] = None
+        self.current_page = MAIN_PAGE
+        self._buttons: Dict[int, ButtonConfig] = {}
+        self._started_at = time.time()
+        self._last_press = self.scheduler.clock()
+        self._label_changes: Dict[Tuple[str, int], Deque[float]] = {}
+        self._loop_thread: Optional[threading.Thread] = None
 
     def start(self):
         """Start the daemon"""
         logger.info("Starting Ulanzi daemon...")
 
         try:
-            # Load configuration
-            self.config = ConfigParser.load(self.config_path)
-
-            # Validate configuration
-            errors = ConfigParser.validate(self.config)
+            # Load and validate configuration
+            errors = self._load_config()
             if errors:
                 logger.error("Configuration errors:")
                 for error in errors:
                     logger.error(f"  - {error}")
                 return False
 
+            # Expose metrics
+            if self.services and self.config.metrics_listen:
+                self._start_metrics_server()
+
+            if self.services and self.config.trace_enabled:
+                TRACE.enable(self.config.trace_events)
+                logger.info(f"Tracing the last {self.config.trace_events} events")
+
             # Connect to device
-            self.device = UlanziDevice()
+            if self.device is None:
+                self.device = UlanziDevice()
             self.device.set_button_callback(self._on_button_press)
+            self.device.subscribe(CommandProtocol.IN_DEVICE_INFO, self._on_device_info)
 
             # Initialize OBS client if configured
-            self._init_obs_client()
+            if self.services:
+                self._init_obs_client()
 
             # Initialize action executor
-            self.executor = ActionExecutor(self.obs_client)
+            self.executor = ActionExecutor(self.obs_client, switch_page=self.set_page, registry=self.registry,
+                                           run_on_loop=self._call_on_loop)
+            self.executor.context.processes.exit_callbacks.append(self._on_process_exit)
 
             # Configure device
             self._configure_device()
 
             self.running = True
+
+            # Accept control requests
+            if self.services and self.config.control_enabled:
+                self._start_control_server()
             logger.info("Daemon started successfully")
             return True
 
@@ -80,6 +164,21 @@ class UlanziDaemon:
         logger.info("Stopping daemon...")
         self.running = False
 
+        if self.brightness:
+            self.brightness.stop()
+
+        if self.animator:
+            self.animator.stop()
+
+        if self.focus_source:
+            self.focus_source.stop()
+
+        if self.pages:
+            self.pages.stop()
+
+        if self.executor:
+            self.executor.shutdown()
+
         if self.device:
             self.device.close()
 
@@ -89,6 +188,26 @@ class UlanziDaemon:
             except:
                 pass
 
+        if self.obs_events:
+            try:
+                self.obs_events.disconnect()
+            except Exception:
+                pass
+
+        if self.metrics_server:
+            self.metrics_server.stop()
+
+        control, self.control = self.control, None
+        if control:
+            control.stop()
+
+        if self.services and TRACE.enabled:
+            TRACE.disable()
+            try:
+                self._dump_trace()
+            except OSError as e:
+                logger.warning(f"Failed to write trace: {e}")
+
         logger.info("Daemon stopped")
 
     def run(self):
@@ -97,19 +216,12 @@ class UlanziDaemon:
             return
 
         # Setup signal handlers
-        signal.signal(signal.SIGTERM, lambda s, f: self.stop())
-        signal.signal(signal.SIGINT, lambda s, f: self.stop())
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda s, f: self.stop())
+            signal.signal(signal.SIGINT, lambda s, f: self.stop())
 
         try:
-            while self.running:
-                # Read button presses (non-blocking)
-                self.device.read_button_press()
-
-                # Keep-alive
-                self.device.set_small_window_data({})
-
-                time.sleep(0.1)
-
+            self.serve()
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
         except Exception as e:
@@ -117,61 +229,470 @@ class UlanziDaemon:
         finally:
             self.stop()
 
+    def serve(self, until: Optional[Callable[[], bool]] = None):
+        """Run the main loop of a started daemon until stopped, or until until() returns True"""
+        # Keep-alive
+        self.scheduler.call_every(KEEPALIVE_INTERVAL, self.device.set_small_window_data, {}, delay=0)
+        self._loop_thread = threading.current_thread()
+
+        while self.running and not (until and until()):
+            # Read input reports (non-blocking): presses, device info
+            self.device.read_report()
+
+            self.scheduler.run_pending()
+
+            timeout = self.scheduler.time_until_next()
+            self.scheduler.wait(POLL_INTERVAL if timeout is None else min(timeout, POLL_INTERVAL))
+
+    def _start_metrics_server(self):
+        """Start the metrics endpoint"""
+        try:
+            self.metrics_server = MetricsServer(self.config.metrics_listen)
+            self.metrics_server.start()
+        except Exception as e:
+            logger.warning(f"Failed to start metrics endpoint on {self.config.metrics_listen}: {e}")
+            self.metrics_server = None
+
     def _init_obs_client(self):
         """Initialize OBS WebSocket client"""
         try:
             import obsws_python as obs
 
-            self.obs_client = obs.ReqClient(
+            client = obs.ReqClient(
                 host=self.config.obs_host,
                 port=self.config.obs_port,
                 password=self.config.obs_password,
                 timeout=3
             )
+            self.obs_client = TimedProxy(client, OBS_REQUEST_LATENCY)
+            OBS_RECONNECTS.inc(label_value='connected')
             logger.info(f"Connected to OBS at {self.config.obs_host}:{self.config.obs_port}")
+            self._follow_obs_states()
+            return
         except ImportError:
             logger.warning("obsws-python not installed, OBS features disabled")
+            return
         except ConnectionRefusedError:
             logger.warning(f"Could not connect to OBS at {self.config.obs_host}:{self.config.obs_port} - is it running?")
         except Exception as e:
             logger.warning(f"Failed to connect to OBS: {type(e).__name__}: {e}")
 
+        OBS_RECONNECTS.inc(label_value='failed')
+        self.scheduler.call_later(OBS_RETRY_INTERVAL, self._reconnect_obs)
+
+    def _follow_obs_states(self):
+        """Subscribe to the OBS events that drive button states, starting from the current OBS state"""
+        buttons = stateful_buttons(self.config.all_buttons(), 'obs')
+        if not buttons:
+            return
+        for event, data in current_obs_events(self.obs_client, [button.state_from for button in buttons]):
+            self._on_obs_event(event, data)
+        if self.obs_events:
+            return
+        try:
+            self.obs_events = obs_event_client(
+                self.config.obs_host, self.config.obs_port, self.config.obs_password,
+                lambda event, data: self.scheduler.call_soon_threadsafe(self._on_obs_event, event, data),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to subscribe to OBS events, button states will not follow OBS: {e}")
+
+    def _on_obs_event(self, event: str, data: Any):
+        for button in stateful_buttons(self.config.all_buttons(), 'obs'):
+            state = obs_state(button.state_from, event, data)
+            if state is not None:
+                self.set_state(button, state)
+
+    def _on_process_exit(self, process):
+        """Exit codes of button commands drive 'exit_code' states (called from the supervisor thread)"""
+        self.scheduler.call_soon_threadsafe(self._apply_exit_code, process.key, process.exit_code)
+
+    def _apply_exit_code(self, key: str, exit_code: Optional[int]):
+        for button in stateful_buttons(self.config.all_buttons(), 'exit_code'):
+            if button.name == key:
+                self.set_state(button, exit_code_state(exit_code, len(button.states)))
+
+    def _reconnect_obs(self):
+        """Retry the OBS connection and hand the client to the OBS action"""
+        if not self.running or self.obs_client:
+            return
+        self._init_obs_client()
+        if self.obs_client and self.executor:
+            self.executor.context.obs_client = self.obs_client
+
+    def _load_config(self, previous: Optional[ConfigSnapshot] = None) -> List[str]:
+        """Load and validate the configuration, returning validation errors"""
+        snapshot, errors = compile_config(self.config_path, previous)
+        if not errors:
+            self.snapshot = snapshot
+            self.config = snapshot.config
+            if self.pages:
+                self.pages.stop()
+            self.pages = PageCache(snapshot, max_pages=self.config.prefetch_pages,
+                                   max_bytes=int(self.config.prefetch_memory_mb * 1024 * 1024),
+                                   enabled=self.config.prefetch_enabled)
+        return errors
+
     def _configure_device(self):
         """Configure device with settings from config"""
         try:
             # Set brightness
-            self.device.set_brightness(self.config.brightness)
+            if self.brightness:
+                self.brightness.stop()
+                self.brightness = None
+            if self.config.brightness_schedule:
+                self.brightness = BrightnessController(
+                    self.device, self.scheduler, self.config.brightness, self.config.brightness_schedule
+                )
+                self.brightness.start()
+            else:
+                self.device.set_brightness(self.config.brightness)
+
+            # Set upload compression
+            self.device.compression = CompressionPolicy(self.config.compression, self.config.compression_min_ratio)
 
             # Set label style
             if self.config.label_style:
                 self.device.set_label_style(self.config.label_style)
 
-            # Set button images
-            button_dict = {}
-            for button in self.config.buttons:
-                button_dict[button.index] = {
-                    'image': button.image,
-                    'label': button.label,
-                    'state': button.state
-                }
+            # Animated icons (decoded frames are kept until the next reload)
+            if self.animator:
+                self.animator.stop()
+            self.animator = Animator(self.device, self.scheduler, paused=self._animations_paused,
+                                     max_fps=self.config.animation_max_fps, policy=self.device.compression)
 
-            if button_dict:
-                self.device.set_buttons(button_dict)
+            # Set button images
+            if self.current_page not in self.config.page_names():
+                self.current_page = MAIN_PAGE
+            self._show_page(self.current_page, startup=True)
+            self._track_focus()
 
             logger.info("Device configured successfully")
         except Exception as e:
             logger.error(f"Failed to configure device: {e}")
 
+    def _show_page(self, page: str, startup: bool = False):
+        """Upload a page to the device, using the prebuilt archive when available"""
+        buttons = self.config.page_buttons(page)
+        self._buttons = {button.index: button for button in buttons}
+        self.current_page = page
+        if self.animator:
+            self.animator.show([animation for animation in map(self.animator.load, buttons) if animation])
+        if not buttons:
+            return
+        if not self.snapshot:
+            self.device.set_buttons(device_buttons(buttons, self.config.label_style))
+            return
+
+        snapshot = self.snapshot
+        archive = self.pages.archive(page)
+        digest = snapshot.digests.get(page)  # Pages compiled into the snapshot only
+        device_id = self.device.identity or ''  # Decks without a serial share one entry
+        if startup and self.config.skip_unchanged_upload and digest and snapshot.uploaded.get(device_id) == digest:
+            logger.info(f"Page '{page}' unchanged since the last upload, skipping")
+        else:
+            self.device.set_buttons(device_buttons(buttons, self.config.label_style), archive=archive)
+
+        if startup and self.config.snapshot_enabled and digest and snapshot.uploaded.get(device_id) != digest:
+            snapshot.uploaded[device_id] = digest
+            save_snapshot(self.config_path, snapshot)
+        self.pages.prefetch(page)
+
+    def _track_focus(self):
+        """Follow the focused window when the config has focus rules, with their pages prebuilt"""
+        focus = self.config.focus
+        if not focus or not (focus.rules or focus.default_page):
+            if self.focus_source and self.focus_source.running:
+                self.focus_source.stop()
+            return
+        self.pages.pin(focus.pages())
+        if self.focus_source is None and self.services:
+            self.focus_source = create_source(focus.backend, focus.poll_interval)
+        if self.focus_source and not self.focus_source.running:
+            self.focus_source.start(lambda app, title: self.scheduler.call_soon_threadsafe(self._on_focus, app, title))
+            logger.info(f"Following the focused window ({self.focus_source.name})")
+
+    def _on_focus(self, app: str, title: str):
+        """Show the page of the focus rule matching the focused window"""
+        if (app, title) == self.focused:
+            return
+        self.focused = (app, title)
+        focus = self.config.focus
+        page = focus.page_for(app, title) if focus else None
+        if page and page in self.config.page_names() and page != self.current_page:
+            logger.info(f"Focused '{app}': showing page '{page}'")
+            self.set_page(page)
+        self._publish('focus', {'app': app, 'title': title, 'page': self.current_page})
+
+    def _animations_paused(self) -> bool:
+        """Animations pause while the deck is dimmed, off or idle"""
+        if self.brightness and (self.brightness.idle or self.brightness.current == 0):
+            return True
+        if not self.brightness and self.config.brightness == 0:
+            return True
+        idle_timeout = self.config.animation_idle_timeout
+        return bool(idle_timeout) and self.scheduler.clock() - self._last_press >= idle_timeout
+
+    def set_page(self, page: str):
+        """Switch the deck to another page"""
+        if page not in self.config.page_names():
+            raise ControlError(f"Unknown page: {page}")
+        if page == self.current_page:
+            return
+        logger.info(f"Switching to page '{page}'")
+        self._show_page(page)
+        self._publish('page', {'page': page})
+
+    def _start_control_server(self):
+        """Start the control socket"""
+        path = Path(self.config.control_socket).expanduser() if self.config.control_socket else default_socket_path()
+        methods = {
+            'set_button': self._rpc_set_button,
+            'set_state': self._rpc_set_state,
+            'set_page': self._rpc_set_page,
+            'set_brightness': self._rpc_set_brightness,
+            'reload': self._rpc_reload,
+            'get_state': self._rpc_get_state,
+            'set_trace': self._rpc_set_trace,
+            'dump_trace': self._rpc_dump_trace,
+        }
+        try:
+            self.control = ControlServer(path, {name: self._on_loop(func) for name, func in methods.items()})
+            self.control.start()
+        except Exception as e:
+            logger.warning(f"Control socket disabled: {e}")
+            self.control = None
+
+    def _call_on_loop(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func on the main loop and wait for the result"""
+        if threading.current_thread() is self._loop_thread or not self.running:
+            return func(*args, **kwargs)
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.scheduler.call_soon_threadsafe(run)
+        return future.result(timeout=CONTROL_TIMEOUT)
+
+    def _on_loop(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap func so control threads run it on the main loop and wait for the result"""
+        def call(**params):
+            return self._call_on_loop(func, **params)
+
+        call.__signature__ = inspect.signature(func)
+        return call
+
+    def _publish(self, event: str, params: Dict):
+        """Send an event to control subscribers"""
+        if self.control and self.control.has_subscribers:
+            self.control.publish(event, params)
+
+    def _rpc_set_button(self, index: int, label: Optional[str] = None, image: Optional[str] = None,
+                        icon_spec: Optional[Dict] = None, action: Optional[str] = None,
+                        params: Optional[Dict] = None, page: Optional[str] = None,
+                        badge: Optional[str] = None) -> Dict:
+        """Change one button at runtime (not written back to the config file).
+
+        badge sets the top badge layer of a 'layers' icon ('' removes it);
+        only that layer is rendered again.
+        """
+        page = page or self.current_page
+        if page not in self.config.page_names():
+            raise ControlError(f"Unknown page: {page}")
+
+        buttons = self.config.page_buttons(page)
+        button = next((b for b in buttons if b.index == index), None)
+        if button is None:
+            button = ButtonConfig(index=index, image=None, label='', action_type='command',
+                                  action_params={}, page=page)
+            buttons.append(button)
+
+        if label is not None:
+            if label != button.label and button.label_mode == 'auto':
+                self._note_label_change(button)
+            button.label = label
+        if image is not None and is_atlas_ref(image):
+            try:
+                button.image = ATLASES.resolve(image, self.config.atlases)
+            except (OSError, ValueError) as e:
+                raise ControlError(str(e))
+        elif image is not None:
+            image_path = Path(image).expanduser()
+            if not image_path.exists():
+                raise ControlError(f"Image not found: {image}")
+            button.image = str(image_path)
+        if badge is not None:
+            spec = icon_spec if icon_spec is not None else button.icon_spec
+            if not spec or spec.get('type') != 'layers':
+                raise ControlError("badge requires a button with a 'layers' icon_spec")
+            icon_spec = with_badge(spec, badge)
+        if icon_spec is not None:
+            from ulanzi_manager.icon_generator import IconGenerator, IconSpec
+            spec = IconSpec(icon_spec)
+            errors = spec.validate()
+            if errors:
+                raise ControlError(f"Invalid icon_spec: {', '.join(errors)}")
+            generator = IconGenerator(cache_dir=Path(self.config_path).parent / 'icons')
+            button.icon_spec = icon_spec
+            button.image = str(generator.generate(spec, force=True, button_index=button.icon_key))
+        if action is not None:
+            button.action_type = action
+        if params is not None:
+            button.action_params = params
+
+        if self.pages:
+            self.pages.invalidate(page)
+        if page == self.current_page:
+            if self.animator:
+                self.animator.remove(index)
+            self._buttons[index] = button
+            self.device.update_buttons(device_buttons([button], self.config.label_style))
+
+        return {'index': index, 'page': page, 'label': button.label, 'image': button.image}
+
+    def set_state(self, button: ButtonConfig, state: int):
+        """Show another declared state of a button, uploading its prebuilt partial update"""
+        if state == button.state:
+            return
+        button.apply_state(state)
+        if self.pages:
+            self.pages.invalidate(button.page)
+        if self._buttons.get(button.index) is button:
+            archive = self.snapshot.state_archive(button, state) if self.snapshot else None
+            self.device.update_buttons(device_buttons([button], self.config.label_style), archive=archive)
+        logger.info(f"{button.name}: state '{button.states[state].name}'")
+        self._publish('state', {'index': button.index, 'page': button.page, 'state': button.states[state].name})
+
+    def _rpc_set_state(self, index: int, state: Any, page: Optional[str] = None) -> Dict:
+        """Switch a button to one of its declared states, by name or number"""
+        page = page or self.current_page
+        if page not in self.config.page_names():
+            raise ControlError(f"Unknown page: {page}")
+        button = next((b for b in self.config.page_buttons(page) if b.index == index), None)
+        if button is None or not button.states:
+            raise ControlError(f"Button {index} on page '{page}' has no states")
+        names = [declared.name for declared in button.states]
+        if state in names:
+            number = names.index(state)
+        elif isinstance(state, int) and not isinstance(state, bool) and 0 <= state < len(names):
+            number = state
+        else:
+            raise ControlError(f"Unknown state {state!r} (states: {', '.join(names)})")
+        self.set_state(button, number)
+        return {'index': index, 'page': page, 'state': names[number]}
+
+    def _note_label_change(self, button: ButtonConfig):
+        """Switch an 'auto' label to device rendering once it changes often,
+        so later changes do not need a new image"""
+        now = self.scheduler.clock()
+        changes = self._label_changes.setdefault((button.page, button.index), deque())
+        changes.append(now)
+        while changes and changes[0] < now - DYNAMIC_LABEL_WINDOW:
+            changes.popleft()
+        if not button.dynamic_label and len(changes) >= DYNAMIC_LABEL_CHANGES:
+            logger.info(f"{button.name}: label changes often, rendering it on the device")
+            button.dynamic_label = True
+
+    def _rpc_set_page(self, page: str) -> Dict:
+        self.set_page(page)
+        return {'page': self.current_page}
+
+    def _rpc_set_brightness(self, level: int) -> Dict:
+        level = max(0, min(100, int(level)))
+        self.config.brightness = level
+        if self.brightness:
+            self.brightness.set_base_level(level)
+        else:
+            self.device.set_brightness(level)
+        return {'brightness': level}
+
+    def _rpc_reload(self, config: Optional[str] = None) -> Dict:
+        """Reload the config file (optionally switching to another file) and reconfigure"""
+        previous = self.config_path
+        if config:
+            self.config_path = str(Path(config).expanduser().resolve())
+        try:
+            # Reloading the same file renders only the buttons that changed
+            errors = self._load_config(self.snapshot if self.config_path == previous else None)
+        except Exception as e:
+            self.config_path = previous
+            raise ControlError(f"Failed to load config: {e}")
+        if errors:
+            self.config_path = previous
+            raise ControlError("Configuration errors: " + '; '.join(errors))
+
+        self._configure_device()
+        if self.obs_client:
+            self._follow_obs_states()
+        return {'config': self.config_path, 'page': self.current_page, 'buttons': len(self._buttons)}
+
+    def _dump_trace(self, path: Optional[str] = None) -> Dict:
+        path = Path(path or self.config.trace_path or DEFAULT_TRACE_PATH).expanduser()
+        events = TRACE.dump(path, config=str(Path(self.config_path).resolve()))
+        logger.info(f"Wrote {events} trace event(s) to {path}")
+        return {'path': str(path), 'events': events}
+
+    def _rpc_set_trace(self, enabled: bool, events: Optional[int] = None) -> Dict:
+        """Start (with an empty buffer) or stop tracing"""
+        if enabled:
+            TRACE.enable(int(events or self.config.trace_events))
+        else:
+            TRACE.disable()
+        return {'enabled': TRACE.enabled, 'capacity': TRACE.events.maxlen}
+
+    def _rpc_dump_trace(self, path: Optional[str] = None) -> Dict:
+        """Write the trace buffer (default: the configured trace path)"""
+        if not TRACE.recorded:
+            raise ControlError("No trace recorded; enable 'trace' in the config or run 'ulanzi-manager trace start'")
+        return self._dump_trace(path)
+
+    def _rpc_get_state(self) -> Dict:
+        return {
+            'config': self.config_path,
+            'page': self.current_page,
+            'pages': self.config.page_names(),
+            'brightness': self.brightness.current if self.brightness else self.config.brightness,
+            'dimmed': bool(self.brightness and self.brightness.idle),
+            'obs_connected': self.obs_client is not None,
+            'device': self.device.info.to_dict() if self.device and self.device.info else None,
+            'focus': {'app': self.focused[0], 'title': self.focused[1]},
+            'tracing': TRACE.enabled,
+            'uptime': time.time() - self._started_at,
+            'processes': self.executor.context.processes.snapshot() if self.executor else {'running': [], 'recent': []},
+            'buttons': [
+                {'index': b.index, 'label': b.label, 'image': b.image, 'action': b.action_type,
+                 'state': b.states[b.state].name if b.states else b.state}
+                for b in sorted(self._buttons.values(), key=lambda b: b.index)
+            ],
+        }
+
+    def _on_device_info(self, info: DeviceInfo):
+        self._publish('device', info.to_dict())
+
     def _on_button_press(self, button: ButtonPress):
         """Handle button press event"""
         logger.info(f"Button {button.index} pressed (state={button.state})")
 
+        if self.brightness:
+            self.brightness.note_activity()
+
+        self._last_press = self.scheduler.clock()
+        if self.animator:
+            self.animator.wake()
+
+        if not button.pressed:
+            BUTTON_PRESSES.inc(label_value=str(button.index))
+
+        self._publish('press', {
+            'index': button.index, 'pressed': button.pressed, 'state': button.state, 'page': self.current_page,
+        })
+
         # Find button config
-        button_config = None
-        for btn in self.config.buttons:
-            if btn.index == button.index:
-                button_config = btn
-                break
+        button_config = self._buttons.get(button.index)
 
         if not button_config:
             logger.warning(f"No config for button {button.index}")
@@ -181,7 +702,9 @@ class UlanziDaemon:
 
         # Execute action
         if self.executor and not button.pressed:
-            self.executor.execute(button_config.action_type, button_config.action_params)
+            self.executor.execute(button_config.action_type, button_config.action_params, button=button_config.name)
+            if button_config.states and button_config.state_from == 'press':
+                self.set_state(button_config, (button_config.state + 1) % len(button_config.states))
 
 
 def main():
@@ -193,8 +716,8 @@ def main():
     parser.add_argument('--log-level', default='INFO', help='Logging level')
     args = parser.parse_args()
 
-    # Set log level
-    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+    # Set up logging
+    setup_logging(getattr(logging, args.log_level.upper()))
 
     # Create and run daemon
     daemon = UlanziDaemon(args.config)
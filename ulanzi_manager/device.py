@@ -1,15 +1,17 @@
 """USB device communication for Ulanzi D200"""
 
 import struct
-import io, time, random
-import zipfile
 import json
 import logging
-from pathlib import Path
-from typing import Dict, Optional, Callable
+import time
+from typing import Any, Dict, List, Optional, Callable
 from dataclasses import dataclass
 from enum import IntEnum
-from deepdiff import DeepDiff
+
+from ulanzi_manager.archive import ButtonArchive, CompressionPolicy, build_button_archive
+from ulanzi_manager.devinfo import CapabilityCache, DeviceInfo, parse_device_info
+from ulanzi_manager.metrics import HID_BYTES_WRITTEN, HID_PACKETS_WRITTEN, UPLOAD_DURATION, ZIP_RETRIES
+from ulanzi_manager.trace import TRACE
 
 try:
     import hid
@@ -51,19 +53,45 @@ class UlanziDevice:
     BUTTON_COUNT = 14  # 13 regular buttons (0-12) + 1 clock button (13)
     ICON_SIZE = 196
 
-    def __init__(self, device_path: Optional[str] = None):
-        """Initialize device connection"""
-        if hid is None:
+    def __init__(self, device_path: Optional[str] = None, hid_device=None,
+                 capabilities: Optional[CapabilityCache] = None):
+        """Initialize device connection
+
+        Args:
+            device_path: HID path to open (default: first matching device)
+            hid_device: Already created hid.device-like object (e.g. a simulated device)
+            capabilities: Where device info is cached per serial (default: ~/.cache/ulanzi/devices)
+        """
+        if hid is None and hid_device is None:
             raise ImportError("hidapi not installed. Run: pip install hidapi")
 
-        self.device = None
+        self.device = hid_device
         self.device_path = device_path
+        self.compression = CompressionPolicy()
+        self._brightness: Optional[int] = None
         self._button_callback: Optional[Callable[[ButtonPress], None]] = None
+        self._subscribers: Dict[int, List[Callable[[Any], None]]] = {}
+        self._parsers = {
+            CommandProtocol.IN_BUTTON: self._on_button,
+            CommandProtocol.IN_BUTTON_2: self._on_button,
+            CommandProtocol.IN_DEVICE_INFO: self._on_device_info,
+        }
+        self.capabilities = capabilities or CapabilityCache()
+        self.serial: Optional[str] = None  # USB serial number, when the device has one
+        self.info: Optional[DeviceInfo] = None  # Reported by the device, or cached from a previous connection
         self._connect()
+        if self.serial:
+            self.info = self.capabilities.load(self.serial)
+            if self.info:
+                logger.info(f"Using cached capabilities of {self.serial} (firmware {self.info.firmware or 'unknown'})")
 
     def _connect(self):
         """Connect to device"""
-        if self.device_path:
+        serial = None
+        if self.device is not None:
+            # Pre-opened device handle
+            pass
+        elif self.device_path:
             self.device = hid.device()
             self.device.open_path(self.device_path.encode())
         else:
@@ -74,9 +102,16 @@ class UlanziDevice:
                     f"Ulanzi D200 device not found (VID: {VENDOR_ID:04x}, PID: {PRODUCT_ID:04x})"
                 )
             device_info = devices[0]
+            serial = device_info.get('serial_number')
             self.device = hid.device()
             self.device.open_path(device_info['path'])
 
+        if not serial and hasattr(self.device, 'get_serial_number_string'):
+            try:
+                serial = self.device.get_serial_number_string()
+            except (OSError, ValueError):
+                serial = None
+        self.serial = serial or None
         self.device.set_nonblocking(True)
         logger.info("Connected to Ulanzi D200 device")
 
@@ -86,12 +121,22 @@ class UlanziDevice:
             self.device.close()
             logger.info("Disconnected from device")
 
+    @property
+    def identity(self) -> Optional[str]:
+        """Serial number identifying this deck (USB serial, else the reported one)"""
+        return self.serial or (self.info.serial if self.info else None)
+
     def set_button_callback(self, callback: Callable[[ButtonPress], None]):
         """Set callback for button presses"""
         self._button_callback = callback
 
-    def read_button_press(self) -> Optional[ButtonPress]:
-        """Read button press from device (non-blocking)"""
+    def subscribe(self, command: CommandProtocol, callback: Callable[[Any], None]):
+        """Call callback with every input report of a type: a ButtonPress for
+        button reports, a DeviceInfo for device info, else the raw payload"""
+        self._subscribers.setdefault(int(command), []).append(callback)
+
+    def read_report(self) -> Optional[Any]:
+        """Read one input report (non-blocking), hand it to its subscribers and return it parsed"""
         if not self.device:
             return None
 
@@ -99,6 +144,10 @@ class UlanziDevice:
             data = self.device.read(self.PACKET_SIZE)
             if not data or len(data) < 8:
                 return None
+            length = struct.unpack('<I', bytes(data[4:8]))[0]
+            if TRACE.enabled:
+                # Header and payload, so a replay feeds the device the same report
+                TRACE.event('hid_read', report=bytes(data[:min(8 + length, self.PACKET_SIZE)]).hex())
 
             # Parse packet header
             header = bytes(data[0:2])
@@ -106,27 +155,56 @@ class UlanziDevice:
                 return None
 
             command = struct.unpack('>H', bytes(data[2:4]))[0]
-            if command != CommandProtocol.IN_BUTTON and command != CommandProtocol.IN_BUTTON_2:
-                return None
-
-            # Parse button data
-            button_data = bytes(data[8:12])
-            state = button_data[0]
-            index = button_data[1]
-            pressed = button_data[3] == 0x01
-
-            button_press = ButtonPress(index=index, pressed=pressed, state=state)
-            if self._button_callback:
-                self._button_callback(button_press)
-            return button_press
+            payload = bytes(data[8:])
+            if 0 < length <= len(payload):
+                payload = payload[:length]
+            parser = self._parsers.get(command)
+            report = parser(payload) if parser else payload
+            for callback in self._subscribers.get(command, []):
+                callback(report)
+            return report
 
         except Exception as e:
-            logger.debug(f"Error reading button press: {e}")
+            logger.debug(f"Error reading input report: {e}")
             return None
 
-    def set_brightness(self, brightness: int):
-        """Set display brightness (0-100)"""
+    def read_button_press(self) -> Optional[ButtonPress]:
+        """Read button press from device (non-blocking); other reports go to their subscribers"""
+        report = self.read_report()
+        return report if isinstance(report, ButtonPress) else None
+
+    def _on_button(self, payload: bytes) -> ButtonPress:
+        # Parse button data
+        button_data = payload[0:4].ljust(4, b'\x00')
+        state = button_data[0]
+        index = button_data[1]
+        pressed = button_data[3] == 0x01
+
+        button_press = ButtonPress(index=index, pressed=pressed, state=state)
+        if TRACE.enabled:
+            TRACE.event('press', index=index, pressed=pressed, state=state)
+        if self._button_callback:
+            self._button_callback(button_press)
+        return button_press
+
+    def _on_device_info(self, payload: bytes) -> DeviceInfo:
+        """Record what the device reports about itself, caching it per serial"""
+        reported = parse_device_info(payload)
+        info = self.info.merge(reported) if self.info else reported
+        changed = info != self.info
+        self.info = info
+        if changed:
+            logger.info(f"Device info: serial {info.serial or 'unknown'}, firmware {info.firmware or 'unknown'}")
+            if self.identity:
+                self.capabilities.save(self.identity, info)
+        return info
+
+    def set_brightness(self, brightness: int, force: bool = False):
+        """Set display brightness (0-100), skipping writes that change nothing"""
         brightness = max(0, min(100, brightness))
+        if brightness == self._brightness and not force:
+            return
+        self._brightness = brightness
         payload = str(brightness).encode('ascii')
         self._send_command(CommandProtocol.OUT_SET_BRIGHTNESS, payload)
         logger.debug(f"Set brightness to {brightness}%")
@@ -148,9 +226,7 @@ class UlanziDevice:
 
     def set_small_window_data(self, data: Dict, force=False):
         """Set small window data (status display)"""
-        from datetime import datetime, timezone
-        #if not force and not DeepDiff(self._small_window_data, data):
-        #    return False
+        from datetime import datetime
 
         mode = data.get('mode', 1)  # 0=STATS, 1=CLOCK, 2=BACKGROUND
         cpu = data.get('cpu', 0)
@@ -161,122 +237,73 @@ class UlanziDevice:
         payload = f'{mode}|{cpu}|{mem}|{time_str}|{gpu}'.encode('utf-8')
         self._send_command(CommandProtocol.OUT_SET_SMALL_WINDOW_DATA, payload)
 
-    def set_buttons(self, buttons: Dict[int, Dict]) -> bool:
-        """Set button configuration with images."""
-        manifest = {}
-        images_added = 0
-        invalid_bytes = [b'\x00', b'\x7c']
-        dummy_str = ''
-        dummy_retries = 0
-
-        while True:
-            # Create ZIP with button data
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                manifest = {}
-
-                for idx, config in buttons.items():
-                    row = idx // 5
-                    col = idx % 5
-                    key = f"{col}_{row}"
-
-                    button_data = {
-                        'State': config.get('state', 0),
-                        'ViewParam': [{}],
-                    }
-
-                    if config:
-                        if 'label' in config:
-                            button_data['ViewParam'][0]['Text'] = config['label']
-
-                        if 'image' in config:
-                            image_path = config['image']
-                            image_path_obj = Path(image_path)
-                            if image_path_obj.exists():
-                                icon_name = image_path_obj.name
-                                with open(image_path, 'rb') as f:
-                                    zf.writestr(f'icons/{icon_name}', f.read())
-                                button_data['ViewParam'][0]['Icon'] = f'icons/{icon_name}'
-                                images_added += 1
-                                logger.debug(f"Added image for button {idx}: {image_path}")
-                            else:
-                                logger.warning(f"Image not found for button {idx}: {image_path}")
-
-                    manifest[key] = button_data
-
-                # Add manifest
-                zf.writestr('manifest.json', json.dumps(manifest, sort_keys=True, separators=(',', ':'), indent=2))
-                logger.debug(f"Manifest: {json.dumps(manifest, indent=2)}")
-
-                # Add dummy file to avoid protocol bug
-                if dummy_retries > 0:
-                    dummy_str += ''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=8*dummy_retries))
-
-                zf.writestr('dummy.txt', dummy_str)
-
-            # Get ZIP data and validate for problematic bytes
-            zip_data = zip_buffer.getvalue()
-            file_size = len(zip_data)
-
-            # Check for invalid bytes at specific positions
-            valid = True
-            for i in range(1016, file_size, 1024):
-                if zip_data[i:i+1] in invalid_bytes:
-                    valid = False
-                    break
-
-            if valid:
-                break
-
-            dummy_retries += 1
-            time.sleep(0.05)
-
-        # Send ZIP data
-        self._send_file(zip_data)
-        logger.info(f"Set {len(buttons)} button(s) with {images_added} image(s)")
+    def set_buttons(self, buttons: Dict[int, Dict], archive: Optional[ButtonArchive] = None) -> bool:
+        """Set button configuration with images.
+
+        Args:
+            buttons: Button dictionary by index
+            archive: Archive already built from buttons (e.g. from a config snapshot)
+        """
+        with UPLOAD_DURATION.time():
+            if archive is None:
+                archive = build_button_archive(buttons, self.compression)
+                ZIP_RETRIES.inc(archive.retries)
+            self._send_archive(CommandProtocol.OUT_SET_BUTTONS, archive)
+        images = sum(1 for entry in archive.entries if entry.name.startswith('icons/'))
+        logger.info(f"Set {len(buttons)} button(s) with {images} image(s)")
 
         return True
 
-    def _apply_protocol_workaround(self, data: bytes) -> bytes:
-        """Apply workaround for protocol bug with certain byte values"""
-        # Check for problematic bytes at 1024-byte boundaries
-        invalid_bytes = {b'\x00'[0], b'\x7c'[0]}
-
-        for i in range(1016, len(data), 1024):
-            if i < len(data) and data[i] in invalid_bytes:
-                # Need to regenerate with larger padding
-                logger.debug(f"Protocol bug detected at offset {i}, regenerating ZIP")
-                # For now, just log it - the dummy.txt padding should handle most cases
-                pass
-
-        return data
-
-    def _send_file(self, data: bytes):
-        """Send file data in chunks"""
-        chunk_size = 1024
-        file_size = len(data)
+    def update_buttons(self, buttons: Dict[int, Dict], archive: Optional[ButtonArchive] = None) -> bool:
+        """Update only the given buttons, leaving the others as they are.
 
-        # First chunk with header (1016 bytes of data)
-        first_chunk = data[:chunk_size - 8]
-        packet = self._build_packet(CommandProtocol.OUT_SET_BUTTONS, first_chunk.ljust(chunk_size - 8, b'\x00'), file_size)
-        packets = [packet]
+        Args:
+            buttons: Button dictionary by index
+            archive: Archive already built from buttons (e.g. an animation frame)
+        """
+        with UPLOAD_DURATION.time():
+            if archive is None:
+                archive = build_button_archive(buttons, self.compression)
+                ZIP_RETRIES.inc(archive.retries)
+            self._send_archive(CommandProtocol.OUT_PARTIALLY_UPDATE_BUTTONS, archive)
+        logger.debug(f"Updated {len(buttons)} button(s)")
 
-        # Remaining chunks (raw, no header)
-        for i in range(chunk_size - 8, len(data), chunk_size):
-            chunk = data[i:i + chunk_size]
-            chunk = chunk.ljust(chunk_size, b'\x00')
-            packets.append(chunk)
-
-        # Write all packets at once
-        for packet in packets:
-            self.device.write(packet)
+        return True
 
-        logger.debug(f"Sent {file_size} bytes in {len(packets)} chunks")
+    def _send_archive(self, command: CommandProtocol, archive: ButtonArchive):
+        """Stream archive data to the device as it is framed into packets"""
+        packets = 0
+        start = time.perf_counter()
+        for chunk in archive.iter_chunks():
+            if packets == 0:
+                packet = self._build_packet(command, chunk, archive.size)
+            else:
+                packet = chunk.ljust(self.PACKET_SIZE, b'\x00')
+            self._write(packet)
+            packets += 1
+
+        if TRACE.enabled:
+            self._trace_write(command, archive.size, packets, start)
+        logger.debug(f"Sent {archive.size} bytes in {packets} chunks")
 
     def _send_command(self, command: CommandProtocol, payload: bytes):
         """Send command to device"""
+        start = time.perf_counter()
         packet = self._build_packet(command, payload, len(payload))
+        self._write(packet)
+        if TRACE.enabled:
+            self._trace_write(command, len(payload), 1, start)
+
+    @staticmethod
+    def _trace_write(command: CommandProtocol, size: int, packets: int, start: float):
+        TRACE.event('hid_write', cmd=CommandProtocol(command).name, bytes=size, packets=packets,
+                    ms=round((time.perf_counter() - start) * 1000, 3))
+
+    def _write(self, packet: bytes):
+        """Write one packet to the device"""
         self.device.write(packet)
+        HID_BYTES_WRITTEN.inc(len(packet))
+        HID_PACKETS_WRITTEN.inc()
 
     def _build_packet(self, command: CommandProtocol, data: bytes, length: int) -> bytes:
         """Build USB packet"""
@@ -0,0 +1,130 @@
+"""Device info reports and the per-device capability cache
+
+The deck describes itself in IN_DEVICE_INFO (0x0303) input reports. The
+payload layout is not documented, so both a JSON object and key/value
+lists ('Key=Value' or 'Key:Value', separated by '|', ';', ',', newlines or
+NULs) are accepted. Key names are matched case-insensitively, ignoring
+'_', '-' and spaces; every reported field is kept in DeviceInfo.fields.
+
+Parsed info is cached on disk per device serial:
+
+    ~/.cache/ulanzi/devices/<serial>.json
+
+so a later connection knows the firmware and geometry of the deck as soon
+as it is opened, before (or without) the device reporting it again, and
+state that depends on what the deck shows (the snapshot's record of the
+last startup upload) is keyed by the real device identity.
+"""
+
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEVICE_CACHE = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'ulanzi/devices'
+
+# DeviceInfo field -> normalized report keys
+_KEYS = {
+    'serial': ('serial', 'serialnumber', 'sn'),
+    'firmware': ('firmware', 'firmwareversion', 'fw', 'fwversion', 'version'),
+    'columns': ('columns', 'cols', 'column', 'col'),
+    'rows': ('rows', 'row'),
+    'buttons': ('buttons', 'buttoncount', 'keys', 'keycount'),
+    'icon_size': ('iconsize', 'imagesize', 'iconwidth'),
+}
+_INT_FIELDS = ('columns', 'rows', 'buttons', 'icon_size')
+_SEPARATORS = re.compile(r'[|;,\n\x00]+')
+
+
+@dataclass
+class DeviceInfo:
+    """What a deck reports about itself"""
+    serial: Optional[str] = None
+    firmware: Optional[str] = None
+    columns: Optional[int] = None
+    rows: Optional[int] = None
+    buttons: Optional[int] = None
+    icon_size: Optional[int] = None  # Pixels per side
+    fields: Dict[str, str] = field(default_factory=dict)  # Every reported key, as sent
+
+    def merge(self, other: 'DeviceInfo') -> 'DeviceInfo':
+        """This info updated with the values other reports"""
+        merged = DeviceInfo(fields={**self.fields, **other.fields})
+        for name in _KEYS:
+            value = getattr(other, name)
+            setattr(merged, name, value if value is not None else getattr(self, name))
+        return merged
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DeviceInfo':
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def _normalize(key: str) -> str:
+    return re.sub(r'[\s_-]', '', key).lower()
+
+
+def parse_device_info(payload: bytes) -> DeviceInfo:
+    """Parse the payload of an IN_DEVICE_INFO report"""
+    text = bytes(payload).rstrip(b'\x00').decode('utf-8', errors='replace').strip()
+    reported: Dict[str, str] = {}
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        reported = {str(key): str(value) for key, value in data.items() if not isinstance(value, (dict, list))}
+    else:
+        for item in _SEPARATORS.split(text):
+            key, separator, value = item.partition('=') if '=' in item else item.partition(':')
+            if separator and key.strip():
+                reported[key.strip()] = value.strip()
+
+    info = DeviceInfo(fields=reported)
+    normalized = {_normalize(key): value for key, value in reported.items()}
+    for name, keys in _KEYS.items():
+        value = next((normalized[key] for key in keys if normalized.get(key)), None)
+        if value is not None and name in _INT_FIELDS:
+            match = re.match(r'\d+', value)
+            value = int(match.group()) if match else None
+        setattr(info, name, value)
+    return info
+
+
+class CapabilityCache:
+    """DeviceInfo of every deck seen, one JSON file per serial"""
+
+    def __init__(self, directory=DEFAULT_DEVICE_CACHE):
+        self.directory = Path(directory).expanduser()
+
+    def path(self, serial: str) -> Path:
+        return self.directory / (re.sub(r'[^A-Za-z0-9._-]', '_', serial) + '.json')
+
+    def load(self, serial: str) -> Optional[DeviceInfo]:
+        try:
+            with open(self.path(serial)) as f:
+                return DeviceInfo.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.debug(f"Ignoring cached capabilities of {serial}: {e}")
+            return None
+
+    def save(self, serial: str, info: DeviceInfo):
+        path = self.path(serial)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(info.to_dict(), indent=2, sort_keys=True))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache capabilities of {serial}: {e}")
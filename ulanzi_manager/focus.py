@@ -0,0 +1,309 @@
+"""Page switching by focused window
+
+The daemon shows the page of the first rule matching the focused window:
+
+    focus:
+      backend: auto                # x11, sway, hyprland or poll
+      default: main                # windows no rule matches (default: stay)
+      rules:
+        - {app: '^obs$', page: obs}
+        - {app: firefox, title: 'YouTube', page: media}
+
+'app' and 'title' are case-insensitive regular expressions on the window
+class (X11 WM_CLASS, Wayland app_id) and title.
+
+Focus changes come from the display server's own event stream, so nothing
+runs while the focus stays put:
+
+- x11: `xprop -spy` on the root window's _NET_ACTIVE_WINDOW, and on the
+  active window's _NET_WM_NAME for title changes (e.g. a browser tab switch)
+- sway: `swaymsg -t subscribe` window events
+- hyprland: the compositor's event socket (socket2)
+- poll: asks X11 for the active window every poll_interval seconds and
+  reports changes only; for setups where the event backends do not work
+
+The rule pages are pinned in the page cache (see prefetch.py), so a focus
+change uploads an already built archive in one transfer.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_ID = re.compile(r'0x[0-9a-fA-F]+')
+_XPROP_STRINGS = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+
+class FocusSource(ABC):
+    """Reports (app, title) of the focused window from a background thread"""
+
+    name = 'focus'
+
+    def __init__(self):
+        self.on_focus: Optional[Callable[[str, str], None]] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, on_focus: Callable[[str, str], None]):
+        self.on_focus = on_focus
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=f'ulanzi-focus-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.close()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def emit(self, app: Optional[str], title: Optional[str]):
+        if not self._stopped.is_set() and self.on_focus:
+            self.on_focus(app or '', title or '')
+
+    @abstractmethod
+    def run(self):
+        """Report focus changes until stopped"""
+
+    def close(self):
+        """Interrupt run()"""
+
+    def _run(self):
+        try:
+            self.run()
+        except Exception as e:
+            if not self._stopped.is_set():
+                logger.warning(f"Focus tracking ({self.name}) stopped: {e}")
+
+
+def _spawn(command) -> subprocess.Popen:
+    return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, bufsize=1)
+
+
+def _terminate(process: Optional[subprocess.Popen], timeout: float = 2.0):
+    """Stop a command and reap it (its reader closes stdout at EOF)"""
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class _CommandSource(FocusSource):
+    """Follows the output lines of a long-running command"""
+
+    command: Tuple[str, ...] = ()
+
+    def __init__(self):
+        super().__init__()
+        self._process: Optional[subprocess.Popen] = None
+
+    def run(self):
+        self._process = _spawn(self.command)
+        with self._process.stdout as lines:
+            for line in lines:
+                if self._stopped.is_set():
+                    return
+                self.line(line)
+
+    @abstractmethod
+    def line(self, line: str):
+        """Handle one output line of the command"""
+
+    def close(self):
+        _terminate(self._process)
+
+
+def x11_window(window_id: str) -> Tuple[str, str]:
+    """(class, title) of an X11 window"""
+    output = subprocess.run(['xprop', '-id', window_id, 'WM_CLASS', '_NET_WM_NAME'],
+                            capture_output=True, text=True, timeout=2).stdout
+    app = title = ''
+    for line in output.splitlines():
+        values = _XPROP_STRINGS.findall(line)
+        if line.startswith('WM_CLASS') and values:
+            app = values[-1]  # Class name, after the instance name
+        elif line.startswith('_NET_WM_NAME') and values:
+            title = values[0]
+    return app, title
+
+
+def x11_active_window() -> Tuple[str, str]:
+    """(class, title) of the active X11 window, empty without one"""
+    output = subprocess.run(['xprop', '-root', '_NET_ACTIVE_WINDOW'],
+                            capture_output=True, text=True, timeout=2).stdout
+    match = _WINDOW_ID.search(output)
+    if not match or int(match.group(), 16) == 0:
+        return '', ''
+    return x11_window(match.group())
+
+
+class X11Source(_CommandSource):
+    """Active window changes, plus title changes of the active window"""
+
+    name = 'x11'
+    command = ('xprop', '-root', '-spy', '_NET_ACTIVE_WINDOW')
+
+    def __init__(self):
+        super().__init__()
+        self._window: Optional[str] = None
+        self._title_process: Optional[subprocess.Popen] = None
+
+    def line(self, line: str):
+        match = _WINDOW_ID.search(line)
+        window = match.group() if match and int(match.group(), 16) != 0 else None
+        if window == self._window:
+            return
+        self._window = window
+        _terminate(self._title_process)
+        self._title_process = None
+        if window is None:
+            self.emit('', '')
+            return
+        app, title = x11_window(window)
+        self.emit(app, title)
+        try:
+            self._title_process = _spawn(('xprop', '-id', window, '-spy', '_NET_WM_NAME'))
+        except OSError as e:
+            logger.debug(f"Not following the title of {window}: {e}")
+            return
+        threading.Thread(target=self._follow_title, args=(self._title_process, app),
+                         name='ulanzi-focus-x11-title', daemon=True).start()
+
+    def _follow_title(self, process: subprocess.Popen, app: str):
+        with process.stdout as lines:
+            for line in lines:
+                values = _XPROP_STRINGS.findall(line)
+                if values and process is self._title_process:
+                    self.emit(app, values[0])
+
+    def close(self):
+        _terminate(self._title_process)
+        super().close()
+
+
+class SwaySource(_CommandSource):
+    name = 'sway'
+    command = ('swaymsg', '-r', '-m', '-t', 'subscribe', '["window"]')
+
+    def line(self, line: str):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        container = event.get('container') or {}
+        if event.get('change') == 'focus' or (event.get('change') == 'title' and container.get('focused')):
+            app = container.get('app_id') or (container.get('window_properties') or {}).get('class')
+            self.emit(app, container.get('name'))
+
+
+def hyprland_socket() -> Optional[Path]:
+    """Event socket of the running Hyprland instance"""
+    signature = os.environ.get('HYPRLAND_INSTANCE_SIGNATURE')
+    if not signature:
+        return None
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    for base in ([Path(runtime_dir) / 'hypr'] if runtime_dir else []) + [Path('/tmp/hypr')]:
+        path = base / signature / '.socket2.sock'
+        if path.exists():
+            return path
+    return None
+
+
+class HyprlandSource(FocusSource):
+    name = 'hyprland'
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self._socket: Optional[socket.socket] = None
+
+    def run(self):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(str(self.path))
+        with self._socket.makefile('r', encoding='utf-8', errors='replace') as events:
+            for line in events:
+                event, _, data = line.rstrip('\n').partition('>>')
+                if event == 'activewindow':
+                    app, _, title = data.partition(',')
+                    self.emit(app, title)
+
+    def close(self):
+        if self._socket:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+
+
+class PollSource(FocusSource):
+    """Queries the focused window at a fixed interval, reporting changes only"""
+
+    name = 'poll'
+
+    def __init__(self, interval: float, query: Callable[[], Tuple[str, str]] = x11_active_window):
+        super().__init__()
+        self.interval = interval
+        self.query = query
+
+    def run(self):
+        last = None
+        while not self._stopped.is_set():
+            try:
+                current = self.query()
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.debug(f"Focus query failed: {e}")
+                current = last
+            if current != last:
+                last = current
+                self.emit(*current)
+            self._stopped.wait(self.interval)
+
+
+def create_source(backend: str = 'auto', poll_interval: float = 0.5) -> Optional[FocusSource]:
+    """Focus source for a backend ('auto' picks the running display server), None if unavailable"""
+    if backend == 'auto':
+        if os.environ.get('HYPRLAND_INSTANCE_SIGNATURE'):
+            backend = 'hyprland'
+        elif os.environ.get('SWAYSOCK'):
+            backend = 'sway'
+        elif os.environ.get('DISPLAY'):
+            backend = 'x11'
+        else:
+            logger.warning("Focus tracking disabled: no X11, sway or Hyprland session found")
+            return None
+
+    if backend == 'hyprland':
+        path = hyprland_socket()
+        if path is None:
+            logger.warning("Focus tracking disabled: Hyprland event socket not found")
+            return None
+        return HyprlandSource(path)
+    tool = {'x11': 'xprop', 'poll': 'xprop', 'sway': 'swaymsg'}[backend]
+    if not shutil.which(tool):
+        logger.warning(f"Focus tracking disabled: {tool} not found")
+        return None
+    if backend == 'x11':
+        return X11Source()
+    if backend == 'sway':
+        return SwaySource()
+    return PollSource(poll_interval)
@@ -0,0 +1,204 @@
+"""Emoji and icon-font glyphs with a persistent bitmap cache
+
+Glyphs come from color emoji fonts (CBDT bitmaps such as Noto Color
+Emoji, or COLR outlines such as Twemoji) and from icon fonts referenced
+by name:
+
+    icon_spec: {type: emoji, emoji: "🎙️", color: '#202020'}
+    icon_spec: {type: icon, icon: mic, font: material, text_color: '#FFFFFF'}
+
+Icon names are looked up in a codepoints file next to the font: the
+'<font>.codepoints' file shipped with Material Symbols ("name hex" per
+line) or a '<font>.json' mapping names to hex codepoints (Font Awesome's
+icons.json layout also works). 'U+E029' and literal characters need no
+lookup.
+
+Rendered glyphs are cropped to their ink and cached in memory and as PNG
+files under ~/.cache/ulanzi/glyphs, keyed by (font, font mtime, text,
+size, color), so a deck full of glyph icons renders from cache after the
+first run.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when rendering changes so old cache files are not reused
+GLYPH_VERSION = 1
+GLYPH_CACHE_SIZE = 256
+DEFAULT_GLYPH_CACHE = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'ulanzi/glyphs'
+
+FONT_DIRS = ('~/.local/share/fonts', '~/.fonts', '/usr/local/share/fonts', '/usr/share/fonts')
+
+# Font file name patterns searched in FONT_DIRS
+EMOJI_FONTS = ('NotoColorEmoji*.ttf', 'Twemoji*.ttf', 'JoyPixels*.ttf', 'OpenMoji*.ttf')
+ICON_FONTS = {
+    'material': ('MaterialSymbolsOutlined*.ttf', 'MaterialSymbolsRounded*.ttf', 'MaterialIcons-Regular.ttf',
+                 'MaterialIcons*.ttf', 'MaterialIcons*.otf'),
+    'material-rounded': ('MaterialSymbolsRounded*.ttf', 'MaterialIconsRound*.otf'),
+    'material-sharp': ('MaterialSymbolsSharp*.ttf', 'MaterialIconsSharp*.otf'),
+    'fontawesome': ('fa-solid-900.ttf', 'Font Awesome * Free-Solid-900.otf', 'fontawesome-webfont.ttf'),
+    'fontawesome-brands': ('fa-brands-400.ttf', 'Font Awesome * Brands-Regular-400.otf'),
+}
+DEFAULT_ICON_FONT = 'material'
+
+# Pixel size of the bitmap strike in CBDT emoji fonts
+CBDT_STRIKE = 109
+
+
+@functools.lru_cache(maxsize=None)
+def find_font(name: str, patterns: Tuple[str, ...] = ()) -> Optional[str]:
+    """Path of a font given as a path, or the first file matching patterns in the font directories"""
+    path = Path(name).expanduser() if name else None
+    if path and path.is_file():
+        return str(path)
+    for pattern in patterns:
+        for directory in FONT_DIRS:
+            directory = Path(directory).expanduser()
+            if directory.is_dir():
+                match = next(iter(sorted(directory.rglob(pattern))), None)
+                if match:
+                    return str(match)
+    return None
+
+
+def emoji_font(font: Optional[str] = None) -> Optional[str]:
+    return find_font(font or '', EMOJI_FONTS)
+
+
+def icon_font(font: Optional[str] = None) -> Optional[str]:
+    font = font or DEFAULT_ICON_FONT
+    return find_font(font, ICON_FONTS.get(font, ()))
+
+
+@functools.lru_cache(maxsize=None)
+def codepoints(font_path: str) -> Dict[str, int]:
+    """Icon name -> codepoint from the codepoints file next to a font"""
+    stem = Path(font_path).with_suffix('')
+    names: Dict[str, int] = {}
+    codepoints_file = stem.with_name(stem.name + '.codepoints')
+    json_file = stem.with_name(stem.name + '.json')
+    if codepoints_file.exists():
+        for line in codepoints_file.read_text().splitlines():
+            parts = line.split()
+            if len(parts) == 2:
+                names[parts[0]] = int(parts[1], 16)
+    elif json_file.exists():
+        for name, value in json.loads(json_file.read_text()).items():
+            value = value.get('unicode') if isinstance(value, dict) else value
+            if value:
+                names[name] = int(str(value), 16)
+    return names
+
+
+def icon_text(icon: str, font_path: Optional[str]) -> str:
+    """Characters to draw for an icon name, 'U+XXXX' or literal character"""
+    icon = str(icon)
+    if icon.upper().startswith('U+'):
+        return chr(int(icon[2:], 16))
+    names = codepoints(font_path) if font_path else {}
+    if icon in names:
+        return chr(names[icon])
+    if len(icon) <= 2:  # A literal glyph (possibly with a variation selector)
+        return icon
+    raise ValueError(f"Unknown icon '{icon}'" + (f" in {font_path}" if font_path else " (no icon font found)"))
+
+
+def _open_font(path: Optional[str], size: int):
+    """Font at size; CBDT fonts only open at their bitmap strike, scaled afterwards"""
+    from PIL import ImageFont
+    if not path:
+        return ImageFont.load_default(size), 1.0
+    try:
+        return ImageFont.truetype(path, size), 1.0
+    except OSError:
+        return ImageFont.truetype(path, CBDT_STRIKE), size / CBDT_STRIKE
+
+
+def render_glyph(font_path: Optional[str], text: str, size: int, color='#FFFFFF'):
+    """Draw text in a font and crop it to its ink (RGBA)"""
+    from PIL import Image, ImageDraw
+
+    font, scale = _open_font(font_path, size)
+    left, top, right, bottom = font.getbbox(text)
+    canvas = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+    ImageDraw.Draw(canvas).text((-left, -top), text, font=font, fill=color, embedded_color=True)
+    box = canvas.getchannel('A').getbbox()
+    glyph = canvas.crop(box) if box else canvas
+    if scale != 1.0:
+        glyph = glyph.resize((max(1, round(glyph.width * scale)), max(1, round(glyph.height * scale))),
+                             Image.LANCZOS)
+    return glyph
+
+
+class GlyphCache:
+    """Rendered glyphs in an in-memory LRU backed by PNG files"""
+
+    def __init__(self, directory: Optional[Path] = DEFAULT_GLYPH_CACHE, capacity: int = GLYPH_CACHE_SIZE):
+        self.directory = Path(directory).expanduser() if directory else None
+        self.capacity = capacity
+        self.rendered = 0
+        self.loaded = 0  # From disk
+        self._memory: 'OrderedDict[str, object]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(font_path: Optional[str], text: str, size: int, color) -> str:
+        try:
+            mtime = os.stat(font_path).st_mtime_ns if font_path else None
+        except OSError:
+            mtime = None
+        key = [GLYPH_VERSION, font_path, mtime, [ord(c) for c in text], size, str(color)]
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:24]
+
+    def get(self, font_path: Optional[str], text: str, size: int, color='#FFFFFF'):
+        """Glyph image of text at size, rendered at most once per font version"""
+        from PIL import Image
+
+        key = self.key(font_path, text, size, color)
+        with self._lock:
+            glyph = self._memory.get(key)
+            if glyph is not None:
+                self._memory.move_to_end(key)
+                return glyph
+
+        path = self.directory / f'{key}.png' if self.directory else None
+        glyph = None
+        if path and path.exists():
+            try:
+                with Image.open(path) as image:
+                    glyph = image.convert('RGBA')
+                self.loaded += 1
+            except OSError as e:
+                logger.debug(f"Ignoring unreadable glyph {path}: {e}")
+        if glyph is None:
+            glyph = render_glyph(font_path, text, size, color)
+            self.rendered += 1
+            if path:
+                self._save(path, glyph)
+
+        with self._lock:
+            self._memory[key] = glyph
+            while len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+        return glyph
+
+    def _save(self, path: Path, glyph):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            glyph.save(tmp_path, 'PNG')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Could not cache glyph {path}: {e}")
+
+
+GLYPHS = GlyphCache()
@@ -4,13 +4,19 @@ import hashlib
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Optional, Any, Tuple
-from PIL import Image, ImageDraw, ImageFont
+from typing import Dict, Optional, Any, Tuple, Union
+from PIL import Image, ImageDraw
+
+from ulanzi_manager.compositor import COMPOSITOR, Compositor, validate_layers
+from ulanzi_manager.metrics import ICON_RENDER
+from ulanzi_manager.textfit import DEFAULT_MAX_LINES, DEFAULT_MIN_SIZE, fit_text, font_at
 
 logger = logging.getLogger(__name__)
 
 # Default icon size for Ulanzi D200
 DEFAULT_ICON_SIZE = (196, 196)
+# Glyph size of emoji and icon types without a font_size
+DEFAULT_GLYPH_SIZE = 120
 
 
 class IconSpec:
@@ -21,13 +27,18 @@ class IconSpec:
         Initialize IconSpec from a dictionary
 
         Expected keys:
-        - type: 'solid', 'gradient', 'text', 'emoji', 'icon' (required)
+        - type: 'solid', 'gradient', 'text', 'emoji', 'icon', 'layers' (required)
         - color: background color as hex string '#RRGGBB' or name
         - text: text to display (for type='text')
+        - emoji: emoji to display (for type='emoji', default: text)
+        - icon: icon font glyph name, 'U+XXXX' or character (for type='icon')
         - text_color: color of text as hex string or name (default: white)
-        - font_size: font size (default: 60)
-        - font: font name or path (default: system default)
+        - font_size: font size, or 'auto' for the largest size that fits (default: 40)
+        - padding, min_font_size, max_lines: box and limits of 'auto' text
+        - font: font name or path (default: system default); for emoji/icon a
+          color emoji font, or an icon font path or alias such as 'material' or 'fontawesome'
         - size: tuple (width, height) or single int (default: 196x196)
+        - layers: stack of layer specs (for type='layers', see compositor.py)
         """
         self.spec_dict = spec_dict
         self.type = spec_dict.get('type', 'solid')
@@ -36,6 +47,12 @@ class IconSpec:
         self.text_color = spec_dict.get('text_color', '#FFFFFF')
         self.font_size = spec_dict.get('font_size', 40)
         self.font = spec_dict.get('font', None)
+        self.padding = spec_dict.get('padding', 12)
+        self.min_font_size = spec_dict.get('min_font_size', DEFAULT_MIN_SIZE)
+        self.max_lines = spec_dict.get('max_lines', DEFAULT_MAX_LINES)
+        self.emoji = spec_dict.get('emoji', self.text)
+        self.icon = spec_dict.get('icon')
+        self.layers = spec_dict.get('layers')
 
         # Parse size
         size = spec_dict.get('size', DEFAULT_ICON_SIZE)
@@ -53,19 +70,31 @@ class IconSpec:
         """Validate the icon spec and return list of errors"""
         errors = []
 
-        valid_types = ['solid', 'gradient', 'text', 'emoji', 'icon']
+        valid_types = ['solid', 'gradient', 'text', 'emoji', 'icon', 'layers']
         if self.type not in valid_types:
             errors.append(f"Invalid icon type '{self.type}'. Must be one of: {', '.join(valid_types)}")
 
-        if self.type in ['solid', 'gradient', 'text']:
+        if self.type in ['solid', 'gradient', 'text', 'emoji', 'icon']:
             if not self._is_valid_color(self.color):
                 errors.append(f"Invalid color '{self.color}'")
 
         if self.type == 'text' and not self.text:
             errors.append("Text type requires 'text' field")
 
-        if self.font_size < 1 or self.font_size > 150:
-            errors.append(f"font_size must be between 1 and 150, got {self.font_size}")
+        if self.type == 'emoji' and not self.emoji:
+            errors.append("Emoji type requires 'emoji' field")
+
+        if self.type == 'icon' and not self.icon:
+            errors.append("Icon type requires 'icon' field")
+
+        if self.type == 'layers':
+            errors.extend(validate_layers(self.layers))
+
+        if self.font_size == 'auto':
+            if self.min_font_size < 1 or self.max_lines < 1:
+                errors.append("min_font_size and max_lines must be at least 1")
+        elif not isinstance(self.font_size, int) or self.font_size < 1 or self.font_size > 150:
+            errors.append(f"font_size must be between 1 and 150 or 'auto', got {self.font_size}")
 
         if not isinstance(self.size, (tuple, list)) or len(self.size) != 2:
             errors.append(f"size must be a tuple/list of 2 integers")
@@ -90,17 +119,19 @@ class IconSpec:
 class IconGenerator:
     """Generates icon images from specifications"""
 
-    def __init__(self, cache_dir: Optional[Path] = None):
+    def __init__(self, cache_dir: Optional[Path] = None, compositor: Optional[Compositor] = None):
         """
         Initialize icon generator
 
         Args:
             cache_dir: Directory to cache generated icons (default: ./icons)
+            compositor: Layer compositor for 'layers' icons (default: the shared one)
         """
         self.cache_dir = cache_dir or Path('./icons')
         self.cache_dir.mkdir(exist_ok=True)
+        self.compositor = compositor or COMPOSITOR
 
-    def generate(self, spec: IconSpec, force: bool = False, button_index: Optional[int] = None) -> Path:
+    def generate(self, spec: IconSpec, force: bool = False, button_index: Optional[Union[int, str]] = None) -> Path:
         """
         Generate an icon from spec or return cached version
 
@@ -125,21 +156,26 @@ class IconGenerator:
         logger.info(f"Generating icon: {spec.type}")
 
         # Generate based on type
-        if spec.type == 'solid':
-            img = self._generate_solid(spec)
-        elif spec.type == 'text':
-            img = self._generate_text(spec)
-        elif spec.type == 'gradient':
-            img = self._generate_gradient(spec)
-        else:
-            raise ValueError(f"Unsupported icon type: {spec.type}")
+        with ICON_RENDER.time(spec.type):
+            if spec.type == 'solid':
+                img = self._generate_solid(spec)
+            elif spec.type == 'text':
+                img = self._generate_text(spec)
+            elif spec.type == 'gradient':
+                img = self._generate_gradient(spec)
+            elif spec.type in ('emoji', 'icon'):
+                img = self._generate_glyph(spec)
+            elif spec.type == 'layers':
+                img = self.compositor.render(spec.layers, spec.size)
+            else:
+                raise ValueError(f"Unsupported icon type: {spec.type}")
 
         # Save and return
         img.save(cache_path, 'PNG')
         logger.info(f"Saved icon to: {cache_path}")
         return cache_path
 
-    def generate_from_dict(self, spec_dict: Dict[str, Any], force: bool = False, button_index: Optional[int] = None) -> Path:
+    def generate_from_dict(self, spec_dict: Dict[str, Any], force: bool = False, button_index: Optional[Union[int, str]] = None) -> Path:
         """Generate icon from a dictionary specification"""
         spec = IconSpec(spec_dict)
         errors = spec.validate()
@@ -157,35 +193,25 @@ class IconGenerator:
         img = Image.new('RGB', spec.size, color=spec.color)
         draw = ImageDraw.Draw(img)
 
-        # Try to use specified font, fall back to default
-        font = None
-        if spec.font:
-            try:
-                font = ImageFont.truetype(spec.font, spec.font_size)
-            except (OSError, IOError):
-                logger.warning(f"Font not found: {spec.font}, using default")
-
-        if font is None:
-            try:
-                # Try common system fonts - Bold variant for better appearance
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", spec.font_size)
-            except (OSError, IOError):
-                try:
-                    # Try regular if bold not available
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", spec.font_size)
-                except (OSError, IOError):
-                    # Fall back to default font
-                    font = ImageFont.load_default()
+        text_value = str(spec.text or "")
+        font_size = spec.font_size
+        if font_size == 'auto':
+            # Largest size that fits inside the padding, wrapped and ellipsized
+            box = (spec.size[0] - 2 * spec.padding, spec.size[1] - 2 * spec.padding)
+            fitted = fit_text(text_value, box, spec.font, min_size=spec.min_font_size, max_lines=spec.max_lines)
+            text_value, font_size = fitted.text, fitted.size
+
+        # Specified font, else DejaVu Sans Bold, regular, or PIL's default
+        font = font_at(spec.font, font_size)
 
         # Draw text centered — support multiline like ImageMagick's gravity center
         center_x = spec.size[0] // 2
         center_y = spec.size[1] // 2
 
-        text_value = spec.text or ""
         # If multiline (contains \n), use multiline_text with center alignment
         if "\n" in text_value:
             # spacing ~15% of font size for balanced line separation
-            spacing = max(1, int(spec.font_size * 0.15))
+            spacing = max(1, int(font_size * 0.15))
             draw.multiline_text(
                 (center_x, center_y),
                 text_value,
@@ -200,6 +226,18 @@ class IconGenerator:
 
         return img
 
+    def _generate_glyph(self, spec: IconSpec) -> Image.Image:
+        """Generate emoji or icon-font glyph icon, centered on the background color"""
+        glyph = {
+            'type': 'glyph',
+            spec.type: spec.emoji if spec.type == 'emoji' else spec.icon,
+            'size': spec.spec_dict.get('font_size', DEFAULT_GLYPH_SIZE),
+            'color': spec.text_color,
+        }
+        if spec.font:
+            glyph['font'] = spec.font
+        return self.compositor.render([{'type': 'background', 'color': spec.color}, glyph], spec.size)
+
     def _generate_gradient(self, spec: IconSpec) -> Image.Image:
         """Generate gradient icon (simple vertical gradient)"""
         img = Image.new('RGB', spec.size)
@@ -0,0 +1,253 @@
+"""Config includes, templates and button inheritance
+
+Resolved on the YAML node tree before validation, so schema errors in a
+template or an included file still point at the line that caused them:
+
+    include:                       # merged under this file, in order
+      - obs-buttons.yaml
+    templates:
+      obs:
+        action: obs
+        label_style: {Color: 0xFFFFFF}
+      scene:
+        extends: obs               # templates extend templates
+        params: {action: set_scene}
+        icon_spec: {type: text, color: '#202060', font_size: auto}
+    buttons:
+      - extends: scene             # a name or a list (later ones win)
+        label: Live
+        params: {scene: Live}      # mappings merge key by key
+        icon_spec: {text: LIVE}
+
+'templates', 'pages' and 'atlases' are merged by name across files, the
+including file winning; any other key in the including file replaces the
+included value. Relative paths are relative to the main config file.
+
+The resolved document records which templates each button uses
+(ConfigGraph), and every button carries a digest of its resolved
+definition, so a reload only re-renders the buttons whose definition or
+templates changed (see ConfigParser._generate_icons).
+"""
+
+import copy
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+from ulanzi_manager.schema import ConfigError
+
+# Top-level mappings merged by key across included files
+MERGED_KEYS = ('templates', 'pages', 'atlases')
+
+_FLATTENER = yaml.SafeLoader('')
+
+
+@dataclass
+class ConfigGraph:
+    """Templates and the buttons that depend on them"""
+    template_files: Dict[str, str] = field(default_factory=dict)  # template -> file defining it
+    template_digests: Dict[str, str] = field(default_factory=dict)  # template -> digest of its own body
+    extends: Dict[str, List[str]] = field(default_factory=dict)  # template -> templates it extends (transitively)
+    uses: Dict[Tuple[str, int], List[str]] = field(default_factory=dict)  # (page, index) -> templates
+
+    def buttons_using(self, template: str) -> List[Tuple[str, int]]:
+        """Buttons that extend a template, directly or through other templates"""
+        return [button for button, templates in self.uses.items() if template in templates]
+
+    def changed_templates(self, previous: 'ConfigGraph') -> List[str]:
+        """Templates added, removed or edited since previous"""
+        names = set(self.template_digests) | set(previous.template_digests)
+        return sorted(name for name in names
+                      if self.template_digests.get(name) != previous.template_digests.get(name))
+
+
+@dataclass
+class Document:
+    """Config node tree with includes and templates resolved"""
+    node: Optional[Node]
+    files: List[str] = field(default_factory=list)  # The config file and every included file
+    errors: List[ConfigError] = field(default_factory=list)
+    graph: ConfigGraph = field(default_factory=ConfigGraph)
+
+    def error(self, node: Node, message: str):
+        mark = node.start_mark
+        self.errors.append(ConfigError(message, mark.line + 1, mark.column + 1, mark.name))
+
+
+def digest(value: Any) -> str:
+    """Digest of a constructed YAML value"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _mapping(node: MappingNode) -> Dict[str, Node]:
+    _FLATTENER.flatten_mapping(node)
+    return {str(key.value): value for key, value in node.value if isinstance(key, ScalarNode)}
+
+
+def _with_pairs(node: MappingNode, pairs) -> MappingNode:
+    return MappingNode(node.tag, pairs, node.start_mark, node.end_mark, flow_style=node.flow_style)
+
+
+def merge_entries(base: MappingNode, top: MappingNode) -> MappingNode:
+    """Entries of both mappings, top replacing base entries of the same key"""
+    replaced = _mapping(top)
+    _mapping(base)
+    pairs = [(key, value) for key, value in base.value if str(key.value) not in replaced]
+    return _with_pairs(top, pairs + list(top.value))
+
+
+def merge_documents(base: MappingNode, top: MappingNode) -> MappingNode:
+    """Top-level merge of an included document (base) under the including one (top)"""
+    base_values = _mapping(base)
+    top_values = _mapping(top)
+    pairs = [(key, value) for key, value in base.value if str(key.value) not in top_values]
+    for key, value in top.value:
+        below = base_values.get(str(key.value))
+        if str(key.value) in MERGED_KEYS and isinstance(value, MappingNode) and isinstance(below, MappingNode):
+            value = merge_entries(below, value)
+        pairs.append((key, value))
+    return _with_pairs(top, pairs)
+
+
+def merge_nodes(base: Node, top: Node) -> Node:
+    """Deep merge: mappings merge key by key, anything else in top replaces base"""
+    if not isinstance(base, MappingNode) or not isinstance(top, MappingNode):
+        return top
+    base_values = _mapping(base)
+    top_values = _mapping(top)
+    pairs = [(key, copy.deepcopy(value)) for key, value in base.value
+             if str(key.value) not in top_values and key.value != 'extends']
+    for key, value in top.value:
+        if key.value == 'extends':
+            continue
+        if str(key.value) in base_values:
+            value = merge_nodes(base_values[str(key.value)], value)
+        pairs.append((key, value))
+    return _with_pairs(top, pairs)
+
+
+def _names(node: Node) -> List[Tuple[str, Node]]:
+    """Template names of an 'extends' value with the node of each"""
+    items = node.value if isinstance(node, SequenceNode) else [node]
+    return [(str(item.value), item) for item in items if isinstance(item, ScalarNode)]
+
+
+class _Resolver:
+    def __init__(self, document: Document):
+        self.document = document
+        self.templates: Dict[str, Node] = {}
+        self.resolved: Dict[str, Optional[MappingNode]] = {}
+
+    def load(self, path: Path, stack: List[Path]) -> Optional[Node]:
+        with open(path, 'r') as f:
+            loader = yaml.SafeLoader(f)
+            try:
+                node = loader.get_single_node()
+            finally:
+                loader.dispose()
+        self.document.files.append(str(path))
+        if not isinstance(node, MappingNode):
+            return node
+
+        include = _mapping(node).get('include')
+        if include is None:
+            return node
+        merged = None
+        for entry in include.value if isinstance(include, SequenceNode) else [include]:
+            if not isinstance(entry, ScalarNode) or entry.tag != 'tag:yaml.org,2002:str':
+                continue  # Reported by the schema
+            target = Path(entry.value).expanduser()
+            target = (target if target.is_absolute() else path.parent / target).resolve()
+            if target in stack or target == path:
+                chain = ' -> '.join(p.name for p in stack + [path, target])
+                self.document.error(entry, f"include cycle: {chain}")
+                continue
+            if not target.is_file():
+                self.document.error(entry, f"included file not found: {target}")
+                continue
+            included = self.load(target, stack + [path])
+            if not isinstance(included, MappingNode):
+                self.document.error(entry, f"included file must be a mapping: {target}")
+                continue
+            merged = included if merged is None else merge_documents(merged, included)
+        return node if merged is None else merge_documents(merged, node)
+
+    def template(self, name: str, at: Node, chain: List[str]) -> Optional[MappingNode]:
+        """A template merged over the templates it extends"""
+        if name in self.resolved:
+            return self.resolved[name]
+        if name not in self.templates:
+            known = ', '.join(self.templates) or 'none'
+            self.document.error(at, f"unknown template '{name}' (templates: {known})")
+            return None
+        if name in chain:
+            self.document.error(at, f"template cycle: {' -> '.join(chain + [name])}")
+            return None
+        body = self.templates[name]
+        if not isinstance(body, MappingNode):
+            self.resolved[name] = None  # Reported by the schema
+            return None
+
+        graph = self.document.graph
+        parents: List[str] = []
+        merged: Optional[MappingNode] = None
+        extends = _mapping(body).get('extends')
+        for parent, parent_node in _names(extends) if extends is not None else []:
+            resolved = self.template(parent, parent_node, chain + [name])
+            if resolved is not None:
+                merged = resolved if merged is None else merge_nodes(merged, resolved)
+                parents += [parent] + [p for p in graph.extends.get(parent, []) if p not in parents]
+        graph.extends[name] = list(dict.fromkeys(parents))
+        self.resolved[name] = merge_nodes(merged, body) if merged is not None else merge_nodes(body, body)
+        return self.resolved[name]
+
+    def extend(self, button: MappingNode, key: Tuple[str, int]) -> MappingNode:
+        """A button merged over the templates it extends"""
+        extends = _mapping(button).get('extends')
+        if extends is None:
+            return button
+        merged: Node = _with_pairs(button, [])
+        used: List[str] = []
+        for name, name_node in _names(extends):
+            template = self.template(name, name_node, [])
+            if template is not None:
+                merged = merge_nodes(merged, template)
+                used += [name] + self.document.graph.extends.get(name, [])
+        self.document.graph.uses[key] = list(dict.fromkeys(used))
+        return merge_nodes(merged, button)
+
+    def apply_templates(self, root: MappingNode):
+        from ulanzi_manager.config import MAIN_PAGE
+
+        values = _mapping(root)
+        if isinstance(values.get('templates'), MappingNode):
+            self.templates = _mapping(values['templates'])
+        for name, body in self.templates.items():
+            self.document.graph.template_files[name] = body.start_mark.name
+            self.document.graph.template_digests[name] = digest(_FLATTENER.construct_document(body))
+        lists = [(MAIN_PAGE, values.get('buttons'))]
+        if isinstance(values.get('pages'), MappingNode):
+            lists += list(_mapping(values['pages']).items())
+        for page, buttons in lists:
+            if not isinstance(buttons, SequenceNode):
+                continue
+            for index, button in enumerate(buttons.value):
+                if isinstance(button, MappingNode):
+                    buttons.value[index] = self.extend(button, (page, index))
+
+
+def load_document(path) -> Document:
+    """Compose a config file with its includes, and expand the templates its buttons extend"""
+    path = Path(path).resolve()
+    document = Document(node=None)
+    resolver = _Resolver(document)
+    node = resolver.load(path, [])
+    if isinstance(node, MappingNode):
+        resolver.apply_templates(node)
+    document.node = node
+    return document
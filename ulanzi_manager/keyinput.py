@@ -0,0 +1,249 @@
+"""Keyboard injection for the 'key' action
+
+Keys are written to a uinput virtual keyboard that stays open for the
+daemon's lifetime, so a press costs a few write() calls instead of an
+xdotool process. This works on X11 and Wayland alike. When /dev/uinput
+cannot be opened, or a key has no evdev code, xdotool is used instead.
+
+Key names follow xdotool: combos are joined with '+' ('ctrl+shift+t') and
+sequences are separated by spaces ('ctrl+c ctrl+v'). Text is typed with
+the US layout mapping.
+"""
+
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# linux/input-event-codes.h and linux/uinput.h
+EV_SYN = 0x00
+EV_KEY = 0x01
+SYN_REPORT = 0
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+BUS_USB = 0x03
+
+# struct input_event (timeval, type, code, value) and struct uinput_user_dev
+INPUT_EVENT = struct.Struct('llHHi')
+UINPUT_USER_DEV = struct.Struct('=80sHHHHI256i')
+
+DEVICE_NAME = b'Ulanzi Manager virtual keyboard'
+# Seconds to let the compositor pick up a new device before the first event
+SETTLE_TIME = 0.2
+# Seconds between keys, same as xdotool's default
+DEFAULT_DELAY = 0.012
+
+KEY_CODES: Dict[str, int] = {
+    'escape': 1, 'minus': 12, 'equal': 13, 'backspace': 14, 'tab': 15,
+    'bracketleft': 26, 'bracketright': 27, 'return': 28, 'ctrl': 29,
+    'semicolon': 39, 'apostrophe': 40, 'grave': 41, 'shift': 42, 'backslash': 43,
+    'comma': 51, 'period': 52, 'slash': 53, 'shift_r': 54, 'kp_multiply': 55,
+    'alt': 56, 'space': 57, 'caps_lock': 58, 'num_lock': 69, 'scroll_lock': 70,
+    'kp_subtract': 74, 'kp_add': 78, 'kp_enter': 96, 'ctrl_r': 97, 'kp_divide': 98,
+    'print': 99, 'alt_r': 100, 'home': 102, 'up': 103, 'page_up': 104, 'left': 105,
+    'right': 106, 'end': 107, 'down': 108, 'page_down': 109, 'insert': 110, 'delete': 111,
+    'xf86audiomute': 113, 'xf86audiolowervolume': 114, 'xf86audioraisevolume': 115,
+    'pause': 119, 'super': 125, 'super_r': 126, 'menu': 127,
+    'xf86audionext': 163, 'xf86audioplay': 164, 'xf86audioprev': 165, 'xf86audiostop': 166,
+}
+KEY_CODES.update({str(digit % 10): digit + 1 for digit in range(1, 11)})
+KEY_CODES.update({letter: code for row, start in (('qwertyuiop', 16), ('asdfghjkl', 30), ('zxcvbnm', 44))
+                  for code, letter in enumerate(row, start)})
+KEY_CODES.update({f'f{n}': 58 + n for n in range(1, 11)})
+KEY_CODES.update({'f11': 87, 'f12': 88})
+KEY_CODES.update({f'f{n}': 170 + n for n in range(13, 25)})
+
+KEY_ALIASES = {
+    'control': 'ctrl', 'control_l': 'ctrl', 'ctrl_l': 'ctrl', 'control_r': 'ctrl_r',
+    'shift_l': 'shift', 'alt_l': 'alt', 'meta': 'alt', 'altgr': 'alt_r', 'iso_level3_shift': 'alt_r',
+    'super_l': 'super', 'win': 'super', 'logo': 'super', 'cmd': 'super',
+    'enter': 'return', 'esc': 'escape', 'del': 'delete', 'ins': 'insert',
+    'prior': 'page_up', 'pageup': 'page_up', 'next': 'page_down', 'pagedown': 'page_down',
+    'sys_req': 'print', 'equals': 'equal', 'dash': 'minus', 'quoteleft': 'grave',
+    'xf86audioraise': 'xf86audioraisevolume', 'xf86audiolower': 'xf86audiolowervolume',
+}
+
+# Characters typed with the US layout: char -> (key name, shift)
+_UNSHIFTED = {' ': 'space', '\n': 'return', '\t': 'tab', '-': 'minus', '=': 'equal', '[': 'bracketleft',
+              ']': 'bracketright', ';': 'semicolon', "'": 'apostrophe', '`': 'grave', '\\': 'backslash',
+              ',': 'comma', '.': 'period', '/': 'slash'}
+_SHIFTED = {'!': '1', '@': '2', '#': '3', '$': '4', '%': '5', '^': '6', '&': '7', '*': '8', '(': '9', ')': '0',
+            '_': 'minus', '+': 'equal', '{': 'bracketleft', '}': 'bracketright', ':': 'semicolon',
+            '"': 'apostrophe', '~': 'grave', '|': 'backslash', '<': 'comma', '>': 'period', '?': 'slash'}
+
+
+def key_code(name: str) -> int:
+    """evdev code for an xdotool-style key name"""
+    key = name.strip().lower()
+    key = KEY_ALIASES.get(key, key)
+    if key not in KEY_CODES:
+        raise ValueError(f"Unknown key '{name}'")
+    return KEY_CODES[key]
+
+
+def parse_combo(combo: str) -> List[int]:
+    """'ctrl+shift+t' -> evdev codes, in press order"""
+    return [key_code(name) for name in combo.split('+') if name]
+
+
+def char_key(char: str) -> Optional[Tuple[int, bool]]:
+    """(evdev code, needs shift) for a character, or None if it cannot be typed"""
+    if char in _UNSHIFTED:
+        return KEY_CODES[_UNSHIFTED[char]], False
+    if char in _SHIFTED:
+        return KEY_CODES[_SHIFTED[char]], True
+    lower = char.lower()
+    if len(char) == 1 and lower in KEY_CODES and (lower.isalnum() and lower.isascii()):
+        return KEY_CODES[lower], char != lower
+    return None
+
+
+class UInputKeyboard:
+    """Virtual keyboard on /dev/uinput.
+
+    fd and ioctl can be supplied for testing (e.g. a pipe and a recorder).
+    """
+
+    def __init__(self, path: str = '/dev/uinput', fd: Optional[int] = None,
+                 ioctl: Optional[Callable[[int, int, int], object]] = None, settle: float = SETTLE_TIME):
+        self.path = path
+        self.fd = fd
+        self._owns_fd = fd is None
+        if ioctl is None:
+            import fcntl
+            ioctl = fcntl.ioctl
+        self._ioctl = ioctl
+        self.settle = settle
+        self.created = False
+
+    def open(self):
+        """Create the virtual device (raises OSError without access to uinput)"""
+        if self.created:
+            return
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            self._ioctl(self.fd, UI_SET_EVBIT, EV_KEY)
+            for code in sorted(set(KEY_CODES.values())):
+                self._ioctl(self.fd, UI_SET_KEYBIT, code)
+            os.write(self.fd, UINPUT_USER_DEV.pack(DEVICE_NAME, BUS_USB, 0x2207, 0x0019, 1, 0, *([0] * 256)))
+            self._ioctl(self.fd, UI_DEV_CREATE, 0)
+        except OSError:
+            self.close()
+            raise
+        self.created = True
+        logger.info("Created uinput virtual keyboard")
+        if self.settle:
+            time.sleep(self.settle)
+
+    def close(self):
+        if self.fd is None:
+            return
+        try:
+            if self.created:
+                self._ioctl(self.fd, UI_DEV_DESTROY, 0)
+        except OSError:
+            pass
+        finally:
+            if self._owns_fd:
+                os.close(self.fd)
+            self.fd = None
+            self.created = False
+
+    def press(self, codes: Sequence[int]):
+        """Press codes in order, then release them in reverse"""
+        self.open()
+        events = [INPUT_EVENT.pack(0, 0, EV_KEY, code, 1) for code in codes]
+        events.append(INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0))
+        events += [INPUT_EVENT.pack(0, 0, EV_KEY, code, 0) for code in reversed(codes)]
+        events.append(INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0))
+        os.write(self.fd, b''.join(events))
+
+
+class KeyInjector:
+    """Send key sequences and text, through uinput when possible, else xdotool"""
+
+    def __init__(self, backend: str = 'auto', keyboard: Optional[UInputKeyboard] = None):
+        if backend not in ('auto', 'uinput', 'xdotool'):
+            raise ValueError(f"Invalid key backend '{backend}'")
+        self.backend = backend
+        self.keyboard = keyboard if keyboard is not None else (UInputKeyboard() if backend != 'xdotool' else None)
+        self._uinput_failed = backend == 'xdotool'
+
+    def send(self, steps: Union[str, List], delay: float = DEFAULT_DELAY):
+        """Run a key sequence.
+
+        steps is a space-separated string of combos or a list whose items
+        are combos or {'keys': ..., 'text': ..., 'delay': ms} mappings;
+        a mapping's delay replaces the default pause after that step.
+        """
+        if isinstance(steps, str):
+            steps = steps.split()
+        pause = 0.0
+        for step in steps:
+            if pause:
+                time.sleep(pause)
+            pause = delay
+            if isinstance(step, dict):
+                if step.get('delay') is not None:
+                    pause = float(step['delay']) / 1000
+                if step.get('keys'):
+                    self.send(step['keys'], delay)
+                if step.get('text'):
+                    self.type_text(str(step['text']), delay)
+            else:
+                self._combo(str(step))
+
+    def type_text(self, text: str, delay: float = DEFAULT_DELAY):
+        """Type text character by character"""
+        keys = [char_key(char) for char in text]
+        if None in keys or not self._uinput():
+            self._xdotool(['type', '--delay', str(int(delay * 1000)), '--', text])
+            return
+        shift = KEY_CODES['shift']
+        for index, (code, shifted) in enumerate(keys):
+            if index and delay:
+                time.sleep(delay)
+            self.keyboard.press([shift, code] if shifted else [code])
+
+    def close(self):
+        if self.keyboard:
+            self.keyboard.close()
+
+    def _combo(self, combo: str):
+        if self._uinput():
+            try:
+                codes = parse_combo(combo)
+            except ValueError as e:
+                logger.debug(f"{e}, sending through xdotool")
+            else:
+                self.keyboard.press(codes)
+                return
+        self._xdotool(['key', '--', combo])
+
+    def _uinput(self) -> bool:
+        """True if the uinput keyboard is usable"""
+        if self._uinput_failed:
+            return False
+        try:
+            self.keyboard.open()
+            return True
+        except OSError as e:
+            if self.backend == 'uinput':
+                raise
+            logger.warning(f"Cannot use {self.keyboard.path} ({e}), falling back to xdotool")
+            self._uinput_failed = True
+            return False
+
+    @staticmethod
+    def _xdotool(args: List[str]):
+        if not shutil.which('xdotool'):
+            raise RuntimeError("No key backend: /dev/uinput is not accessible and xdotool is not installed")
+        subprocess.run(['xdotool'] + args, check=True, capture_output=True)
@@ -0,0 +1,147 @@
+"""Macro action: a sequence of steps run as one button press
+
+Each step is one of:
+
+    - action: obs                  # Any registered action type
+      params: {action: set_scene, scene: Live}
+    - wait: 500                    # Milliseconds
+    - parallel:                    # Branches run at the same time; each is
+        - action: key              # a step or a list of steps
+          params: {keys: F9}
+        - [{action: obs, params: {action: start_recording}}, {wait: 100}]
+    - if: {recording: false}       # Conditions on OBS state
+      then: [...]
+      else: [...]
+
+Steps run through the daemon's ActionExecutor, so OBS steps share its
+client and lock, and page steps run on the daemon loop. A failing step
+stops the macro.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+from ulanzi_manager.actions import ActionHandler
+from ulanzi_manager.schema import Field, Schema, Validator, action_schema, check_action
+
+logger = logging.getLogger(__name__)
+
+STEP_KINDS = ('action', 'wait', 'parallel', 'if')
+
+CONDITION_SCHEMA = Schema({
+    'recording': Field('bool'),
+    'streaming': Field('bool'),
+    'scene': Field('str'),
+    'muted': Field('map'),  # {input name: true/false}
+})
+
+
+def _check_step(validator: Validator, node, values: Dict):
+    kinds = [kind for kind in STEP_KINDS if kind in values]
+    if len(kinds) != 1:
+        validator.error(node, f"macro step must have exactly one of: {', '.join(STEP_KINDS)}")
+        return
+    if kinds[0] == 'action':
+        check_action(validator, node, values)
+    elif 'then' not in values and 'else' not in values and kinds[0] == 'if':
+        validator.error(node, "macro 'if' step requires 'then' or 'else'")
+
+
+def _check_branch(validator: Validator, node, value):
+    # A branch is a single step (checked through STEP_FIELD) or a list of steps
+    if validator.kind(node) == 'map':
+        validator.check_field(node, STEP_FIELD, 'step')
+
+
+STEP_SCHEMA = Schema({}, _check_step)
+STEP_FIELD = Field('map', schema=STEP_SCHEMA)
+STEPS_FIELD = Field('list', items=STEP_FIELD)
+STEP_SCHEMA.fields.update({
+    'action': Field('str'),
+    'params': Field('map', nullable=True),
+    'wait': Field('number', minimum=0),
+    'parallel': Field('list', items=Field(('map', 'list'), items=STEP_FIELD, check=_check_branch)),
+    'if': Field('map', schema=CONDITION_SCHEMA),
+    'then': STEPS_FIELD,
+    'else': STEPS_FIELD,
+})
+
+
+class MacroAction(ActionHandler):
+    """Run a sequence of steps"""
+
+    schema = action_schema('macro', {'steps': Field('list', required=True, items=STEP_FIELD)})
+
+    def execute(self, params: Dict[str, Any]):
+        """Run the macro's steps in order"""
+        steps = params.get('steps')
+        if not steps:
+            logger.error("Macro action requires 'steps' parameter")
+            return
+        if not self.context.executor:
+            logger.error("Macro action requires an action executor")
+            return
+
+        start = time.perf_counter()
+        self.run_steps(steps)
+        logger.info(f"Macro finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def run_steps(self, steps: List[Dict[str, Any]]):
+        for step in steps:
+            self.run_step(step)
+
+    def run_step(self, step: Dict[str, Any]):
+        if 'wait' in step:
+            time.sleep(float(step['wait']) / 1000)
+        elif 'parallel' in step:
+            self._parallel(step['parallel'])
+        elif 'if' in step:
+            branch = 'then' if self.condition(step['if']) else 'else'
+            self.run_steps(step.get(branch) or [])
+        else:
+            self.context.executor.call(step.get('action', 'command'), step.get('params') or {})
+
+    def condition(self, condition: Dict[str, Any]) -> bool:
+        """True if OBS state matches every key of condition"""
+        obs = self.context.obs_client
+        if not obs:
+            raise RuntimeError("Macro condition requires an OBS connection")
+
+        with self.context.obs_lock:
+            if 'recording' in condition and obs.get_record_status().output_active != condition['recording']:
+                return False
+            if 'streaming' in condition and obs.get_stream_status().output_active != condition['streaming']:
+                return False
+            if 'scene' in condition:
+                if obs.get_current_program_scene().current_program_scene_name != condition['scene']:
+                    return False
+            for name, muted in (condition.get('muted') or {}).items():
+                if obs.get_input_mute(name).input_muted != muted:
+                    return False
+        return True
+
+    def _parallel(self, branches: List[Any]):
+        """Run branches in threads and wait for all; the first error is raised"""
+        errors: List[Exception] = []
+
+        def run(steps):
+            try:
+                self.run_steps(steps)
+            except Exception as e:
+                errors.append(e)
+
+        threads = []
+        for branch in branches:
+            steps = branch if isinstance(branch, list) else [branch]
+            # Each branch keeps the pressed button (current_button) of the macro
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(run, steps), name='macro-branch', daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
@@ -0,0 +1,265 @@
+"""Metrics registry and Prometheus text endpoint for the daemon"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (1 ms .. 10 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Monotonic counter, optionally split by one label"""
+
+    def __init__(self, name: str, help_text: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()  # Updated from the loop, action workers and prefetch
+
+    def inc(self, amount: float = 1, label_value: str = ''):
+        """Increment the counter"""
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value: str = '') -> float:
+        return self._values.get(label_value, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for label_value, value in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.label, label_value)} {_number(value)}')
+        if not values and not self.label:
+            lines.append(f'{self.name} 0')
+        return lines
+
+
+class Histogram:
+    """Histogram with fixed buckets, optionally split by one label"""
+
+    def __init__(self, name: str, help_text: str, label: Optional[str] = None,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = ''):
+        """Record one observation"""
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(label_value)
+            if data is None:
+                data = self._values[label_value] = [0] * (len(self.buckets) + 2)
+            data[bucket] += 1
+            data[-1] += value
+
+    def time(self, label_value: str = '') -> '_Timer':
+        """Context manager observing the elapsed time in seconds"""
+        return _Timer(self, label_value)
+
+    def count(self, label_value: str = '') -> int:
+        with self._lock:
+            data = self._values.get(label_value)
+            return int(sum(data[:-1])) if data else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {label_value: list(data) for label_value, data in self._values.items()}
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_value, data in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), data[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.label, label_value, le=le)} {int(cumulative)}')
+            lines.append(f'{self.name}_sum{_labels(self.label, label_value)} {_number(data[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.label, label_value)} {int(cumulative)}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label_value', 'start')
+
+    def __init__(self, histogram: Histogram, label_value: str):
+        self.histogram = histogram
+        self.label_value = label_value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.label_value)
+        return False
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, label: Optional[str] = None) -> Counter:
+        return self._register(Counter(name, help_text, label))
+
+    def histogram(self, name: str, help_text: str, label: Optional[str] = None,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(label: Optional[str], value: str, le: Optional[str] = None) -> str:
+    parts = []
+    if label:
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{label}="{escaped}"')
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = Registry()
+
+BUTTON_PRESSES = REGISTRY.counter('ulanzi_button_presses_total', 'Button presses received', 'button')
+ACTION_LATENCY = REGISTRY.histogram('ulanzi_action_duration_seconds', 'Action execution time', 'action')
+ACTION_ERRORS = REGISTRY.counter('ulanzi_action_errors_total', 'Actions that raised', 'action')
+ACTIONS_DROPPED = REGISTRY.counter('ulanzi_actions_dropped_total', 'Presses dropped at the action concurrency limit', 'action')
+HID_BYTES_WRITTEN = REGISTRY.counter('ulanzi_hid_bytes_written_total', 'Bytes written to the device')
+HID_PACKETS_WRITTEN = REGISTRY.counter('ulanzi_hid_packets_written_total', 'Packets written to the device')
+UPLOAD_DURATION = REGISTRY.histogram('ulanzi_upload_duration_seconds', 'Button archive build and upload time')
+ZIP_RETRIES = REGISTRY.counter('ulanzi_zip_padding_retries_total', 'Archive layouts retried to avoid invalid boundary bytes')
+ICON_RENDER = REGISTRY.histogram('ulanzi_icon_render_seconds', 'Icon render time', 'type')
+ICON_LAYER_CACHE = REGISTRY.counter('ulanzi_icon_layer_cache_total', 'Icon layers reused from or missing in the layer cache', 'result')
+OBS_REQUEST_LATENCY = REGISTRY.histogram('ulanzi_obs_request_seconds', 'OBS WebSocket request latency', 'request')
+OBS_RECONNECTS = REGISTRY.counter('ulanzi_obs_connects_total', 'OBS WebSocket connection attempts', 'result')
+PAGE_CACHE = REGISTRY.counter('ulanzi_page_cache_total', 'Page archives found in, missing from or prefetched into the page cache', 'result')
+ANIMATION_FRAMES = REGISTRY.counter('ulanzi_animation_frames_total', 'Animation frames sent or skipped', 'result')
+
+
+class TimedProxy:
+    """Wrap an object so every method call is observed in a histogram, labelled by method name"""
+
+    def __init__(self, target, histogram: Histogram):
+        self._target = target
+        self._histogram = histogram
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        histogram = self._histogram
+
+        def timed(*args, **kwargs):
+            with histogram.time(name):
+                return attr(*args, **kwargs)
+        return timed
+
+
+def _make_server(kind: str, address, registry: Registry):
+    """Create the HTTP server (http.server is only imported when metrics are enabled)"""
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self):
+            return str(self.client_address[0]) if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            logger.debug(f"metrics: {format % args}")
+
+    class UnixHTTPServer(socketserver.UnixStreamServer, HTTPServer):
+        def server_bind(self):
+            socketserver.UnixStreamServer.server_bind(self)
+            self.server_name = 'localhost'
+            self.server_port = 0
+
+    if kind == 'unix':
+        return UnixHTTPServer(address, MetricsHandler)
+    return HTTPServer(address, MetricsHandler)
+
+
+class MetricsServer:
+    """Serve the registry over HTTP on localhost or a Unix socket.
+
+    listen is 'host:port' (or just a port) or 'unix:/path/to/socket'.
+    """
+
+    def __init__(self, listen: str, registry: Registry = REGISTRY):
+        self.listen = listen
+        self.registry = registry
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._socket_path: Optional[str] = None
+
+    @staticmethod
+    def parse_listen(listen: str) -> Tuple[str, object]:
+        """Return ('unix', path) or ('tcp', (host, port))"""
+        listen = str(listen)
+        if listen.startswith('unix:'):
+            return 'unix', os.path.expanduser(listen[5:])
+        host, _, port = listen.rpartition(':')
+        return 'tcp', (host or '127.0.0.1', int(port))
+
+    def start(self):
+        kind, address = self.parse_listen(self.listen)
+        if kind == 'unix':
+            if os.path.exists(address):
+                os.unlink(address)
+            os.makedirs(os.path.dirname(address) or '.', exist_ok=True)
+            self._socket_path = address
+        self._server = _make_server(kind, address, self.registry)
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics available at {self.listen}")
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server else None
+
+    def stop(self):
+        server, self._server = self._server, None
+        if server:
+            server.shutdown()
+            server.server_close()
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
@@ -0,0 +1,211 @@
+"""Background prefetch of the pages reachable from the current page
+
+Pages compiled into the config snapshot are uploaded from their prebuilt
+archive. The others (snapshot disabled, or pages whose buttons changed at
+runtime) would be baked, read and packed on their first visit. PageCache
+prepares them ahead of time instead: whenever a page is shown, the pages
+its buttons can switch to (page actions, including inside macros) are
+queued for a low-priority worker thread, most visited first, and their
+archives are kept in an LRU bounded by page count and bytes. Pinned
+pages (e.g. the targets of focus rules, see focus.py) are built ahead of
+time even with prefetch disabled and are never evicted:
+
+    prefetch:
+      enabled: true
+      max_pages: 8
+      max_memory_mb: 32
+"""
+
+import logging
+import os
+import queue
+import threading
+from collections import Counter as VisitCounter, OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional
+
+from ulanzi_manager.archive import ButtonArchive, CompressionPolicy
+from ulanzi_manager.metrics import PAGE_CACHE
+
+logger = logging.getLogger(__name__)
+
+# Niceness added to the worker thread (Linux schedules threads individually)
+PREFETCH_NICE = 10
+
+
+def page_targets(action_type: str, params: Optional[Dict[str, Any]]) -> Iterator[str]:
+    """Pages an action can switch to, looking into macro steps"""
+    params = params or {}
+    if action_type == 'page' and params.get('page'):
+        yield str(params['page'])
+    elif action_type == 'macro':
+        yield from _step_targets(params.get('steps') or [])
+
+
+def _step_targets(steps) -> Iterator[str]:
+    for step in steps if isinstance(steps, list) else [steps]:
+        if not isinstance(step, dict):
+            continue
+        if 'action' in step:
+            yield from page_targets(step['action'], step.get('params'))
+        for branch in step.get('parallel') or []:
+            yield from _step_targets(branch)
+        for key in ('then', 'else'):
+            yield from _step_targets(step.get(key) or [])
+
+
+def adjacent_pages(config, page: str) -> List[str]:
+    """Other pages reachable through the buttons of a page, in button order"""
+    pages = set(config.page_names())
+    targets = []
+    for button in config.page_buttons(page):
+        for target in page_targets(button.action_type, button.action_params):
+            if target in pages and target != page and target not in targets:
+                targets.append(target)
+    return targets
+
+
+class PageCache:
+    """Page archives: those compiled into the snapshot, then an LRU of pages built at runtime"""
+
+    def __init__(self, snapshot, max_pages: int = 8, max_bytes: int = 32 * 1024 * 1024, enabled: bool = True):
+        self.snapshot = snapshot
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.bytes = 0
+        self.visits = VisitCounter()
+        self.pinned: List[str] = []
+        self._archives: 'OrderedDict[str, ButtonArchive]' = OrderedDict()
+        self._generation: Dict[str, int] = {}  # Bumped when a page changes, so stale builds are dropped
+        self._building: Dict[str, Future] = {}
+        self._queue: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def __contains__(self, page: str) -> bool:
+        with self._lock:
+            return page in self._archives
+
+    def archive(self, page: str) -> Optional[ButtonArchive]:
+        """Archive of a page, built now if neither compiled nor prefetched (None for empty pages)"""
+        self.visits[page] += 1
+        if page in self.snapshot.archives:
+            return self.snapshot.archives[page]
+        with self._lock:
+            archive = self._archives.get(page)
+            if archive is not None:
+                self._archives.move_to_end(page)
+            building = self._building.get(page)
+        if archive is None and building is not None:
+            archive = building.result()  # Already being built: wait rather than build it twice
+        if archive is not None:
+            PAGE_CACHE.inc(label_value='hit')
+            return archive
+
+        PAGE_CACHE.inc(label_value='miss')
+        return self._build(page)
+
+    def prefetch(self, page: str):
+        """Queue the pages reachable from page, replacing earlier predictions"""
+        pages = []
+        if self.enabled and self.max_pages:
+            pages = adjacent_pages(self.snapshot.config, page)
+            pages.sort(key=lambda target: -self.visits[target])  # Stable: button order among equals
+            pages = pages[:self.max_pages]
+        self._clear_queue()
+        self._queue_builds(pages + [target for target in self.pinned if target not in pages])
+
+    def pin(self, pages: List[str]):
+        """Build pages in the background and keep them out of LRU eviction"""
+        self.pinned = list(dict.fromkeys(pages))
+        self._queue_builds(self.pinned)
+
+    def _queue_builds(self, pages: List[str]):
+        for target in pages:
+            if target not in self.snapshot.archives and target not in self:
+                self._queue.put(target)
+        if not self._queue.empty():
+            self._ensure_worker()
+
+    def invalidate(self, page: str):
+        """Drop the archives of a page whose buttons changed"""
+        self.snapshot.invalidate(page)
+        with self._lock:
+            self._generation[page] = self._generation.get(page, 0) + 1
+            archive = self._archives.pop(page, None)
+            if archive is not None:
+                self.bytes -= archive.size
+        if page in self.pinned:
+            self._queue_builds([page])
+
+    def stop(self):
+        if self._thread:
+            self._clear_queue()
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _build(self, page: str, prefetched: bool = False) -> Optional[ButtonArchive]:
+        from ulanzi_manager.snapshot import build_page
+
+        with self._lock:
+            generation = self._generation.get(page, 0)
+            future = self._building.setdefault(page, Future()) if prefetched else None
+        archive = None
+        try:
+            config = self.snapshot.config
+            archive = build_page(config, page, CompressionPolicy(config.compression, config.compression_min_ratio))
+        finally:
+            with self._lock:
+                if archive is not None and self._generation.get(page, 0) == generation:
+                    self._store(page, archive)
+                elif prefetched:
+                    archive = None  # The page changed while it was built
+                if future is not None:
+                    self._building.pop(page, None)
+                    future.set_result(archive)
+        return archive
+
+    def _store(self, page: str, archive: ButtonArchive):
+        previous = self._archives.pop(page, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        if archive.size > self.max_bytes and page not in self.pinned:
+            return
+        self._archives[page] = archive
+        self.bytes += archive.size
+        evictable = [name for name in self._archives if name not in self.pinned]
+        while evictable and (len(self._archives) > self.max_pages or self.bytes > self.max_bytes):
+            self.bytes -= self._archives.pop(evictable.pop(0)).size
+
+    def _clear_queue(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._work, name='ulanzi-prefetch', daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        try:
+            thread_id = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, thread_id, os.getpriority(os.PRIO_PROCESS, thread_id) + PREFETCH_NICE)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            page = self._queue.get()
+            if page is None:
+                return
+            if page in self.snapshot.archives or page in self:
+                continue
+            try:
+                if self._build(page, prefetched=True) is not None:
+                    PAGE_CACHE.inc(label_value='prefetched')
+                    logger.debug(f"Prefetched page '{page}'")
+            except Exception as e:
+                logger.warning(f"Failed to prefetch page '{page}': {e}")
@@ -0,0 +1,315 @@
+"""Supervision of processes started by command and app actions
+
+One supervisor thread reaps children as soon as they exit, using a pidfd
+per child where the kernel supports it (Linux 5.3+, Python 3.9+) and a
+short poll interval otherwise. It also drains captured stdout/stderr into
+a bounded per-process ring buffer and enforces timeouts. Children are
+started in their own session so a timeout or toggle stops the whole
+process group (e.g. everything started by a shell command).
+"""
+
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MODES = ('parallel', 'single', 'toggle')
+
+# Instances per key in 'parallel' mode unless configured
+DEFAULT_MAX_INSTANCES = 4
+# Captured output kept per process
+OUTPUT_LINES = 50
+MAX_LINE_LENGTH = 512
+# Finished processes kept for the status API
+HISTORY_SIZE = 20
+# Seconds between SIGTERM and SIGKILL on timeout or toggle
+KILL_GRACE = 3.0
+# Poll interval when pidfds are not available
+FALLBACK_POLL_INTERVAL = 0.5
+
+
+class ManagedProcess:
+    """A supervised child and its captured output"""
+
+    def __init__(self, key: str, command: Union[str, Sequence[str]], popen: subprocess.Popen,
+                 timeout: Optional[float]):
+        self.key = key
+        self.command = command if isinstance(command, str) else ' '.join(command)
+        self.popen = popen
+        self.pid = popen.pid
+        self.started = time.time()
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.exit_code: Optional[int] = None
+        self.ended: Optional[float] = None
+        self.timed_out = False
+        self.output: Deque[Tuple[str, str]] = deque(maxlen=OUTPUT_LINES)  # (stream, line)
+        self._partial: Dict[str, str] = {}
+        self._term_sent: Optional[float] = None
+        self._pidfd: Optional[int] = None
+        self._pipes: Dict[int, Tuple[str, object]] = {}  # fd -> (stream, file)
+        for stream, pipe in (('stdout', popen.stdout), ('stderr', popen.stderr)):
+            if pipe is not None:
+                os.set_blocking(pipe.fileno(), False)
+                self._pipes[pipe.fileno()] = (stream, pipe)
+
+    @property
+    def running(self) -> bool:
+        return self.exit_code is None
+
+    def _append(self, stream: str, data: bytes):
+        text = self._partial.pop(stream, '') + data.decode('utf-8', errors='replace')
+        *lines, rest = text.split('\n')
+        for line in lines:
+            self.output.append((stream, line[:MAX_LINE_LENGTH]))
+        if rest:
+            self._partial[stream] = rest[:MAX_LINE_LENGTH]
+
+    def _flush(self):
+        for stream, rest in self._partial.items():
+            self.output.append((stream, rest))
+        self._partial.clear()
+
+    def to_dict(self) -> Dict:
+        return {
+            'key': self.key,
+            'command': self.command,
+            'pid': self.pid,
+            'started': self.started,
+            'running': self.running,
+            'exit_code': self.exit_code,
+            'runtime': (self.ended or time.time()) - self.started,
+            'timed_out': self.timed_out,
+            'output': [f"{stream}: {line}" for stream, line in self.output],
+        }
+
+
+class ProcessManager:
+    """Start, limit, reap and time out child processes keyed by button"""
+
+    def __init__(self, history: int = HISTORY_SIZE):
+        self.history: Deque[ManagedProcess] = deque(maxlen=history)
+        # Called from the supervisor thread with each process that exited
+        self.exit_callbacks: List[Callable[[ManagedProcess], None]] = []
+        self._running: Dict[str, List[ManagedProcess]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._stopped = False
+
+    def start(self, key: str, command: Union[str, Sequence[str]], shell: bool = False, mode: str = 'parallel',
+              max_instances: Optional[int] = DEFAULT_MAX_INSTANCES, timeout: Optional[float] = None,
+              capture: bool = False) -> Optional[ManagedProcess]:
+        """Start command for key, subject to mode.
+
+        - parallel: start unless max_instances are already running
+        - single: start only if none is running
+        - toggle: stop the running instances instead, if any
+
+        capture keeps the last output lines. The output then goes to a
+        pipe read by the supervisor; without it, to /dev/null, so children
+        can keep writing after the daemon exits.
+
+        Returns the new process, or None if none was started.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Invalid process mode '{mode}'. Must be one of: {', '.join(MODES)}")
+
+        running = self.running(key)
+        if running:
+            if mode == 'toggle':
+                for process in running:
+                    self.terminate(process)
+                logger.info(f"Stopped {len(running)} process(es) for {key}")
+                return None
+            if mode == 'single' or (max_instances and len(running) >= max_instances):
+                logger.warning(f"Not starting '{running[0].command}' for {key}: {len(running)} already running")
+                return None
+
+        output = subprocess.PIPE if capture else subprocess.DEVNULL
+        popen = subprocess.Popen(command, shell=shell, stdin=subprocess.DEVNULL, stdout=output, stderr=output,
+                                 start_new_session=True)
+        process = ManagedProcess(key, command, popen, timeout)
+        if hasattr(os, 'pidfd_open'):
+            try:
+                process._pidfd = os.pidfd_open(popen.pid)
+            except OSError:
+                pass
+
+        with self._lock:
+            self._running.setdefault(key, []).append(process)
+            self._ensure_supervisor()
+        self._wake()
+        logger.info(f"Started '{process.command}' (pid {process.pid}) for {key}")
+        return process
+
+    def running(self, key: Optional[str] = None) -> List[ManagedProcess]:
+        with self._lock:
+            if key is not None:
+                return list(self._running.get(key, []))
+            return [process for processes in self._running.values() for process in processes]
+
+    def terminate(self, process: ManagedProcess):
+        """SIGTERM the process group; the supervisor sends SIGKILL after KILL_GRACE"""
+        if process.running and process._term_sent is None:
+            process._term_sent = time.monotonic()
+            self._signal(process, signal.SIGTERM)
+            self._wake()
+
+    def snapshot(self) -> Dict:
+        """Running and recently finished processes, for the status API"""
+        with self._lock:
+            history = list(self.history)
+        return {
+            'running': [process.to_dict() for process in self.running()],
+            'recent': [process.to_dict() for process in reversed(history)],
+        }
+
+    def shutdown(self):
+        """Stop supervising. Children keep running (apps outlive the daemon);
+        the output pipes of captured ones are closed."""
+        self._stopped = True
+        self._wake()
+        thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout=2)
+        for process in self.running():
+            for _, pipe in process._pipes.values():
+                pipe.close()
+            process._pipes.clear()
+            if process._pidfd is not None:
+                os.close(process._pidfd)
+                process._pidfd = None
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
+
+    def _ensure_supervisor(self):
+        if self._thread is None:
+            self._stopped = False
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            self._thread = threading.Thread(target=self._supervise, name='process-supervisor', daemon=True)
+            self._thread.start()
+
+    def _wake(self):
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b'\0')
+            except (BlockingIOError, OSError):
+                pass
+
+    @staticmethod
+    def _signal(process: ManagedProcess, signum: int):
+        try:
+            os.killpg(process.pid, signum)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            process.popen.send_signal(signum)
+
+    def _supervise(self):
+        while not self._stopped:
+            processes = self.running()
+            poller = select.poll()
+            poller.register(self._wake_r, select.POLLIN)
+            pipes: Dict[int, ManagedProcess] = {}
+            all_pidfds = True
+            for process in processes:
+                if process._pidfd is not None:
+                    poller.register(process._pidfd, select.POLLIN)
+                else:
+                    all_pidfds = False
+                for fd in process._pipes:
+                    poller.register(fd, select.POLLIN)
+                    pipes[fd] = process
+
+            timeout = self._next_timeout(processes, all_pidfds)
+            for fd, _ in poller.poll(None if timeout is None else int(timeout * 1000) + 1):
+                if fd == self._wake_r:
+                    try:
+                        while os.read(self._wake_r, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif fd in pipes:
+                    self._read_pipe(pipes[fd], fd)
+
+            now = time.monotonic()
+            for process in processes:
+                if process.popen.poll() is not None:
+                    self._finish(process)
+                elif process.deadline and now >= process.deadline and process._term_sent is None:
+                    logger.warning(f"'{process.command}' (pid {process.pid}) timed out")
+                    process.timed_out = True
+                    self.terminate(process)
+                elif process._term_sent is not None and now - process._term_sent >= KILL_GRACE:
+                    self._signal(process, signal.SIGKILL)
+
+    @staticmethod
+    def _next_timeout(processes: List[ManagedProcess], all_pidfds: bool) -> Optional[float]:
+        now = time.monotonic()
+        timeouts = [] if all_pidfds else [FALLBACK_POLL_INTERVAL]
+        for process in processes:
+            if process._term_sent is not None:
+                timeouts.append(process._term_sent + KILL_GRACE - now)
+            elif process.deadline:
+                timeouts.append(process.deadline - now)
+        return max(0.0, min(timeouts)) if timeouts else None
+
+    @staticmethod
+    def _read_pipe(process: ManagedProcess, fd: int) -> bool:
+        """Read what is available; returns False at EOF (and closes the pipe)"""
+        stream, pipe = process._pipes[fd]
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b''
+        if data:
+            process._append(stream, data)
+            return True
+        pipe.close()
+        del process._pipes[fd]
+        return False
+
+    def _finish(self, process: ManagedProcess):
+        # Drain output already written; pipes still held open by grandchildren are dropped
+        for fd in list(process._pipes):
+            while self._read_pipe(process, fd) and fd in process._pipes:
+                try:
+                    if not select.select([fd], [], [], 0)[0]:
+                        break
+                except (OSError, ValueError):
+                    break
+            if fd in process._pipes:
+                process._pipes.pop(fd)[1].close()
+        process._flush()
+        if process._pidfd is not None:
+            os.close(process._pidfd)
+            process._pidfd = None
+
+        process.exit_code = process.popen.returncode
+        process.ended = time.time()
+        with self._lock:
+            siblings = self._running.get(process.key, [])
+            if process in siblings:
+                siblings.remove(process)
+            if not siblings:
+                self._running.pop(process.key, None)
+            self.history.append(process)
+        logger.info(f"'{process.command}' (pid {process.pid}) exited with {process.exit_code}")
+        for callback in list(self.exit_callbacks):
+            try:
+                callback(process)
+            except Exception as e:
+                logger.error(f"Exit callback failed for '{process.command}': {e}")
@@ -0,0 +1,110 @@
+"""Timer scheduling for the daemon main loop"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """Handle for a scheduled callback"""
+
+    __slots__ = ('when', 'interval', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when: float, interval: Optional[float], callback: Callable, args: tuple):
+        self.when = when
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the timer from firing again"""
+        self.cancelled = True
+
+
+class Scheduler:
+    """Run one-shot and periodic callbacks from the daemon main loop.
+
+    Callbacks run on the thread calling run_pending(). Other threads hand
+    work to that thread with call_soon_threadsafe().
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._timers = []
+        self._counter = itertools.count()
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """Run callback once after delay seconds"""
+        timer = Timer(self.clock() + delay, None, callback, args)
+        heapq.heappush(self._timers, (timer.when, next(self._counter), timer))
+        return timer
+
+    def call_every(self, interval: float, callback: Callable, *args, delay: Optional[float] = None) -> Timer:
+        """Run callback every interval seconds, first after delay (default: interval)"""
+        first = interval if delay is None else delay
+        timer = Timer(self.clock() + first, interval, callback, args)
+        heapq.heappush(self._timers, (timer.when, next(self._counter), timer))
+        return timer
+
+    def call_soon_threadsafe(self, callback: Callable, *args):
+        """Queue callback for the next run_pending() call, from any thread"""
+        with self._lock:
+            self._ready.append((callback, args))
+        self._wakeup.set()
+
+    def wait(self, timeout: float):
+        """Sleep up to timeout seconds, returning early when work is queued from another thread"""
+        if self._wakeup.wait(timeout):
+            self._wakeup.clear()
+
+    def time_until_next(self) -> Optional[float]:
+        """Seconds until the next timer is due, or None if there are none"""
+        if self._ready:
+            return 0.0
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return None
+        return max(0.0, self._timers[0][0] - self.clock())
+
+    def run_pending(self):
+        """Run queued callbacks and every timer that is due"""
+        if self._ready:
+            with self._lock:
+                ready, self._ready = self._ready, deque()
+            for callback, args in ready:
+                self._run(callback, args)
+
+        now = self.clock()
+        repeating = []
+        while self._timers and self._timers[0][0] <= now:
+            _, _, timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            self._run(timer.callback, timer.args)
+            if timer.interval is not None and not timer.cancelled:
+                repeating.append(timer)
+
+        # Periodic timers fire at most once per call; missed ticks are skipped
+        for timer in repeating:
+            timer.when += timer.interval
+            if timer.when <= now:
+                timer.when = now + timer.interval
+            heapq.heappush(self._timers, (timer.when, next(self._counter), timer))
+
+    @staticmethod
+    def _run(callback: Callable, args: tuple):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Scheduled callback {getattr(callback, '__name__', callback)} failed: {e}")
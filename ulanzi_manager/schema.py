@@ -0,0 +1,619 @@
+"""Declarative schema for configuration files
+
+The schema is checked in a single pass over the YAML node tree produced by
+yaml.compose(), so every error carries the line and column of the value
+that caused it. The schema of an action's 'params' mapping comes from its
+handler class (see actions.ActionRegistry), or from
+register_action_schema() for validators registered on their own; unknown
+action types are errors.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import yaml
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+# YAML tag -> schema kind
+_TAG_KINDS = {
+    'tag:yaml.org,2002:str': 'str',
+    'tag:yaml.org,2002:int': 'int',
+    'tag:yaml.org,2002:float': 'float',
+    'tag:yaml.org,2002:bool': 'bool',
+    'tag:yaml.org,2002:null': 'null',
+    'tag:yaml.org,2002:map': 'map',
+    'tag:yaml.org,2002:seq': 'list',
+}
+
+# Schema kind -> node kinds it accepts
+_ACCEPTS = {
+    'str': ('str',),
+    'int': ('int',),
+    'number': ('int', 'float'),
+    'bool': ('bool',),
+    'scalar': ('str', 'int', 'float', 'bool'),
+    'map': ('map',),
+    'list': ('list',),
+}
+
+_KIND_NAMES = {
+    'str': 'a string', 'int': 'an integer', 'number': 'a number', 'bool': 'true or false',
+    'scalar': 'a single value', 'map': 'a mapping', 'list': 'a list',
+}
+
+
+@dataclass
+class ConfigError:
+    """Validation error at a position in the config file (1-based)"""
+    message: str
+    line: int
+    column: int
+    file: Optional[str] = None  # Set for errors in an included file
+
+    def __str__(self) -> str:
+        return f"line {self.line}, column {self.column}: {self.message}"
+
+
+class Field:
+    """Constraints for one value.
+
+    kind is 'str', 'int', 'number', 'bool', 'scalar', 'map', 'list' or
+    'any', or a tuple of kinds. check(validator, node, value) may report
+    further errors through validator.error().
+    """
+
+    def __init__(self, kind: Union[str, Tuple[str, ...]] = 'any', required: bool = False,
+                 nullable: bool = False, choices: Optional[Iterable[Any]] = None,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None,
+                 schema: Optional['Schema'] = None, items: Optional['Field'] = None,
+                 check: Optional[Callable[['Validator', Node, Any], None]] = None):
+        self.kinds = (kind,) if isinstance(kind, str) else tuple(kind)
+        self.required = required
+        self.nullable = nullable
+        self.choices = tuple(choices) if choices is not None else None
+        self.minimum = minimum
+        self.maximum = maximum
+        self.schema = schema
+        self.items = items
+        self.check = check
+
+
+class Schema:
+    """Fields of a mapping. Keys not listed are allowed and not checked.
+
+    check(validator, node, values) runs after the fields, with values
+    mapping each present key to its node.
+    """
+
+    def __init__(self, fields: Dict[str, Field],
+                 check: Optional[Callable[['Validator', MappingNode, Dict[str, Node]], None]] = None,
+                 required_message: str = "{path} is required"):
+        self.fields = fields
+        self.check = check
+        self.required_message = required_message
+
+
+# action type -> Schema of its params, checked before the action registry
+ACTION_SCHEMAS: Dict[str, Schema] = {}
+
+
+def register_action_schema(action_type: str, schema: Optional[Schema] = None):
+    """Declare an action type and the schema of its params"""
+    ACTION_SCHEMAS[action_type] = schema or Schema({})
+
+
+class Validator:
+    """Single-pass validation of a composed config document"""
+
+    def __init__(self, base_path: Optional[Path] = None):
+        self.base_path = Path(base_path) if base_path else Path('.')
+        self.errors: List[ConfigError] = []
+        self.page_names: List[str] = []
+        self.atlases: Dict[str, Any] = {}  # Atlas name -> tile names (None if unreadable)
+        self.where = ''  # Prefix for errors inside a button
+        self._loader = yaml.SafeLoader('')
+
+    def error(self, node: Node, message: str):
+        mark = node.start_mark
+        prefix = f"{self.where}: " if self.where else ''
+        self.errors.append(ConfigError(prefix + message, mark.line + 1, mark.column + 1, mark.name))
+
+    def value(self, node: Node) -> Any:
+        """Python value of a node"""
+        return self._loader.construct_object(node, deep=True)
+
+    @staticmethod
+    def kind(node: Node) -> str:
+        if isinstance(node, ScalarNode):
+            return _TAG_KINDS.get(node.tag, 'str')
+        return 'list' if isinstance(node, SequenceNode) else 'map'
+
+    def mapping(self, node: MappingNode) -> Dict[str, Node]:
+        """Key name -> value node, after resolving merge keys"""
+        self._loader.flatten_mapping(node)
+        return {str(key.value): value for key, value in node.value if isinstance(key, ScalarNode)}
+
+    def check_field(self, node: Node, field: Field, path: str) -> bool:
+        """Check one value, returning False if it has the wrong type"""
+        kind = self.kind(node)
+        if kind == 'null':
+            if not field.nullable and field.kinds != ('any',):
+                self.error(node, f"{path} must not be empty")
+                return False
+            return True
+
+        if 'any' not in field.kinds and not any(kind in _ACCEPTS[k] for k in field.kinds):
+            expected = ' or '.join(_KIND_NAMES[k] for k in field.kinds)
+            self.error(node, f"{path} must be {expected}")
+            return False
+
+        if isinstance(node, MappingNode):
+            if field.schema:
+                self.check_mapping(node, field.schema, path)
+        elif isinstance(node, SequenceNode):
+            if field.items:
+                for index, item in enumerate(node.value):
+                    self.check_field(item, field.items, f"{path}[{index}]")
+        elif field.choices is not None or field.minimum is not None or field.maximum is not None:
+            value = self.value(node)
+            if field.choices is not None and value not in field.choices:
+                self.error(node, f"{path} must be one of: {', '.join(str(c) for c in field.choices)}")
+                return False
+            if field.minimum is not None and field.maximum is not None:
+                if not field.minimum <= value <= field.maximum:
+                    self.error(node, f"{path} must be between {field.minimum} and {field.maximum}")
+            elif field.minimum is not None and value < field.minimum:
+                self.error(node, f"{path} must be at least {field.minimum}")
+            elif field.maximum is not None and value > field.maximum:
+                self.error(node, f"{path} must be at most {field.maximum}")
+
+        if field.check:
+            field.check(self, node, None if isinstance(node, (MappingNode, SequenceNode)) else self.value(node))
+        return True
+
+    def check_mapping(self, node: MappingNode, schema: Schema, path: str = '') -> Dict[str, Node]:
+        values = self.mapping(node)
+        for key, field in schema.fields.items():
+            key_path = f"{path}.{key}" if path else key
+            if key in values:
+                self.check_field(values[key], field, key_path)
+            elif field.required:
+                self.error(node, schema.required_message.format(path=key_path, key=key))
+        if schema.check:
+            schema.check(self, node, values)
+        return values
+
+
+# Checks
+
+def _check_time(validator: Validator, node: Node, value):
+    from ulanzi_manager.config import BrightnessSchedule
+    try:
+        BrightnessSchedule.parse_time(value)
+    except ValueError:
+        validator.error(node, f"brightness_schedule: invalid time '{value}', expected HH:MM")
+
+
+def _check_positive(validator: Validator, node: Node, value):
+    if value is not None and value <= 0:
+        validator.error(node, "brightness_schedule.idle_timeout must be positive")
+
+
+def _check_listen(validator: Validator, node: Node, value):
+    value = str(value)
+    if value.startswith('unix:'):
+        return
+    _, _, port = value.rpartition(':')
+    if not port.isdigit() or not 1 <= int(port) <= 65535:
+        validator.error(node, "metrics.listen must be 'host:port' or 'unix:/path'")
+
+
+def _check_min_ratio(validator: Validator, node: Node, value):
+    if not 0 < value <= 1:
+        validator.error(node, "compression.min_ratio must be between 0 and 1")
+
+
+def _check_color(validator: Validator, node: Node, value):
+    # Named colors are resolved by PIL at render time
+    if isinstance(value, str) and value.startswith('#'):
+        try:
+            int(value[1:], 16)
+            return
+        except ValueError:
+            pass
+    elif isinstance(value, str):
+        return
+    validator.error(node, f"icon_spec: invalid color '{value}'")
+
+
+def _check_size(validator: Validator, node: Node, value):
+    if isinstance(node, SequenceNode):
+        if len(node.value) != 2 or any(validator.kind(item) != 'int' for item in node.value):
+            validator.error(node, "icon_spec.size must be an integer or a list of 2 integers")
+
+
+def _check_font_size(validator: Validator, node: Node, value):
+    if value == 'auto':
+        return
+    if isinstance(value, bool) or not isinstance(value, int):
+        validator.error(node, "icon_spec.font_size must be an integer or 'auto'")
+    elif not 1 <= value <= 150:
+        validator.error(node, "icon_spec.font_size must be between 1 and 150")
+
+
+def _check_icon_spec(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    icon_type = validator.value(values['type']) if 'type' in values else 'solid'
+    if icon_type == 'text' and 'text' not in values:
+        validator.error(node, "icon_spec: 'text' type requires 'text'")
+    if icon_type == 'emoji' and 'emoji' not in values and 'text' not in values:
+        validator.error(node, "icon_spec: 'emoji' type requires 'emoji'")
+    if icon_type == 'icon' and 'icon' not in values:
+        validator.error(node, "icon_spec: 'icon' type requires 'icon'")
+    if icon_type == 'layers' and not (isinstance(values.get('layers'), SequenceNode) and values['layers'].value):
+        validator.error(values.get('layers', node), "icon_spec: 'layers' type requires a non-empty 'layers' list")
+
+
+def _check_layer(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    from ulanzi_manager.compositor import missing_fields_error, required_fields
+    kind = validator.value(values['type']) if 'type' in values else None
+    fields = required_fields(kind) if isinstance(kind, str) else ()
+    if fields and not any(key in values for key in fields):
+        validator.error(node, f"icon_spec: {missing_fields_error(kind)}")
+
+
+def _check_position(validator: Validator, node: Node, value):
+    from ulanzi_manager.compositor import POSITIONS
+    if isinstance(node, SequenceNode):
+        if len(node.value) != 2 or any(validator.kind(item) != 'int' for item in node.value):
+            validator.error(node, "icon_spec: layer position must be a name or [x, y]")
+    elif value not in POSITIONS:
+        validator.error(node, f"icon_spec: layer position must be [x, y] or one of: {', '.join(POSITIONS)}")
+
+
+def _check_image(validator: Validator, node: Node, value):
+    from ulanzi_manager.atlas import is_atlas_ref, split_ref
+    if is_atlas_ref(value):
+        pack, name = split_ref(str(value))
+        if pack is not None and pack not in validator.atlases:
+            validator.error(node, f"unknown atlas '{pack}' (atlases: {', '.join(validator.atlases) or 'none'})")
+            return
+        found = [atlas for atlas, tiles in validator.atlases.items()
+                 if tiles is not None and name in tiles and pack in (None, atlas)]
+        if pack is not None and validator.atlases[pack] is None:
+            return  # Already reported at the atlas
+        if not found:
+            validator.error(node, f"atlas tile not found: {value}")
+        elif len(found) > 1:
+            validator.error(node, f"{value} is in several atlases ({', '.join(found)}), use atlas:<atlas>/{name}")
+        return
+    _check_file(validator, node, value)
+
+
+def _check_file(validator: Validator, node: Node, value):
+    path = Path(os.path.expanduser(str(value)))
+    if not path.is_absolute():
+        path = validator.base_path / path
+    if not path.exists():
+        validator.error(node, f"image file not found: {path}")
+
+
+def _check_atlases(validator: Validator, node: Node, value):
+    from ulanzi_manager.atlas import ATLASES
+    if not isinstance(node, MappingNode):
+        return
+    for name, path_node in validator.mapping(node).items():
+        if validator.kind(path_node) != 'str':
+            validator.error(path_node, f"atlases.{name} must be the path of an atlas index")
+            continue
+        path = Path(os.path.expanduser(str(path_node.value)))
+        if not path.is_absolute():
+            path = validator.base_path / path
+        try:
+            validator.atlases[name] = set(ATLASES.atlas(str(path)).tiles)
+        except FileNotFoundError:
+            validator.atlases[name] = None
+            validator.error(path_node, f"atlas index not found: {path}")
+        except (OSError, ValueError) as e:
+            validator.atlases[name] = None
+            validator.error(path_node, f"atlases.{name}: {e}")
+
+
+def _check_templates(validator: Validator, node: Node, value):
+    if not isinstance(node, MappingNode):
+        return
+    for name, body in validator.mapping(node).items():
+        if validator.kind(body) != 'map':
+            validator.error(body, f"templates.{name} must be a mapping")
+
+
+def action_schema(action_type: str, fields: Dict[str, Field], check=None) -> Schema:
+    """Schema for the params of an action, reporting missing keys as '<type>' action requires '<key>'"""
+    return Schema(fields, check, required_message=f"'{action_type}' action requires '{{key}}' parameter")
+
+
+LAYER_SCHEMA = Schema({
+    'type': Field('str', required=True, choices=('background', 'image', 'glyph', 'text', 'badge')),
+    'color': Field('str', check=_check_color),
+    'gradient': Field('str', check=_check_color),
+    'text_color': Field('str', check=_check_color),
+    'path': Field('str', check=_check_file),
+    'char': Field('scalar'),
+    'emoji': Field('str'),
+    'icon': Field('scalar'),
+    'text': Field('scalar'),
+    'font': Field('str'),
+    'font_size': Field(('int', 'str'), check=_check_font_size),
+    'min_font_size': Field('int', minimum=1, maximum=150),
+    'max_font_size': Field('int', minimum=1, maximum=150),
+    'max_lines': Field('int', minimum=1, maximum=10),
+    'size': Field('int', minimum=1, maximum=196),
+    'scale': Field('number', minimum=0.01, maximum=1),
+    'opacity': Field('number', minimum=0, maximum=1),
+    'margin': Field('int', minimum=0),
+    'keep_aspect': Field('bool'),
+    'position': Field(('str', 'list'), check=_check_position),
+}, _check_layer)
+
+ICON_SPEC_SCHEMA = Schema({
+    'type': Field('str', choices=('solid', 'gradient', 'text', 'emoji', 'icon', 'layers')),
+    'color': Field('str', check=_check_color),
+    'text_color': Field('str', check=_check_color),
+    'text': Field('scalar'),
+    'emoji': Field('str'),
+    'icon': Field('scalar'),
+    'font': Field('str'),
+    'font_size': Field(('int', 'str'), check=_check_font_size),
+    'min_font_size': Field('int', minimum=1, maximum=150),
+    'max_lines': Field('int', minimum=1, maximum=10),
+    'size': Field(('int', 'list'), check=_check_size),
+    'padding': Field('int', minimum=0, maximum=90),
+    'layers': Field('list', items=Field('map', schema=LAYER_SCHEMA)),
+}, _check_icon_spec)
+
+
+def _check_animation(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    if ('file' in values) == ('type' in values):
+        validator.error(node, "animation must have either 'file' or 'type'")
+
+
+ANIMATION_SCHEMA = Schema({
+    'file': Field('str', check=_check_image),  # GIF or APNG
+    'type': Field('str', choices=('blink', 'pulse', 'progress')),
+    'color': Field('str', check=_check_color),
+    'background': Field('str', check=_check_color),
+    'period': Field('number', minimum=0.05),  # Seconds per cycle
+    'frames': Field('int', minimum=2, maximum=120),
+    'duty': Field('number', minimum=0, maximum=1),  # blink: share of the period showing the image
+    'width': Field('int', minimum=1, maximum=98),  # progress: ring width
+    'fps': Field('number', minimum=0.1, maximum=30),
+}, _check_animation)
+
+
+def _check_state(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    if 'image' not in values and 'icon_spec' not in values:
+        validator.error(node, "each state must specify either 'image' or 'icon_spec'")
+
+
+def _check_state_from(validator: Validator, node: Node, value):
+    from ulanzi_manager.states import OBS_STATE_SOURCES, STATE_SOURCES
+    if not isinstance(node, MappingNode):
+        if value not in STATE_SOURCES:
+            validator.error(node, f"state_from must be one of: {', '.join(STATE_SOURCES)} or {{obs: ...}}")
+        return
+    values = validator.mapping(node)
+    if 'obs' not in values:
+        validator.error(node, "state_from mapping requires 'obs'")
+        return
+    source = validator.value(values['obs'])
+    if source not in OBS_STATE_SOURCES:
+        validator.error(values['obs'], f"state_from.obs must be one of: {', '.join(OBS_STATE_SOURCES)}")
+    elif source == 'muted' and 'input' not in values:
+        validator.error(node, "state_from: 'muted' requires 'input'")
+    elif source == 'scene' and 'scene' not in values:
+        validator.error(node, "state_from: 'scene' requires 'scene'")
+
+
+def _check_button(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    if not any(key in values for key in ('image', 'icon_spec', 'animation', 'states')):
+        validator.error(node, "must specify either 'image' or 'icon_spec'")
+    states = values.get('states')
+    count = len(states.value) if isinstance(states, SequenceNode) else 0
+    if 'states' in values and count < 2:
+        validator.error(states, "states must list at least 2 states")
+    if 'state_from' in values and 'states' not in values:
+        validator.error(values['state_from'], "state_from requires 'states'")
+    if count and 'state' in values and validator.kind(values['state']) == 'int' \
+            and not 0 <= validator.value(values['state']) < count:
+        validator.error(values['state'], f"state must be between 0 and {count - 1}")
+    check_action(validator, node, values)
+
+
+def check_action(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    """Check the 'action' type and its 'params' (of a button or a macro step)"""
+    action_node = values.get('action')
+    if action_node is not None and validator.kind(action_node) != 'str':
+        return  # Field('str') reports the wrong type
+    action_type = validator.value(action_node) if action_node is not None else 'command'
+    schema = ACTION_SCHEMAS.get(action_type)
+    if schema is None:
+        from ulanzi_manager.actions import REGISTRY
+        try:
+            schema = REGISTRY.schema(action_type)
+        except ImportError as e:
+            validator.error(action_node, str(e))
+            return
+        if schema is None:
+            validator.error(action_node, f"invalid action type: {action_type}")
+            return
+
+    params = values.get('params')
+    if params is None or validator.kind(params) == 'null':
+        # Report missing params at the action (or button) position
+        params = MappingNode('tag:yaml.org,2002:map', [], (action_node or node).start_mark, None)
+    validator.check_field(params, Field('map', schema=schema), 'params')
+
+
+LABEL_MODES = ('device', 'baked', 'auto')
+
+LABEL_STYLE_SCHEMA = Schema({
+    'Align': Field('str'),  # top, middle or bottom
+    'Color': Field(('int', 'str')),
+    'FontName': Field('str'),
+    'ShowTitle': Field('bool'),
+    'Size': Field('int', minimum=1),
+    'Weight': Field('int', minimum=1),
+})
+
+STATE_SCHEMA = Schema({
+    'name': Field('scalar'),
+    'image': Field('str', check=_check_image),
+    'icon_spec': Field('map', schema=ICON_SPEC_SCHEMA),
+    'label': Field('scalar', nullable=True),
+}, _check_state)
+
+BUTTON_SCHEMA = Schema({
+    'image': Field('str', nullable=True, check=_check_image),
+    'icon_spec': Field('map', schema=ICON_SPEC_SCHEMA),
+    'label': Field('scalar', nullable=True),
+    'action': Field('str'),
+    'params': Field('map', nullable=True),
+    'state': Field('int'),
+    'animation': Field('map', nullable=True, schema=ANIMATION_SCHEMA),
+    'label_mode': Field('str', choices=LABEL_MODES),
+    'label_style': Field('map', nullable=True, schema=LABEL_STYLE_SCHEMA),
+    'states': Field('list', items=Field('map', schema=STATE_SCHEMA)),
+    'state_from': Field(('str', 'map'), check=_check_state_from),
+}, _check_button)
+
+FOCUS_BACKENDS = ('auto', 'x11', 'sway', 'hyprland', 'poll')
+
+
+def _check_focus_page(validator: Validator, node: Node, value):
+    if value not in validator.page_names:
+        validator.error(node, f"focus: unknown page '{value}'")
+
+
+def _check_pattern(validator: Validator, node: Node, value):
+    try:
+        re.compile(str(value))
+    except re.error as e:
+        validator.error(node, f"focus: invalid pattern '{value}': {e}")
+
+
+def _check_focus_rule(validator: Validator, node: MappingNode, values: Dict[str, Node]):
+    if 'app' not in values and 'title' not in values:
+        validator.error(node, "focus rule needs 'app' or 'title'")
+
+
+FOCUS_SCHEMA = Schema({
+    'backend': Field('str', choices=FOCUS_BACKENDS),
+    'poll_interval': Field('number', minimum=0.05),
+    'default': Field('str', nullable=True, check=_check_focus_page),
+    'rules': Field('list', nullable=True, items=Field('map', schema=Schema({
+        'app': Field('scalar', check=_check_pattern),
+        'title': Field('scalar', check=_check_pattern),
+        'page': Field('str', required=True, check=_check_focus_page),
+    }, check=_check_focus_rule))),
+})
+
+BRIGHTNESS_SCHEDULE_SCHEMA = Schema({
+    'profile': Field('list', nullable=True, items=Field('map', schema=Schema({
+        'time': Field('scalar', required=True, check=_check_time),
+        'brightness': Field('int', minimum=0, maximum=100),
+    }))),
+    'idle_timeout': Field('number', nullable=True, check=_check_positive),
+    'idle_brightness': Field('int', minimum=0, maximum=100),
+    'fade_step': Field('int', minimum=1),
+    'fade_interval': Field('number', minimum=0),
+})
+
+CONFIG_SCHEMA = Schema({
+    'brightness': Field('int', minimum=0, maximum=100),
+    'label_style': Field('map', nullable=True, schema=LABEL_STYLE_SCHEMA),
+    'label_mode': Field('str', choices=LABEL_MODES),
+    'obs': Field('map', schema=Schema({
+        'host': Field('str'),
+        'port': Field('int', minimum=1, maximum=65535),
+        'password': Field('scalar', nullable=True),
+    })),
+    'brightness_schedule': Field('map', nullable=True, schema=BRIGHTNESS_SCHEDULE_SCHEMA),
+    'metrics': Field('map', nullable=True, schema=Schema({'listen': Field('scalar', check=_check_listen)})),
+    'compression': Field(('str', 'map'), choices=('default', 'auto', 'stored', 'deflated'), schema=Schema({
+        'mode': Field('str', choices=('default', 'auto', 'stored', 'deflated')),
+        'min_ratio': Field('number', check=_check_min_ratio),
+    })),
+    'control': Field('map', nullable=True, schema=Schema({
+        'enabled': Field('bool'),
+        'socket': Field('str', nullable=True),
+    })),
+    'snapshot': Field(('bool', 'map'), nullable=True, schema=Schema({
+        'enabled': Field('bool'),
+        'skip_unchanged_upload': Field('bool'),
+    })),
+    'animations': Field('map', nullable=True, schema=Schema({
+        'max_fps': Field('number', minimum=0.1, maximum=30),
+        'idle_timeout': Field('number', nullable=True, minimum=0),
+    })),
+    'trace': Field(('bool', 'map'), nullable=True, schema=Schema({
+        'enabled': Field('bool'),
+        'events': Field('int', minimum=100),
+        'path': Field('str'),
+    })),
+    'prefetch': Field(('bool', 'map'), nullable=True, schema=Schema({
+        'enabled': Field('bool'),
+        'max_pages': Field('int', minimum=0),
+        'max_memory_mb': Field('number', minimum=0),
+    })),
+    'focus': Field('map', nullable=True, schema=FOCUS_SCHEMA),
+    'atlases': Field('map', nullable=True, check=_check_atlases),
+    'include': Field(('str', 'list'), nullable=True, items=Field('str')),
+    'templates': Field('map', nullable=True, check=_check_templates),
+    'buttons': Field('list', nullable=True),
+    'pages': Field('map', nullable=True),
+})
+
+
+def _check_buttons(validator: Validator, node: Node, page: str):
+    from ulanzi_manager.config import ButtonConfig
+    if not isinstance(node, SequenceNode):
+        return
+    for index, button in enumerate(node.value):
+        if validator.kind(button) == 'null':
+            continue
+        validator.where = ButtonConfig(index, None, '', '', {}, page=page).name
+        if isinstance(button, MappingNode):
+            validator.check_mapping(button, BUTTON_SCHEMA)
+        else:
+            validator.error(button, "must be a mapping")
+    validator.where = ''
+
+
+def validate_document(node: Optional[Node], base_path: Optional[Path] = None) -> List[ConfigError]:
+    """Validate a composed config document and return its errors"""
+    from ulanzi_manager.config import MAIN_PAGE
+
+    validator = Validator(base_path)
+    if node is None:
+        return []
+    if not isinstance(node, MappingNode):
+        validator.error(node, "config must be a mapping")
+        return validator.errors
+
+    pages = validator.mapping(node).get('pages')
+    page_nodes = validator.mapping(pages) if isinstance(pages, MappingNode) else {}
+    validator.page_names = [MAIN_PAGE] + [name for name in page_nodes if name != MAIN_PAGE]
+
+    values = validator.check_mapping(node, CONFIG_SCHEMA)
+
+    if 'buttons' in values:
+        _check_buttons(validator, values['buttons'], MAIN_PAGE)
+    for name, page_node in page_nodes.items():
+        if validator.kind(page_node) not in ('list', 'null'):
+            validator.error(page_node, f"pages.{name} must be a list of buttons")
+            continue
+        _check_buttons(validator, page_node, name)
+
+    return validator.errors
@@ -0,0 +1,204 @@
+"""Compiled config snapshots for fast daemon startup
+
+A snapshot is a pickle of the validated Config together with the prebuilt
+button archive of every page and of every declared button state. It is
+stored next to the YAML file as '.<name>.snapshot' and reused only while
+the YAML content hash, the package version and the mtime/size of every
+included file and referenced image all match.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ulanzi_manager import __version__
+from ulanzi_manager.archive import ButtonArchive, CompressionPolicy, build_button_archive
+from ulanzi_manager.atlas import ATLASES, is_atlas_ref
+from ulanzi_manager.config import ButtonConfig, Config, ConfigParser, device_buttons
+
+logger = logging.getLogger(__name__)
+
+# Bump when the pickled layout changes
+SNAPSHOT_VERSION = 6
+
+
+@dataclass
+class ConfigSnapshot:
+    """Validated config plus the data needed to upload it"""
+    config_hash: str
+    config: Config
+    dependencies: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # path -> (mtime_ns, size)
+    archives: Dict[str, ButtonArchive] = field(default_factory=dict)  # page -> archive
+    digests: Dict[str, str] = field(default_factory=dict)  # page -> archive sha256
+    state_archives: Dict[str, List[ButtonArchive]] = field(default_factory=dict)  # button name -> per state
+    uploaded: Dict[str, str] = field(default_factory=dict)  # Device serial -> digest of its last startup upload
+    version: str = f'{SNAPSHOT_VERSION}/{__version__}'
+
+    def archive(self, page: str) -> Optional[ButtonArchive]:
+        """Prebuilt archive for a page (built on first use), None for empty pages"""
+        if page not in self.archives:
+            policy = CompressionPolicy(self.config.compression, self.config.compression_min_ratio)
+            archive = build_page(self.config, page, policy)
+            if archive is None:
+                return None
+            self.archives[page] = archive
+            self.digests[page] = hashlib.sha256(archive.getvalue()).hexdigest()
+        return self.archives[page]
+
+    def state_archive(self, button: ButtonConfig, state: int) -> ButtonArchive:
+        """Prebuilt partial update showing one declared state of a button"""
+        if button.name not in self.state_archives:
+            policy = CompressionPolicy(self.config.compression, self.config.compression_min_ratio)
+            archives = []
+            for number in range(len(button.states)):
+                view = replace(button)
+                view.apply_state(number)
+                archives.append(build_button_archive(device_buttons([view], self.config.label_style), policy))
+            self.state_archives[button.name] = archives
+        return self.state_archives[button.name][state]
+
+    def invalidate(self, page: str):
+        """Drop the archive of a page whose buttons changed at runtime"""
+        self.archives.pop(page, None)
+        self.digests.pop(page, None)
+
+
+def build_page(config: Config, page: str, policy: CompressionPolicy) -> Optional[ButtonArchive]:
+    """Button archive of a page, None for empty pages"""
+    buttons = config.page_buttons(page)
+    if not buttons:
+        return None
+    return build_button_archive(device_buttons(buttons, config.label_style), policy)
+
+
+def snapshot_path(config_path) -> Path:
+    """Snapshot file for a config file"""
+    config_file = Path(config_path)
+    return config_file.with_name(f'.{config_file.name}.snapshot')
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _dependencies(config: Config) -> Dict[str, Tuple[int, int]]:
+    """mtime/size of every included file and image the config refers to (including generated icons and atlases)"""
+    dependencies = {path: _file_state(path) for path in config.sources[1:]}
+    for button in config.all_buttons():
+        for image in button.images():
+            for path in ATLASES.files(image) if is_atlas_ref(image) else [image]:
+                if path and path not in dependencies:
+                    dependencies[path] = _file_state(path)
+    return dependencies
+
+
+def load_snapshot(config_path, data: bytes) -> Optional[ConfigSnapshot]:
+    """Return the snapshot for config_path if it is still valid for the YAML bytes in data"""
+    path = snapshot_path(config_path)
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+    if not isinstance(snapshot, ConfigSnapshot) or snapshot.version != ConfigSnapshot.version:
+        return None
+    if snapshot.config_hash != hashlib.sha256(data).hexdigest():
+        return None
+    for dependency, state in snapshot.dependencies.items():
+        if _file_state(dependency) != state:
+            logger.debug(f"Snapshot stale: {dependency} changed")
+            return None
+    return snapshot
+
+
+def save_snapshot(config_path, snapshot: ConfigSnapshot):
+    """Write the snapshot atomically, readable only by the owner"""
+    path = snapshot_path(config_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write config snapshot {path}: {e}")
+
+
+def remove_snapshot(config_path):
+    try:
+        snapshot_path(config_path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _unchanged_pages(config: Config, previous: ConfigSnapshot) -> List[str]:
+    """Pages whose archive in previous is still valid for config"""
+    if config.settings_digest != previous.config.settings_digest:
+        return []
+    pages = []
+    for page in config.page_names():
+        if page not in previous.archives or page not in previous.config.page_names():
+            continue
+        before = {button.index: button.source_digest for button in previous.config.page_buttons(page)}
+        buttons = config.page_buttons(page)
+        if before != {button.index: button.source_digest for button in buttons}:
+            continue
+        images = [image for button in buttons for image in button.images()]
+        paths = [path for image in images for path in (ATLASES.files(image) if is_atlas_ref(image) else [image])]
+        if all(path in previous.dependencies and previous.dependencies[path] == _file_state(path) for path in paths):
+            pages.append(page)
+    return pages
+
+
+def compile_config(config_path, previous: Optional[ConfigSnapshot] = None) -> Tuple[Optional[ConfigSnapshot], List[str]]:
+    """Load a config through its snapshot, compiling a new one when stale.
+
+    previous is the snapshot of the config loaded before from the same
+    file: only the icons and pages of buttons that changed are rendered
+    and packed again.
+
+    Returns (snapshot, validation errors); snapshot is None when there are errors.
+    """
+    config_file = Path(config_path)
+    if not config_file.exists():
+        raise FileNotFoundError(f"Config file not found: {config_path}")
+    data = config_file.read_bytes()
+
+    snapshot = load_snapshot(config_file, data)
+    if snapshot:
+        logger.info(f"Loaded config snapshot {snapshot_path(config_file)}")
+        return snapshot, []
+
+    config = ConfigParser.load(str(config_file), previous=previous.config if previous else None)
+    errors = ConfigParser.validate(config)
+    if errors:
+        return None, errors
+
+    snapshot = ConfigSnapshot(config_hash=hashlib.sha256(data).hexdigest(), config=config)
+    for button in config.all_buttons():
+        if button.states:
+            snapshot.state_archive(button, 0)
+    if config.snapshot_enabled:
+        # Dependencies are recorded after icon generation so generated icons are covered too
+        snapshot.dependencies = _dependencies(config)
+        for page in _unchanged_pages(config, previous) if previous else []:
+            snapshot.archives[page] = previous.archives[page]
+            snapshot.digests[page] = previous.digests[page]
+        for page in config.page_names():
+            snapshot.archive(page)
+        save_snapshot(config_file, snapshot)
+    else:
+        remove_snapshot(config_file)
+    return snapshot, []
@@ -0,0 +1,124 @@
+"""Per-button state machines
+
+A button may declare several states, each with its own icon and label:
+
+    - states:
+        - {name: idle, icon_spec: {type: text, text: REC, color: '#303030'}}
+        - {name: recording, icon_spec: {type: text, text: REC, color: '#C00000'}, label: Stop}
+      state_from: {obs: recording}
+      action: obs
+      params: {action: toggle_recording}
+
+Every state icon is generated when the config loads and every state is
+encoded into its own one-button archive (see ConfigSnapshot.state_archive),
+so a state change uploads a prebuilt partial update and renders nothing.
+
+state_from says what drives the state:
+
+- press: each press moves to the next state
+- exit_code: the exit code of the command started by the button selects
+  the state (0 -> first state, larger or negative codes -> last state)
+- {obs: recording}, {obs: streaming}: OBS output active -> state 1
+- {obs: muted, input: Mic/Aux}: input muted -> state 1
+- {obs: scene, scene: Live}: the scene is on program -> state 1
+
+OBS sources follow the OBS WebSocket event stream, so no state is polled.
+"""
+
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_SOURCES = ('press', 'exit_code')
+OBS_STATE_SOURCES = ('recording', 'streaming', 'muted', 'scene')
+
+# OBS event -> state source it updates
+OBS_EVENTS = {
+    'RecordStateChanged': 'recording',
+    'StreamStateChanged': 'streaming',
+    'InputMuteStateChanged': 'muted',
+    'CurrentProgramSceneChanged': 'scene',
+}
+
+
+def obs_source(state_from: Any) -> Optional[str]:
+    """OBS state source of a state_from value, if any"""
+    return state_from.get('obs') if isinstance(state_from, dict) else None
+
+
+def obs_state(state_from: Any, event: str, data: Any) -> Optional[int]:
+    """State selected by an OBS event, or None if the event does not concern state_from"""
+    source = obs_source(state_from)
+    if source is None or OBS_EVENTS.get(event) != source:
+        return None
+    if source in ('recording', 'streaming'):
+        return int(bool(data.output_active))
+    if source == 'muted':
+        if data.input_name != state_from.get('input'):
+            return None
+        return int(bool(data.input_muted))
+    return int(data.scene_name == state_from.get('scene'))
+
+
+def exit_code_state(exit_code: Optional[int], states: int) -> int:
+    """State selected by the exit code of a button's command"""
+    if exit_code is None or exit_code < 0:
+        return states - 1
+    return min(exit_code, states - 1)
+
+
+def current_obs_events(client, sources: Iterable[Dict]) -> Iterator[Tuple[str, Any]]:
+    """Events describing the current OBS state of sources, to start from it after connecting"""
+    done = set()
+    for state_from in sources:
+        source = obs_source(state_from)
+        key = (source, state_from.get('input'))
+        if key in done:
+            continue
+        done.add(key)
+        try:
+            if source == 'recording':
+                yield 'RecordStateChanged', SimpleNamespace(output_active=client.get_record_status().output_active)
+            elif source == 'streaming':
+                yield 'StreamStateChanged', SimpleNamespace(output_active=client.get_stream_status().output_active)
+            elif source == 'muted':
+                muted = client.get_input_mute(state_from.get('input')).input_muted
+                yield 'InputMuteStateChanged', SimpleNamespace(input_name=state_from.get('input'), input_muted=muted)
+            elif source == 'scene':
+                scene = client.get_current_program_scene().current_program_scene_name
+                yield 'CurrentProgramSceneChanged', SimpleNamespace(scene_name=scene)
+        except Exception as e:
+            logger.warning(f"Could not read OBS {source} state: {e}")
+
+
+def obs_event_client(host: str, port: int, password: Optional[str], on_event):
+    """OBS event client calling on_event(event, data) from its own thread for every state event"""
+    import obsws_python as obs
+
+    client = obs.EventClient(host=host, port=port, password=password, timeout=3)
+    callbacks = []
+    for event in OBS_EVENTS:
+        # obsws-python maps on_<snake_case> callbacks to event names
+        name = 'on_' + ''.join('_' + c.lower() if c.isupper() else c for c in event).lstrip('_')
+
+        def callback(data, event=event):
+            on_event(event, data)
+
+        callback.__name__ = name
+        callbacks.append(callback)
+    client.callback.register(callbacks)
+    return client
+
+
+def stateful_buttons(buttons: Iterable, kind: Optional[str] = None) -> List:
+    """Buttons with declared states, optionally only those driven by kind ('press', 'exit_code' or 'obs')"""
+    result = []
+    for button in buttons:
+        if not button.states:
+            continue
+        source = 'obs' if obs_source(button.state_from) else button.state_from
+        if kind is None or source == kind:
+            result.append(button)
+    return result
@@ -0,0 +1,148 @@
+"""Auto-fit text layout
+
+fit_text() finds the largest font size at which a text fits a box:
+words are wrapped greedily, explicit newlines are kept, and the size is
+found by binary search between min_size and max_size. Text that does not
+fit even at min_size is cut after the last line that fits and ends with
+an ellipsis.
+
+Fonts and line measurements are memoized per (font, size) and
+(font, size, string), so fitting a page of labels measures each
+candidate line once.
+"""
+
+import functools
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ELLIPSIS = '…'
+# Line spacing as a share of the font size (as in multiline text icons)
+LINE_SPACING = 0.15
+DEFAULT_MIN_SIZE = 10
+DEFAULT_MAX_LINES = 3
+
+DEFAULT_FONTS = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
+
+@dataclass
+class FittedText:
+    """Font size and lines of a text fitted into a box"""
+    size: int
+    lines: List[str]
+    spacing: int
+    truncated: bool = False
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+
+def load_font(font: Optional[str], size: int):
+    """TrueType font by path or name, falling back to DejaVu Sans and then PIL's default"""
+    from PIL import ImageFont
+
+    if font:
+        try:
+            return ImageFont.truetype(font, size)
+        except (OSError, IOError):
+            logger.warning(f"Font not found: {font}, using default")
+    for path in DEFAULT_FONTS:
+        try:
+            return ImageFont.truetype(path, size)
+        except (OSError, IOError):
+            continue
+    try:
+        return ImageFont.load_default(size)  # Scalable with Pillow >= 10.1 and FreeType
+    except TypeError:
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=256)
+def font_at(font: Optional[str], size: int):
+    """Loaded font, memoized per (font, size)"""
+    return load_font(font, size)
+
+
+@functools.lru_cache(maxsize=8192)
+def text_width(font: Optional[str], size: int, text: str) -> int:
+    """Advance width of one line, memoized per (font, size, string)"""
+    return int(round(font_at(font, size).getlength(text)))
+
+
+@functools.lru_cache(maxsize=256)
+def line_height(font: Optional[str], size: int) -> int:
+    ascent, descent = font_at(font, size).getmetrics()
+    return ascent + descent
+
+
+def wrap(text: str, font: Optional[str], size: int, width: int) -> List[str]:
+    """Greedy word wrap; words wider than the box stay on their own line"""
+    lines = []
+    for paragraph in str(text).split('\n'):
+        line = ''
+        for word in paragraph.split():
+            candidate = f'{line} {word}' if line else word
+            if line and text_width(font, size, candidate) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _height(lines: int, font: Optional[str], size: int) -> int:
+    return lines * line_height(font, size) + (lines - 1) * int(size * LINE_SPACING)
+
+
+def _fits(lines: List[str], font: Optional[str], size: int, box: Tuple[int, int], max_lines: int) -> bool:
+    return (len(lines) <= max_lines and _height(len(lines), font, size) <= box[1]
+            and all(text_width(font, size, line) <= box[0] for line in lines))
+
+
+def ellipsize(line: str, font: Optional[str], size: int, width: int) -> str:
+    """Longest prefix of line that fits width with an ellipsis appended"""
+    if text_width(font, size, line) <= width:
+        return line
+    low, high = 0, len(line)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if text_width(font, size, line[:middle].rstrip() + ELLIPSIS) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return line[:low].rstrip() + ELLIPSIS
+
+
+def fit_text(text: str, box: Tuple[int, int], font: Optional[str] = None, max_size: int = 150,
+             min_size: int = DEFAULT_MIN_SIZE, max_lines: int = DEFAULT_MAX_LINES) -> FittedText:
+    """Largest size (binary search) at which text wraps into box"""
+    low, high = min_size, max(min_size, max_size)
+    best = None
+    while low <= high:
+        size = (low + high) // 2
+        lines = wrap(text, font, size, box[0])
+        if _fits(lines, font, size, box, max_lines):
+            best = FittedText(size, lines, int(size * LINE_SPACING))
+            low = size + 1
+        else:
+            high = size - 1
+    if best is not None:
+        return best
+
+    # Does not fit at min_size: keep the lines that fit and mark the cut
+    lines = wrap(text, font, min_size, box[0])
+    count = max(1, min(max_lines, len(lines)))
+    while count > 1 and _height(count, font, min_size) > box[1]:
+        count -= 1
+    kept = lines[:count]
+    if count < len(lines):
+        kept[-1] = kept[-1] + ELLIPSIS
+    kept = [ellipsize(line, font, min_size, box[0]) for line in kept]
+    return FittedText(min_size, kept, int(min_size * LINE_SPACING), truncated=True)
@@ -0,0 +1,226 @@
+"""Press and action tracing
+
+When enabled, the daemon keeps the most recent events in an in-memory
+ring buffer and writes them as JSON lines on request ('ulanzi-manager
+trace dump') and when it stops. Each line after the header is one event
+with a time in milliseconds since tracing started:
+
+    {"t": 1234.567, "e": "press", "index": 3, "pressed": false, "state": 1}
+
+Events:
+- hid_read: input report received (header and payload, hex)
+- press: report parsed into a button press
+- dispatch / action_start / action_end: an action queued, started and
+  finished, linked by id; dropped: a press refused at the concurrency limit
+- hid_write: a command or archive written to the device (bytes, packets, ms)
+
+Call sites check TRACE.enabled before building an event, so tracing costs
+one attribute lookup when it is off.
+"""
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ulanzi_manager import __version__
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+# Events kept in memory (about 30 minutes of an idle daemon's clock updates)
+DEFAULT_CAPACITY = 20000
+DEFAULT_TRACE_PATH = Path.home() / '.local/share/ulanzi/trace.jsonl'
+
+
+class TraceRecorder:
+    """Ring buffer of timestamped events"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.enabled = False
+        self.events: deque = deque(maxlen=capacity)
+        self.recorded = 0
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def enable(self, capacity: Optional[int] = None):
+        """Start recording into an empty buffer"""
+        with self._lock:
+            self.events = deque(maxlen=capacity or self.events.maxlen)
+            self.recorded = 0
+            self.started = time.time()
+            self._origin = time.perf_counter()
+            self.enabled = True
+
+    def disable(self):
+        """Stop recording, keeping the events recorded so far"""
+        self.enabled = False
+
+    def event(self, kind: str, **fields):
+        with self._lock:
+            self.events.append((time.perf_counter(), kind, fields))
+            self.recorded += 1
+
+    def next_id(self) -> int:
+        """Id linking the events of one action execution"""
+        return next(self._ids)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Recorded events as dictionaries, oldest first"""
+        with self._lock:
+            events = list(self.events)
+        return [{'t': round((t - self._origin) * 1000, 3), 'e': kind, **fields} for t, kind, fields in events]
+
+    def header(self, **extra) -> Dict[str, Any]:
+        return {
+            'trace': TRACE_VERSION,
+            'version': __version__,
+            'started': self.started,
+            'capacity': self.events.maxlen,
+            'dropped': max(0, self.recorded - len(self.events)),
+            **extra,
+        }
+
+    def dump(self, path, **header) -> int:
+        """Write the header and events to path as JSON lines; returns the number of events"""
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        events = self.snapshot()
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(self.header(**header)) + '\n')
+            for event in events:
+                f.write(json.dumps(event, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, path)
+        return len(events)
+
+
+TRACE = TraceRecorder()
+
+
+def load_trace(path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Read a trace file into (header, events)"""
+    with open(Path(path).expanduser()) as f:
+        lines = [line for line in f if line.strip()]
+    if not lines:
+        raise ValueError(f"Empty trace file: {path}")
+    header = json.loads(lines[0])
+    if header.get('trace') != TRACE_VERSION:
+        raise ValueError(f"Not a trace file (or unsupported version): {path}")
+    return header, [json.loads(line) for line in lines[1:]]
+
+
+def _stats(samples: List[float]) -> Dict[str, Any]:
+    from ulanzi_manager.bench import percentile, summarize
+    return summarize(samples, p99_ms=percentile(sorted(samples), 99))
+
+
+def summarize_trace(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency statistics (milliseconds) of a list of trace events.
+
+    - press_to_dispatch: button release until the action is queued
+    - queue: dispatch until the action starts (worker pool, async loop)
+    - action: action run time, also split by action type
+    - press_to_done: button release until the action finishes
+    - hid_write: device writes, by command
+    """
+    latency = {'press_to_dispatch': [], 'queue': [], 'action': [], 'press_to_done': []}
+    actions: Dict[str, List[float]] = {}
+    writes: Dict[str, List[float]] = {}
+    write_bytes: Dict[str, int] = {}
+    dispatched: Dict[int, Tuple[float, Optional[float], str]] = {}  # id -> (dispatch t, release t, action)
+    started: Dict[int, float] = {}
+    release = None
+    presses = dropped = errors = 0
+
+    for event in events:
+        kind, t = event['e'], event['t']
+        if kind == 'press':
+            if event['pressed']:
+                presses += 1
+            else:
+                release = t
+        elif kind == 'dispatch':
+            if release is not None:
+                latency['press_to_dispatch'].append(t - release)
+            dispatched[event['id']] = (t, release, event['action'])
+            release = None
+        elif kind == 'dropped':
+            dropped += 1
+            release = None
+        elif kind == 'action_start' and event['id'] in dispatched:
+            started[event['id']] = t
+            latency['queue'].append(t - dispatched[event['id']][0])
+        elif kind == 'action_end' and event['id'] in started:
+            _, pressed_at, action = dispatched.pop(event['id'])
+            duration = t - started.pop(event['id'])
+            latency['action'].append(duration)
+            actions.setdefault(action, []).append(duration)
+            if pressed_at is not None:
+                latency['press_to_done'].append(t - pressed_at)
+            errors += 1 if event.get('error') else 0
+        elif kind == 'hid_write':
+            writes.setdefault(event['cmd'], []).append(event['ms'])
+            write_bytes[event['cmd']] = write_bytes.get(event['cmd'], 0) + event['bytes']
+
+    return {
+        'events': len(events),
+        'duration_ms': events[-1]['t'] - events[0]['t'] if events else 0.0,
+        'presses': presses,
+        'actions_dropped': dropped,
+        'action_errors': errors,
+        'latency': {name: _stats(samples) for name, samples in latency.items()},
+        'actions': {name: _stats(samples) for name, samples in sorted(actions.items())},
+        'hid_write': {name: dict(_stats(samples), bytes=write_bytes[name]) for name, samples in sorted(writes.items())},
+    }
+
+
+def replay_trace(events: List[Dict[str, Any]], config_path: str, speed: float = 1.0,
+                 run_actions: bool = False) -> List[Dict[str, Any]]:
+    """Feed the input reports of a trace to a daemon on a simulated device.
+
+    Reports are replayed with their recorded spacing divided by speed
+    (0: as fast as possible). Unless run_actions is set, only page
+    switches run and other actions are skipped, so a replay does not
+    launch programs or send keys. Returns the events of the replay.
+    """
+    from ulanzi_manager.actions import ActionHandler, ActionRegistry, PageAction
+    from ulanzi_manager.bench.fakehid import FakeHIDDevice
+    from ulanzi_manager.daemon import UlanziDaemon
+    from ulanzi_manager.device import UlanziDevice
+
+    class SkippedAction(ActionHandler):
+        def execute(self, params):
+            pass
+
+    class DryRunRegistry(ActionRegistry):
+        def load(self, action_type):
+            return PageAction if action_type == 'page' else SkippedAction
+
+    fake = FakeHIDDevice()
+    previous = None
+    for event in events:
+        if event['e'] == 'hid_read':
+            delay = (event['t'] - previous) / 1000 / speed if previous is not None and speed else 0.0
+            fake.queue_report(bytes.fromhex(event['report']).ljust(UlanziDevice.PACKET_SIZE, b'\x00'), delay)
+            previous = event['t']
+
+    registry = None if run_actions else DryRunRegistry(group=None)
+    daemon = UlanziDaemon(config_path, device=UlanziDevice(hid_device=fake), registry=registry, services=False)
+    TRACE.enable(max(DEFAULT_CAPACITY, len(events) * 2))
+    try:
+        if not daemon.start():
+            raise ValueError(f"Could not start a daemon with {config_path}")
+        daemon.serve(until=lambda: not fake.pending_reports())
+        daemon.executor.shutdown(wait=True)
+    finally:
+        TRACE.disable()
+        daemon.stop()
+    return TRACE.snapshot()
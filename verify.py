@@ -96,7 +96,7 @@ print("\n6. Testing action executor...")
 try:
     executor = ActionExecutor()
     print("   ✓ Action executor initialized")
-    print(f"   ✓ Handlers: {list(executor.handlers.keys())}")
+    print(f"   ✓ Action types: {executor.registry.names()}")
 except Exception as e:
     print(f"   ✗ Action executor test failed: {e}")
     sys.exit(1)